@@ -0,0 +1,75 @@
+"""Measure cold-start time of the API service setup in fresh interpreters.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 5]
+
+"before" reproduces the old startup (discovery.build called three times:
+YouTubeClient in __main__, YouTubeChat and its internal YouTubeClient);
+"after" builds YouTubeClient and YouTubeChat on the shared service with a
+warm on-disk discovery cache.  Each run is a new process; import time
+and service setup time are reported separately as the median of
+``--runs``.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BEFORE = """
+import time
+t = time.perf_counter()
+from googleapiclient.discovery import build
+t1 = time.perf_counter()
+for _ in range(3):
+    build('youtube', 'v3', developerKey='bench')
+print(t1 - t, time.perf_counter() - t1)
+"""
+
+AFTER = """
+import sys, time
+sys.path.insert(0, {root!r})
+t = time.perf_counter()
+from src.client.youtube_client import YouTubeClient
+from src.youtube_chat import YouTubeChat
+import googleapiclient.discovery
+t1 = time.perf_counter()
+YouTubeClient('bench')
+YouTubeChat('bench', live_chat_id='bench')
+print(t1 - t, time.perf_counter() - t1)
+"""
+
+
+def run(code, env, runs):
+    imports, setups = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                             capture_output=True, text=True).stdout
+        imp, setup = out.strip().splitlines()[-1].split()
+        imports.append(float(imp))
+        setups.append(float(setup))
+    return statistics.median(imports), statistics.median(setups)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, YOUTUBE_DISCOVERY_CACHE=os.path.join(tmp, "youtube.v3.json"))
+        # warm the discovery cache once, as the first real start would
+        run(AFTER.format(root=root), env, 1)
+        before = run(BEFORE, env, args.runs)
+        after = run(AFTER.format(root=root), env, args.runs)
+
+    print(f"median of {args.runs} fresh processes (imports / service setup)")
+    print(f"  before (3x discovery.build)        : {before[0] * 1000:8.1f} ms / {before[1] * 1000:6.1f} ms")
+    print(f"  after  (shared service, disk cache): {after[0] * 1000:8.1f} ms / {after[1] * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
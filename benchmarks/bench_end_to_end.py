@@ -0,0 +1,115 @@
+"""End-to-end load test against the fake YouTube API.
+
+Usage:
+    python benchmarks/bench_end_to_end.py [--rate 200] [--profile raid] [--seconds 20]
+    python benchmarks/bench_end_to_end.py --replay session.jsonl.gz --speed 10
+
+Starts src.testing.fake_api, points the real YouTubeChat at it and feeds
+ChatHandler (log + CSV + SQLite in a temp dir) through the writer
+pipeline, then reports throughput and publishedAt -> sink latency.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.client.polling import PollScheduler
+from src.client.service import build_service
+from src.handlers.chat_handler import ChatHandler
+from src.handlers.pipeline import WriterPipeline
+from src.testing.fake_api import FakeYouTubeAPI, load_recording
+from src.youtube_chat import YouTubeChat
+
+
+class LatencyProbe:
+    """Wraps a handler and records publishedAt -> written latency."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.latencies = []
+        self.count = 0
+
+    def process_batch(self, messages):
+        self.handler.process_batch(messages)
+        now = time.time()
+        for message in messages:
+            published = message.get("snippet", {}).get("publishedAt")
+            if published:
+                ts = datetime.fromisoformat(published.replace("Z", "+00:00")).timestamp()
+                self.latencies.append(now - ts)
+        self.count += len(messages)
+
+    def flush(self):
+        self.handler.flush()
+
+    def close(self):
+        self.handler.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200.0)
+    parser.add_argument("--profile", default="raid")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--polling-interval-ms", type=int, default=500)
+    parser.add_argument("--replay", help="recorded session to replay instead of synthetic chat")
+    parser.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    replay = load_recording(args.replay) if args.replay else None
+    with FakeYouTubeAPI(rate=args.rate, profile=args.profile, replay=replay, speed=args.speed,
+                        polling_interval_ms=args.polling_interval_ms) as api, \
+            tempfile.TemporaryDirectory() as tmp:
+        service = build_service("bench", api_endpoint=api.url)
+        handler = ChatHandler(None, log_file=os.path.join(tmp, "chat.log"),
+                              csv_path=os.path.join(tmp, "chat.csv"),
+                              db_path=os.path.join(tmp, "chat.db"))
+        probe = LatencyProbe(handler)
+        pipeline = WriterPipeline(probe).start()
+        chat = YouTubeChat("bench", video_id=api.video_id, handler=pipeline, service=service,
+                           scheduler=PollScheduler(min_interval=0.1, max_interval=2.0))
+
+        stop = time.monotonic() + args.seconds
+        polls = 0
+
+        def poll():
+            nonlocal polls
+            while time.monotonic() < stop:
+                time.sleep(chat.poll_once())
+                polls += 1
+
+        started = time.monotonic()
+        poller = threading.Thread(target=poll)
+        poller.start()
+        poller.join()
+        pipeline.close(timeout=30)
+        elapsed = time.monotonic() - started
+
+    lat = probe.latencies
+    print(f"profile={args.replay or args.profile} rate={args.rate}/s for {elapsed:.1f}s")
+    print(f"  API requests : {api.requests} ({polls} polls)")
+    print(f"  messages     : {probe.count} served={api.messages_served} "
+          f"({probe.count / elapsed:,.0f} msg/s)")
+    if lat:
+        print(f"  latency (s)  : p50={percentile(lat, 50):.3f} p95={percentile(lat, 95):.3f} "
+              f"p99={percentile(lat, 99):.3f} mean={statistics.fmean(lat):.3f}")
+    print(f"  queue        : {pipeline.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare a per-rule scan with the compiled keyword filter.
+
+Usage:
+    python benchmarks/bench_filter.py [--messages 20000] [--keywords 500] [--patterns 20]
+
+"before" checks every rule separately (one whole-word regex search per
+keyword, then every pattern), which is what a hand-written filter loop
+does; "after" runs the same rules through KeywordFilter.  About one
+message in fifty contains a keyword.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.handlers.filters import KeywordFilter
+
+WORDS = ("gg", "lol", "nice", "play", "what", "is", "this", "chat", "hello", "from",
+         "brazil", "that", "was", "insane", "clip", "it", "pog", "the", "boss", "again")
+
+
+def make_rules(keywords, patterns):
+    rng = random.Random(1)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    rules = []
+    for i in range(keywords):
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(5, 10)))
+        if i % 5 == 0:
+            word += " " + "".join(rng.choice(letters) for _ in range(rng.randint(3, 7)))
+        rules.append((f"set{i % 8}", "word", word))
+    for i in range(patterns):
+        rules.append(("links", "re", rf"https?://\S*site{i}\.example\b"))
+    return rules
+
+
+def make_messages(count, rules):
+    rng = random.Random(2)
+    keywords = [term for _, kind, term in rules if kind == "word"]
+    messages = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 14))]
+        if i % 50 == 0:
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        messages.append(" ".join(words))
+    return messages
+
+
+def bench_per_rule(rules, messages):
+    compiled = [(rule, term, re.compile(term if kind == "re" else rf"\b{re.escape(term)}\b",
+                                        re.IGNORECASE))
+                for rule, kind, term in rules]
+    start = time.perf_counter()
+    hits = 0
+    for text in messages:
+        if any(p.search(text) for _, _, p in compiled):
+            hits += 1
+    return time.perf_counter() - start, hits
+
+
+def bench_filter(rules, messages):
+    compiled = KeywordFilter(rules)
+    start = time.perf_counter()
+    hits = 0
+    for text in messages:
+        if compiled.match(text):
+            hits += 1
+    return time.perf_counter() - start, hits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--keywords", type=int, default=500)
+    parser.add_argument("--patterns", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rules = make_rules(args.keywords, args.patterns)
+    messages = make_messages(args.messages, rules)
+    before, before_hits = bench_per_rule(rules, messages)
+    after, after_hits = bench_filter(rules, messages)
+
+    print(f"messages: {args.messages}, keywords: {args.keywords}, patterns: {args.patterns}")
+    print(f"  before (one search per rule): {args.messages / before:>12,.0f} msg/s  ({before_hits} hits)")
+    print(f"  after  (KeywordFilter)      : {args.messages / after:>12,.0f} msg/s  ({after_hits} hits)")
+    print(f"  speed-up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
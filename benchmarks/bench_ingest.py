@@ -0,0 +1,173 @@
+"""Benchmark suite for the ChatHandler ingest path.
+
+Usage:
+    python benchmarks/bench_ingest.py [--messages 20000] [--batch 200]
+    python benchmarks/bench_ingest.py --json results.json
+    python benchmarks/bench_ingest.py --compare results.json [--tolerance 0.25]
+
+Feeds synthetic messages (realistic author skew, text lengths, emotes and
+emoji from src.testing.fake_api) through ChatHandler with each sink
+combination and reports messages/sec, per-batch latency percentiles and
+the tracemalloc memory high-water mark.  ``--json`` saves the results and
+``--compare`` checks them against a saved run, exiting with status 1 when
+any scenario's throughput dropped by more than ``--tolerance``, so the
+suite can gate CI and be compared across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.handlers.analytics import ChatAnalytics
+from src.handlers.chat_handler import ChatHandler
+from src.testing.fake_api import generate_messages
+
+
+class HeadlessUI:
+    """Stands in for ChatUI: formats each line like the real widget does."""
+
+    def __init__(self):
+        self.lines = []
+
+    def append_message(self, author, text):
+        self.lines.append(f"{author}: {text}\n")
+        if len(self.lines) > 5000:
+            del self.lines[:1000]
+
+
+# scenario name -> which outputs to enable (log is on unless "nolog")
+SCENARIOS = {
+    "log": (),
+    "log+csv": ("csv",),
+    "log+sqlite": ("sqlite",),
+    "log+analytics": ("analytics",),
+    "log+csv+sqlite": ("csv", "sqlite"),
+    "log+csv+sqlite+ui": ("csv", "sqlite", "ui"),
+    "all+xlsx": ("csv", "sqlite", "ui", "xlsx"),
+    # a hot stream keeping only what it needs
+    "csv-only": ("nolog", "csv"),
+}
+
+
+def make_handler(outputs, tmp):
+    return ChatHandler(
+        None,
+        ui=HeadlessUI() if "ui" in outputs else None,
+        log_file=None if "nolog" in outputs else os.path.join(tmp, "chat.log"),
+        csv_path=os.path.join(tmp, "chat.csv") if "csv" in outputs else None,
+        db_path=os.path.join(tmp, "chat.db") if "sqlite" in outputs else None,
+        xlsx_path=os.path.join(tmp, "chat.xlsx") if "xlsx" in outputs else None,
+        analytics=ChatAnalytics(keywords=["gg", "lol"]) if "analytics" in outputs else None,
+    )
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _feed(outputs, messages, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = make_handler(outputs, tmp)
+        latencies = []
+        start = time.perf_counter()
+        for i in range(0, len(messages), batch):
+            t = time.perf_counter()
+            handler.process_batch(messages[i:i + batch])
+            latencies.append(time.perf_counter() - t)
+        handler.close()
+        return time.perf_counter() - start, latencies
+
+
+def run_scenario(outputs, messages, batch):
+    """Return the result dict for one sink combination.
+
+    Timing and memory come from separate passes because tracemalloc slows
+    allocation-heavy code down several times.
+    """
+    elapsed, latencies = _feed(outputs, messages, batch)
+    tracemalloc.start()
+    _feed(outputs, messages, batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "messages_per_sec": len(messages) / elapsed,
+        "batch_ms_p50": percentile(latencies, 50) * 1000,
+        "batch_ms_p95": percentile(latencies, 95) * 1000,
+        "batch_ms_p99": percentile(latencies, 99) * 1000,
+        "peak_mem_kib": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print deltas against ``baseline``; return True if nothing regressed."""
+    ok = True
+    print(f"\ncompared with baseline (tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            print(f"  {name:20s} (no baseline)")
+            continue
+        change = result["messages_per_sec"] / old["messages_per_sec"] - 1
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"  {name:20s} {change:+7.1%} msg/s{flag}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=200, help="messages per poll batch")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only these scenarios (repeatable)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed throughput drop before --compare fails")
+    args = parser.parse_args(argv)
+
+    messages = generate_messages(args.messages, seed=42)
+    names = args.scenario or list(SCENARIOS)
+    results = {}
+    print(f"{args.messages} messages, batches of {args.batch}")
+    print(f"  {'scenario':20s} {'msg/s':>10s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'peak KiB':>9s}")
+    for name in names:
+        try:
+            result = run_scenario(SCENARIOS[name], messages, args.batch)
+        except Exception as exc:
+            print(f"  {name:20s} skipped: {exc}")
+            continue
+        results[name] = result
+        print(f"  {name:20s} {result['messages_per_sec']:10,.0f} {result['batch_ms_p50']:8.2f} "
+              f"{result['batch_ms_p95']:8.2f} {result['batch_ms_p99']:8.2f} {result['peak_mem_kib']:9,.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "messages": args.messages,
+                "batch": args.batch,
+                "scenarios": results,
+            }, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Compare per-message commits with the batched SQLite sink.
+
+Usage:
+    python benchmarks/bench_sqlite_sink.py [--messages 5000] [--batch 200]
+
+"before" reproduces the old ChatHandler behaviour (one INSERT and one
+commit per message, default rollback journal); "after" feeds the same
+rows through SQLiteSink one poll-sized batch at a time.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.handlers.sqlite_sink import SQLiteSink
+
+
+def make_rows(count):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    return [(stamp, f"user{i % 300}", f"message number {i} 🎉") for i in range(count)]
+
+
+def bench_per_message(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS messages (timestamp TEXT, author TEXT, text TEXT)")
+    conn.commit()
+    start = time.perf_counter()
+    for row in rows:
+        conn.execute("INSERT INTO messages(timestamp, author, text) VALUES(?,?,?)", row)
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def bench_batched(path, rows, batch, synchronous):
+    sink = SQLiteSink(path, synchronous=synchronous)
+    rows = [(f"id{i}", stamp, None, None, author, text)
+            for i, (stamp, author, text) in enumerate(rows)]
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        sink.write_rows(rows[i:i + batch])
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    sink.close()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=200, help="messages per poll batch")
+    parser.add_argument("--synchronous", default="NORMAL")
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.messages)
+    with tempfile.TemporaryDirectory() as tmp:
+        before = bench_per_message(os.path.join(tmp, "before.db"), rows)
+        after = bench_batched(os.path.join(tmp, "after.db"), rows, args.batch, args.synchronous)
+
+    print(f"messages: {args.messages}, batch size: {args.batch}, synchronous={args.synchronous}")
+    print(f"  before (commit per message): {args.messages / before:12,.0f} msg/s")
+    print(f"  after  (batched, WAL)      : {args.messages / after:12,.0f} msg/s")
+    print(f"  speed-up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
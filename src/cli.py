@@ -0,0 +1,247 @@
+"""Headless command-line collector.
+
+Runs one or more live chats without a window, e.g. as a service::
+
+    python -m src.cli VIDEO_ID [VIDEO_ID ...] --output-dir /var/lib/chat --sinks csv,sqlite
+
+This module never imports tkinter.  SIGTERM and Ctrl+C stop polling, drain
+the writer queues and flush and close every sink before exiting.  Each
+stream's position is checkpointed, so running the same command again after
+a crash or restart carries on where the previous run stopped.
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+SINKS = ("log", "csv", "sqlite", "xlsx", "archive", "analytics")
+
+
+def _sink_list(value):
+    sinks = [s.strip().lower() for s in value.split(",") if s.strip()]
+    unknown = [s for s in sinks if s not in SINKS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown sink(s) {', '.join(unknown)}; choose from {', '.join(SINKS)}")
+    return sinks
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="youtube-chat",
+        description="Collect YouTube live chat messages without a GUI.",
+    )
+    parser.add_argument("video_ids", nargs="*", metavar="VIDEO",
+                        help="video IDs or URLs of the live streams to follow")
+    parser.add_argument("--live-chat-id", action="append", default=[], metavar="ID",
+                        help="follow a live chat ID directly (repeatable)")
+    parser.add_argument("--api-key", default=os.getenv("YOUTUBE_API_KEY"),
+                        help="API key (default: $YOUTUBE_API_KEY); several comma-separated "
+                             "keys are rotated as each one's quota runs low")
+    parser.add_argument("--daily-quota", type=int,
+                        default=int(os.getenv("CHAT_QUOTA_DAILY_UNITS", "0")) or None,
+                        metavar="UNITS",
+                        help="quota per key per day; polling is spaced out so it lasts "
+                             "until the daily reset (default: no pacing)")
+    parser.add_argument("--output-dir", default=None,
+                        help="folder for TXT/CSV/database/XLSX/raw output (default: Logs/)")
+    parser.add_argument("--sinks", type=_sink_list, default=list(SINKS),
+                        help="comma-separated outputs: log, csv, sqlite, xlsx, archive, "
+                             "analytics (default: all); leave out what a busy stream "
+                             "doesn't need")
+    parser.add_argument("--filter-rules", default=os.getenv("CHAT_FILTER_FILE") or None,
+                        metavar="FILE",
+                        help="keyword/moderation rules; matching messages are written to "
+                             "Alerts/ in the output folder, and edits to the file are "
+                             "picked up while running")
+    parser.add_argument("--checkpoint-dir",
+                        default=os.getenv("CHAT_CHECKPOINT_DIR") or None,
+                        help="where each stream's resume checkpoint is kept "
+                             "(default: Checkpoints/ in the output folder)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="ignore saved checkpoints and start from the live edge")
+    parser.add_argument("--poll-min", type=float,
+                        default=float(os.getenv("CHAT_POLL_MIN_SECONDS", "5")),
+                        help="shortest polling interval in seconds")
+    parser.add_argument("--poll-max", type=float,
+                        default=float(os.getenv("CHAT_POLL_MAX_SECONDS", "30")),
+                        help="longest polling interval in seconds")
+    parser.add_argument("--max-workers", type=int, default=8,
+                        help="concurrent API requests across streams")
+    parser.add_argument("--cache-file",
+                        default=os.getenv("CHAT_ID_CACHE_FILE", "chat_id.cache"),
+                        help="where looked-up live chat IDs are cached")
+    parser.add_argument("--stats-every", type=float, default=0, metavar="SECONDS",
+                        help="print live statistics for each stream this often")
+    parser.add_argument("--keywords", default="",
+                        help="comma-separated words to count in the statistics")
+    parser.add_argument("--metrics-port", type=int,
+                        default=int(os.getenv("CHAT_METRICS_PORT", "0")) or None, metavar="PORT",
+                        help="serve Prometheus metrics on http://HOST:PORT/metrics "
+                             "(default: metrics off)")
+    parser.add_argument("--metrics-host", default=os.getenv("CHAT_METRICS_HOST", "127.0.0.1"),
+                        help="address the metrics endpoint listens on (default: localhost only)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long imports and initialisation took")
+    parser.add_argument("--startup-budget", type=float,
+                        default=float(os.getenv("CHAT_STARTUP_BUDGET_SECONDS", "0")) or None,
+                        metavar="SECONDS",
+                        help="with --profile-startup, flag a startup slower than this")
+    return parser
+
+
+def normalize_video_id(val):
+    """Strip a full YouTube link down to the raw video ID."""
+    import re
+    if not val:
+        return val
+    # common patterns: v=ID, youtu.be/ID
+    m = re.search(r"(?:v=|youtu\.be/)([A-Za-z0-9_-]{11})", val)
+    if m:
+        return m.group(1)
+    return val
+
+
+def format_stats(name, snap):
+    """One line summarising a ChatAnalytics snapshot."""
+    top = ", ".join(f"{author} ({count})" for author, count, _ in snap["top_authors"])
+    line = (f"[{name}] {snap['total']} msgs, {snap['per_minute_short']:.0f}/min "
+            f"(10 min avg {snap['per_minute_long']:.0f}/min), "
+            f"~{snap['unique_authors']} chatters; top: {top or '-'}")
+    if snap["keywords"]:
+        line += "; " + ", ".join(f"{k}={v}" for k, v in snap["keywords"].items())
+    return line
+
+
+def format_quota(proj):
+    """One line summarising a QuotaBudget projection."""
+    line = (f"[quota] {proj['used']:.0f} used, {proj['remaining']:.0f} left, "
+            f"{proj['units_per_hour']:.0f}/h; resets in {proj['reset_in'] / 3600:.1f} h")
+    if proj['exhausted_in'] is not None and not proj['on_track']:
+        line += f"; at this rate runs out in {proj['exhausted_in'] / 3600:.1f} h"
+    return line
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    video_ids = [normalize_video_id(v) for v in args.video_ids]
+    if not video_ids and not args.live_chat_id:
+        parser.error("give at least one VIDEO or --live-chat-id")
+    api_keys = [k.strip() for k in (args.api_key or "").split(",") if k.strip()]
+    if not api_keys:
+        parser.error("no API key: pass --api-key or set YOUTUBE_API_KEY")
+    if args.poll_min > args.poll_max:
+        parser.error("--poll-min must not exceed --poll-max")
+
+    from src.utils.startup import StartupProfiler
+    profiler = StartupProfiler(enabled=args.profile_startup, budget=args.startup_budget)
+
+    with profiler.phase("import collector"):
+        from src.client.checkpoint import Checkpoint
+        from src.client.polling import PollScheduler
+        from src.handlers.analytics import ChatAnalytics
+        from src.handlers.pipeline import WriterPipeline
+        from src.supervisor import StreamSupervisor
+        from src.youtube_chat import _get_base_dir, create_handler
+    with profiler.phase("import googleapiclient"):
+        import googleapiclient.discovery  # noqa: F401  (timed on its own)
+    with profiler.phase("api service"):
+        from src.client.service import get_service
+        service = get_service(api_keys[0])
+
+    if args.metrics_port:
+        from src.utils import metrics
+        with profiler.phase("metrics endpoint"):
+            metrics.serve(args.metrics_port, host=args.metrics_host)
+        print(f"Metrics on http://{args.metrics_host}:{args.metrics_port}/metrics")
+
+    quota = None
+    if args.daily_quota or len(api_keys) > 1 or os.getenv('YOUTUBE_API_KEYS'):
+        from src.client.quota import QuotaBudget
+        quota = QuotaBudget.from_env(*api_keys, daily_units=args.daily_quota or 10000)
+
+    supervisor = StreamSupervisor(
+        api_keys[0],
+        max_workers=args.max_workers,
+        service=service,
+        quota=quota,
+        scheduler_factory=lambda: PollScheduler(min_interval=args.poll_min,
+                                                max_interval=args.poll_max),
+    )
+    checkpoint_dir = args.checkpoint_dir or os.path.join(
+        args.output_dir or os.path.join(_get_base_dir(), 'Logs'), 'Checkpoints')
+    checkpoint_interval = float(os.getenv('CHAT_CHECKPOINT_SECONDS', '5'))
+    streams = [("video_id", v) for v in video_ids]
+    streams += [("live_chat_id", c) for c in args.live_chat_id]
+    keywords = [k.strip() for k in args.keywords.split(",") if k.strip()]
+    stats = {}
+    for kind, ident in streams:
+        if "analytics" in args.sinks:
+            stats[ident] = ChatAnalytics(keywords=keywords)
+        with profiler.phase(f"open outputs {ident}"):
+            handler = create_handler(
+                None,
+                versioned=True,
+                # only suffix filenames when several streams share the folder
+                stream_name=ident if len(streams) > 1 else None,
+                output_dir=args.output_dir,
+                sinks=args.sinks,
+                analytics=stats.get(ident),
+                filter_rules=args.filter_rules,
+            )
+            pipeline = WriterPipeline(
+                handler,
+                maxsize=int(os.getenv('CHAT_QUEUE_MAXSIZE', '10000')),
+                overflow=os.getenv('CHAT_QUEUE_OVERFLOW', 'block'),
+                name=ident,
+            ).start()
+        checkpoint = Checkpoint(os.path.join(checkpoint_dir, f"{ident}.json"),
+                                interval=checkpoint_interval)
+        if args.no_resume:
+            checkpoint.clear()
+        # a video ID is resolved to its chat ID here (cached after the first run)
+        with profiler.phase(f"add stream {ident}"):
+            supervisor.add_stream(handler=pipeline, cache_file=args.cache_file,
+                                  checkpoint=checkpoint, **{kind: ident})
+
+    stop = threading.Event()
+
+    def on_signal(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    supervisor.start()
+    profiler.report()
+    print(f"Collecting {len(streams)} stream(s); send SIGTERM or press Ctrl+C to stop.")
+    # wake up regularly so signals are handled promptly, and leave once
+    # every chat has ended
+    next_stats = time.monotonic() + args.stats_every
+    while not stop.wait(0.5):
+        if not supervisor.streams:
+            break
+        if args.stats_every and time.monotonic() >= next_stats:
+            next_stats += args.stats_every
+            for ident, analytics in stats.items():
+                print(format_stats(ident, analytics.snapshot(top=5)))
+            if quota is not None:
+                print(format_quota(quota.projection()))
+            if args.metrics_port:
+                print(metrics.summary())
+    print("Stopping: flushing all outputs...")
+    supervisor.stop(close_handlers=True)
+    if quota is not None:
+        quota.save()
+    return 0
+
+
+if __name__ == "__main__":
+    # make sure workspace root is on the import path so `src` is a package
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+import time
+
+# one lock per cache path, shared by every ChatIdCache in the process
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class ChatIdCache:
+    """Video ID -> live chat ID mapping persisted as a small JSON file.
+
+    Entries expire after ``ttl`` seconds and are dropped explicitly with
+    :meth:`invalidate` when a chat ends, so a restarted collector skips the
+    ``videos.list`` round-trip while the stream is live but never reuses a
+    dead chat ID.  Unreadable or legacy (plain text) files are treated as
+    empty and rewritten on the next store.
+    """
+
+    def __init__(self, path, ttl=6 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = _lock_for(path)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, data):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def get(self, video_id):
+        """Return the cached chat ID for ``video_id``, or None if missing/stale."""
+        with self._lock:
+            entry = self._load().get(video_id)
+        if not isinstance(entry, dict):
+            return None
+        if time.time() - entry.get('cached_at', 0) > self.ttl:
+            return None
+        return entry.get('live_chat_id')
+
+    def put(self, video_id, live_chat_id):
+        with self._lock:
+            data = self._load()
+            data[video_id] = {'live_chat_id': live_chat_id, 'cached_at': time.time()}
+            # drop expired entries so the file doesn't grow forever
+            now = time.time()
+            data = {k: v for k, v in data.items()
+                    if isinstance(v, dict) and now - v.get('cached_at', 0) <= self.ttl}
+            self._save(data)
+
+    def invalidate(self, video_id=None, live_chat_id=None):
+        """Forget the entry for ``video_id`` and/or any entry for ``live_chat_id``."""
+        with self._lock:
+            data = self._load()
+            kept = {k: v for k, v in data.items()
+                    if k != video_id
+                    and not (live_chat_id and isinstance(v, dict)
+                             and v.get('live_chat_id') == live_chat_id)}
+            if kept != data:
+                self._save(kept)
@@ -0,0 +1,72 @@
+import json
+import os
+import time
+
+
+class Checkpoint:
+    """Where a chat session got to, saved so a restart can resume there.
+
+    The state is the live chat ID, the ``nextPageToken`` of the last page
+    written to the outputs and the IDs of the most recent messages (so the
+    overlap around the resumed page is not stored twice).  It is written to
+    a temp file, fsynced and moved over ``path``, so a crash leaves either
+    the old or the new checkpoint, never a torn one.
+
+    YouTubeChat only saves a checkpoint once the handler has flushed
+    everything before it (see ``WriterPipeline.on_flushed``), so the token
+    never runs ahead of what is actually on disk, and at most every
+    ``interval`` seconds (see :meth:`due`).
+    """
+
+    def __init__(self, path, max_ids=2000, interval=5.0):
+        self.path = path
+        self.max_ids = max_ids
+        self.interval = interval
+        self._last = None
+
+    def load(self, live_chat_id=None):
+        """Return the saved state, or None if missing, unreadable or for another chat."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict):
+            return None
+        if live_chat_id and state.get('live_chat_id') != live_chat_id:
+            return None
+        return state
+
+    def due(self, now=None):
+        """True if the last checkpoint is ``interval`` seconds old (or none was taken)."""
+        now = time.monotonic() if now is None else now
+        if self._last is not None and now - self._last < self.interval:
+            return False
+        self._last = now
+        return True
+
+    def state(self, live_chat_id, page_token, seen_ids):
+        """Build the state to pass to :meth:`save` from a SeenIds set."""
+        return {
+            'live_chat_id': live_chat_id,
+            'page_token': page_token,
+            'seen_ids': seen_ids.recent(self.max_ids),
+        }
+
+    def save(self, state):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = dict(state, saved_at=time.time())
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,32 @@
+import json
+
+# liveChatMessages.list error reasons meaning the chat is gone for good
+CHAT_ENDED_REASONS = ("liveChatEnded", "liveChatNotFound", "liveChatDisabled")
+
+
+class ChatEndedError(Exception):
+    """The live chat has ended (or was removed); polling should stop."""
+
+
+def error_reason(exc):
+    """Return the API error ``reason`` of an HttpError, or None."""
+    details = getattr(exc, 'error_details', None)
+    if isinstance(details, list):
+        for detail in details:
+            if isinstance(detail, dict) and detail.get('reason'):
+                return detail['reason']
+    content = getattr(exc, 'content', None)
+    if content:
+        try:
+            body = json.loads(content.decode('utf-8') if isinstance(content, bytes) else content)
+            errors = body.get('error', {}).get('errors', [])
+            if errors:
+                return errors[0].get('reason')
+        except (ValueError, AttributeError):
+            pass
+    return None
+
+
+def is_chat_ended(exc):
+    """True if ``exc`` is an API error saying the chat no longer exists."""
+    return isinstance(exc, ChatEndedError) or error_reason(exc) in CHAT_ENDED_REASONS
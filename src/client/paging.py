@@ -0,0 +1,76 @@
+from collections import deque
+
+
+class SeenIds:
+    """Bounded set of recently delivered message IDs.
+
+    Keeps at most ``maxlen`` IDs; once full, the oldest ID is forgotten as a
+    new one is added.  Page tokens already prevent most re-deliveries, so
+    this only needs to cover the overlap around a reconnect or retry.
+    """
+
+    def __init__(self, maxlen=10000):
+        self.maxlen = maxlen
+        self._order = deque()
+        self._ids = set()
+
+    def __contains__(self, message_id):
+        return message_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def recent(self, n=None):
+        """The most recently added IDs, oldest first (all of them if ``n`` is None)."""
+        if n is None or n >= len(self._order):
+            return list(self._order)
+        return list(self._order)[-n:]
+
+    def add(self, message_id):
+        """Remember ``message_id``; return False if it was already known."""
+        if message_id in self._ids:
+            return False
+        self._ids.add(message_id)
+        self._order.append(message_id)
+        if len(self._order) > self.maxlen:
+            self._ids.discard(self._order.popleft())
+        return True
+
+    def filter_unseen(self, items):
+        """Return the items not delivered yet, without remembering them.
+
+        Call :meth:`mark_delivered` once the items were handed over
+        successfully; until then a refetch returns them again.  Items
+        without an ``id`` (e.g. hand-written test dicts) are always passed
+        through.
+        """
+        fresh = []
+        batch_ids = set()
+        for item in items:
+            message_id = item.get('id') if isinstance(item, dict) else None
+            if message_id is None:
+                fresh.append(item)
+            elif message_id not in self._ids and message_id not in batch_ids:
+                batch_ids.add(message_id)
+                fresh.append(item)
+        return fresh
+
+    def mark_delivered(self, items):
+        """Remember the ``id`` of every item in ``items``."""
+        for item in items:
+            message_id = item.get('id') if isinstance(item, dict) else None
+            if message_id is not None:
+                self.add(message_id)
+
+    def filter_new(self, items):
+        """Return the items whose ``id`` has not been seen yet and mark them.
+
+        Use this when returning the items is the delivery.  Items without
+        an ``id`` (e.g. hand-written test dicts) are always passed through.
+        """
+        fresh = []
+        for item in items:
+            message_id = item.get('id') if isinstance(item, dict) else None
+            if message_id is None or self.add(message_id):
+                fresh.append(item)
+        return fresh
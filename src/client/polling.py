@@ -0,0 +1,55 @@
+class PollScheduler:
+    """Decide how long to wait between ``liveChatMessages.list`` calls.
+
+    The API returns ``pollingIntervalMillis`` with every page; that value is
+    treated as a floor so we never poll faster than YouTube asks.  On top of
+    it the scheduler backs off geometrically while pages come back empty and
+    tightens again as soon as chat picks up.  ``min_interval`` and
+    ``max_interval`` (seconds) bound the result so each deployment can trade
+    quota against latency.
+    """
+
+    def __init__(self, min_interval=5.0, max_interval=30.0, initial_interval=None,
+                 backoff_factor=1.5, hot_threshold=20):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("expected 0 < min_interval <= max_interval")
+        if backoff_factor < 1:
+            raise ValueError("backoff_factor must be >= 1")
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.backoff_factor = float(backoff_factor)
+        self.hot_threshold = hot_threshold
+        if initial_interval is None:
+            initial_interval = self.min_interval
+        self.current = self._clamp(float(initial_interval))
+        self.empty_streak = 0
+
+    def _clamp(self, seconds):
+        return max(self.min_interval, min(self.max_interval, seconds))
+
+    def next_delay(self, message_count, server_interval_ms=None):
+        """Return the number of seconds to sleep before the next poll.
+
+        ``message_count`` is the number of items on the page just fetched and
+        ``server_interval_ms`` the ``pollingIntervalMillis`` that came with it.
+        """
+        server_floor = (server_interval_ms or 0) / 1000.0
+        if message_count == 0:
+            # quiet chat: stretch the interval to save quota
+            self.empty_streak += 1
+            delay = max(self.current, server_floor) * self.backoff_factor
+        elif self.hot_threshold and message_count >= self.hot_threshold:
+            # busy chat: poll as fast as we (and the server) allow
+            self.empty_streak = 0
+            delay = self.min_interval
+        else:
+            # some activity: ease back towards the lower bound
+            self.empty_streak = 0
+            delay = self.current / self.backoff_factor
+        self.current = self._clamp(delay)
+        return max(self.current, server_floor)
+
+    def reset(self):
+        """Forget the backoff state, e.g. after reconnecting to a chat."""
+        self.current = self.min_interval
+        self.empty_streak = 0
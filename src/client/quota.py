@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# quota units per call (YouTube Data API v3 cost table)
+COSTS = {
+    "liveChatMessages.list": 5,
+    "videos.list": 1,
+}
+
+
+def quota_day(now=None):
+    """The quota day (YYYY-MM-DD in Pacific time) that ``now`` falls in."""
+    now = time.time() if now is None else now
+    try:
+        from datetime import datetime
+        from zoneinfo import ZoneInfo
+        return datetime.fromtimestamp(now, ZoneInfo("America/Los_Angeles")).strftime("%Y-%m-%d")
+    except Exception:
+        return time.strftime("%Y-%m-%d", time.gmtime(now))
+
+
+def _key_id(api_key):
+    # never write API keys to disk; a short hash is enough to tell them apart
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class QuotaBudget:
+    """Track quota spent per API key and pace polling to last the day.
+
+    Every API call is charged to a key with :meth:`spend` (see ``COSTS``).
+    Counters start again at the quota reset (midnight Pacific time).  From
+    what is left and how many streams are polling, :meth:`required_interval`
+    works out how far apart polls must be on average for the budget to last
+    until the reset, and :meth:`interval_for` stretches a stream's delay to
+    that: quiet chats get stretched the most so busy ones can keep polling
+    quickly.  The calculation is redone on every poll from the remaining
+    budget, so overspending early simply makes later intervals longer.
+
+    With several keys, :meth:`pick_key` returns the one with the most quota
+    left, and a key that reported ``quotaExceeded`` is skipped until the
+    reset (:meth:`mark_exhausted`).
+
+    Args:
+        keys: API keys to spread calls across.
+        daily_units: quota per key per day.
+        reserve: fraction of each key's quota kept back (e.g. for lookups
+            after a restart).
+        state_path: optional JSON file so a restart mid-day remembers what
+            was already spent (keys are stored as hashes).
+    """
+
+    def __init__(self, keys, daily_units=10000, reserve=0.05, state_path=None,
+                 quiet_factor=2.0, busy_factor=0.5, busy_threshold=20, clock=time.time):
+        self.keys = list(dict.fromkeys(k for k in keys if k))
+        if not self.keys:
+            raise ValueError("QuotaBudget needs at least one API key")
+        self.daily_units = daily_units
+        self.reserve = reserve
+        self.state_path = state_path
+        self.quiet_factor = quiet_factor
+        self.busy_factor = busy_factor
+        self.busy_threshold = busy_threshold
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._streams = 0
+        self._last_save = 0.0
+        self._day = quota_day(clock())
+        self._day_started = clock()
+        self.used = {k: 0 for k in self.keys}
+        self.exhausted = set()
+        self._load()
+
+    @classmethod
+    def from_env(cls, *api_keys, **kwargs):
+        """Build from ``api_keys`` plus YOUTUBE_API_KEYS (comma-separated),
+        CHAT_QUOTA_DAILY_UNITS, CHAT_QUOTA_RESERVE and CHAT_QUOTA_STATE_FILE."""
+        keys = list(api_keys) + os.getenv('YOUTUBE_API_KEYS', '').split(',')
+        kwargs.setdefault('daily_units', int(os.getenv('CHAT_QUOTA_DAILY_UNITS', '10000')))
+        kwargs.setdefault('reserve', float(os.getenv('CHAT_QUOTA_RESERVE', '0.05')))
+        kwargs.setdefault('state_path', os.getenv('CHAT_QUOTA_STATE_FILE') or None)
+        return cls([k.strip() for k in keys if k and k.strip()], **kwargs)
+
+    # -- persistence -------------------------------------------------------
+
+    def _load(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(state, dict) or state.get('day') != self._day:
+            return
+        saved = state.get('used', {})
+        for key in self.keys:
+            self.used[key] = int(saved.get(_key_id(key), 0))
+        self._day_started = state.get('day_started', self._day_started)
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            state = {'day': self._day, 'day_started': self._day_started,
+                     'used': {_key_id(k): v for k, v in self.used.items()}}
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+        self._last_save = self.clock()
+
+    # -- accounting --------------------------------------------------------
+
+    def _roll_over(self, now):
+        # called with self._lock held
+        day = quota_day(now)
+        if day != self._day:
+            self._day = day
+            self._day_started = now
+            self.used = {k: 0 for k in self.keys}
+            self.exhausted.clear()
+
+    def spend(self, api_key, method="liveChatMessages.list", units=None):
+        """Charge one call of ``method`` to ``api_key``."""
+        now = self.clock()
+        with self._lock:
+            self._roll_over(now)
+            self.used[api_key] = self.used.get(api_key, 0) + (units or COSTS.get(method, 1))
+            save = self.state_path and now - self._last_save >= 10
+        if save:
+            try:
+                self.save()
+            except OSError as exc:
+                print(f"[EXCEPTION] Could not save quota state: {exc}")
+
+    def mark_exhausted(self, api_key):
+        """The API said this key is out of quota; skip it until the reset."""
+        with self._lock:
+            self._roll_over(self.clock())
+            self.exhausted.add(api_key)
+
+    def _usable(self, key):
+        return self.daily_units * (1 - self.reserve) - self.used.get(key, 0)
+
+    def remaining(self, api_key=None):
+        """Units left before the reserve, for one key or all of them."""
+        with self._lock:
+            self._roll_over(self.clock())
+            keys = [api_key] if api_key else self.keys
+            return sum(max(0.0, self._usable(k)) for k in keys if k not in self.exhausted)
+
+    def pick_key(self):
+        """The key with the most quota left, or None if all are used up."""
+        with self._lock:
+            self._roll_over(self.clock())
+            candidates = [k for k in self.keys if k not in self.exhausted and self._usable(k) > 0]
+            if not candidates:
+                return None
+            return max(candidates, key=self._usable)
+
+    # -- pacing ------------------------------------------------------------
+
+    def register_stream(self):
+        with self._lock:
+            self._streams += 1
+
+    def unregister_stream(self):
+        with self._lock:
+            self._streams = max(0, self._streams - 1)
+
+    def required_interval(self, now=None):
+        """Average seconds between polls per stream that fits the budget."""
+        from src.client.retry import seconds_until_quota_reset
+        now = self.clock() if now is None else now
+        time_left = seconds_until_quota_reset(now)
+        polls = self.remaining() / COSTS["liveChatMessages.list"]
+        if polls < 1:
+            return time_left
+        return max(1, self._streams) * time_left / polls
+
+    def interval_for(self, delay, message_count):
+        """Stretch a stream's next ``delay`` if the budget requires it."""
+        required = self.required_interval()
+        if message_count >= self.busy_threshold:
+            required *= self.busy_factor
+        elif message_count == 0:
+            required *= self.quiet_factor
+        return max(delay, required)
+
+    def projection(self):
+        """Spend so far today, the burn rate and when the quota would run out."""
+        from src.client.retry import seconds_until_quota_reset
+        now = self.clock()
+        with self._lock:
+            self._roll_over(now)
+            used = sum(self.used.values())
+            elapsed = max(1.0, now - self._day_started)
+        remaining = self.remaining()
+        rate = used / elapsed
+        seconds_left = remaining / rate if rate else None
+        reset_in = seconds_until_quota_reset(now)
+        return {
+            "used": used,
+            "remaining": remaining,
+            "units_per_hour": rate * 3600,
+            "exhausted_in": seconds_left,
+            "reset_in": reset_in,
+            "on_track": seconds_left is None or seconds_left >= reset_in,
+        }
+
+
+def budget_from_env(api_key=None):
+    """A QuotaBudget if CHAT_QUOTA_DAILY_UNITS or YOUTUBE_API_KEYS is set, else None.
+
+    Pacing is opt-in: without a configured budget polling is only bounded
+    by the poll scheduler, as before.
+    """
+    if not (os.getenv('CHAT_QUOTA_DAILY_UNITS') or os.getenv('YOUTUBE_API_KEYS')):
+        return None
+    return QuotaBudget.from_env(api_key)
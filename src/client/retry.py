@@ -0,0 +1,245 @@
+import os
+import random
+import threading
+import time
+
+# error classes returned by classify()
+CHAT_ENDED = "chat_ended"
+QUOTA = "quota"
+RATE_LIMIT = "rate_limit"
+SERVER = "server"
+NETWORK = "network"
+CLIENT = "client"
+
+RETRYABLE = (RATE_LIMIT, SERVER, NETWORK)
+
+QUOTA_REASONS = ("quotaExceeded", "dailyLimitExceeded")
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+
+class QuotaExceededError(Exception):
+    """The API key's daily quota is used up; ``retry_after`` is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Calls are suspended after repeated failures; ``retry_after`` is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def http_status(exc):
+    """Return the HTTP status of a googleapiclient HttpError, or None."""
+    resp = getattr(exc, 'resp', None)
+    status = getattr(resp, 'status', None) or getattr(exc, 'status_code', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(exc):
+    """Sort an exception from an API call into one of the error classes.
+
+    Anything that isn't recognisably an API answer (no HTTP status) is
+    treated as a network problem and retried, which is what the old fixed
+    retry loop did for every error.  Only pass exceptions raised by the API
+    request itself: a bug or a closed handler would otherwise be retried
+    forever as a "network" error.
+    """
+    from src.client.errors import error_reason, is_chat_ended
+    if is_chat_ended(exc):
+        return CHAT_ENDED
+    if isinstance(exc, QuotaExceededError):
+        return QUOTA
+    reason = error_reason(exc)
+    if reason in QUOTA_REASONS:
+        return QUOTA
+    if reason in RATE_LIMIT_REASONS:
+        return RATE_LIMIT
+    status = http_status(exc)
+    if status is None:
+        return NETWORK
+    if status == 429:
+        return RATE_LIMIT
+    if status >= 500:
+        return SERVER
+    return CLIENT
+
+
+def seconds_until_quota_reset(now=None):
+    """Seconds until YouTube's daily quota resets (midnight Pacific time)."""
+    try:
+        from datetime import datetime, timedelta
+        from zoneinfo import ZoneInfo
+        pacific = ZoneInfo("America/Los_Angeles")
+    except Exception:
+        # no tz database (e.g. Windows without tzdata): check back hourly
+        return 3600.0
+    current = datetime.fromtimestamp(time.time() if now is None else now, pacific)
+    midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(60.0, (midnight - current).total_seconds())
+
+
+class CircuitBreaker:
+    """Stop calling an API that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    :meth:`before_call` raises CircuitOpenError for ``reset_timeout``
+    seconds.  Then one trial call is let through (half-open): success
+    closes the circuit, failure opens it again.  Other callers keep getting
+    CircuitOpenError (with a short ``retry_after``) while the trial runs.
+    """
+
+    # how long callers wait while a half-open trial call is in flight
+    TRIAL_WAIT = 1.0
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError if calls are suspended.
+
+        Returns True if the caller was let through as the half-open trial;
+        it must then end with record_success, record_failure or release.
+        """
+        with self._lock:
+            state = self.state
+            if state == "open":
+                remaining = self.reset_timeout - (self.clock() - self.opened_at)
+                raise CircuitOpenError(
+                    f"circuit open after {self.failures} consecutive failures", remaining)
+            if state == "half-open":
+                if self._trial:
+                    raise CircuitOpenError("circuit half-open, trial call in progress",
+                                           min(self.TRIAL_WAIT, self.reset_timeout))
+                self._trial = True
+                return True
+        return False
+
+    def release(self):
+        """End a call that neither succeeded nor failed transiently (e.g. a 4xx)."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._trial = False
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._trial = False
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # (re)open; a failed half-open trial starts a fresh timeout
+                self.opened_at = self.clock()
+
+
+class RetryPolicy:
+    """Run API calls with classified retries, backoff and a circuit breaker.
+
+    * rate limits, 5xx and network errors are retried up to ``max_attempts``
+      times with exponential backoff and full jitter (a random delay between
+      0 and ``base_delay * 2 ** attempt``, capped at ``max_delay``);
+    * a quota error raises QuotaExceededError right away with the time
+      until the daily reset, since retrying only burns more quota;
+    * "chat ended" and other 4xx errors are raised immediately.
+
+    Every transient failure counts towards the circuit breaker; while it is
+    open, calls fail fast with CircuitOpenError instead of reaching the API.
+
+    ``from_env`` reads CHAT_RETRY_ATTEMPTS, CHAT_RETRY_BASE_SECONDS and
+    CHAT_RETRY_MAX_SECONDS.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0, breaker=None,
+                 sleep=time.sleep, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        kwargs.setdefault('max_attempts', int(os.getenv('CHAT_RETRY_ATTEMPTS', '4')))
+        kwargs.setdefault('base_delay', float(os.getenv('CHAT_RETRY_BASE_SECONDS', '1')))
+        kwargs.setdefault('max_delay', float(os.getenv('CHAT_RETRY_MAX_SECONDS', '60')))
+        return cls(**kwargs)
+
+    def backoff(self, attempt, kind=None):
+        """Delay before retry number ``attempt`` (0-based)."""
+        base = self.base_delay * (4 if kind == RATE_LIMIT else 1)
+        return self.rng.uniform(0, min(self.max_delay, base * (2 ** attempt)))
+
+    def call(self, func, *args, description="API call", **kwargs):
+        """Return ``func(*args, **kwargs)``, retrying transient failures.
+
+        With metrics enabled every attempt's latency is recorded under
+        ``description`` (the API method name) and failures are counted by
+        error class.
+        """
+        from src.utils import metrics
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call() if self.breaker else False
+            start = time.perf_counter() if metrics.ENABLED else None
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as exc:
+                if not isinstance(exc, Exception):
+                    # interrupted: don't leave a half-open trial pending
+                    if trial:
+                        self.breaker.release()
+                    raise
+                kind = classify(exc)
+                if start is not None:
+                    metrics.observe("chat_api_call_seconds", time.perf_counter() - start,
+                                    method=description)
+                    metrics.inc("chat_api_errors_total", method=description, kind=kind)
+                if kind not in RETRYABLE:
+                    if trial:
+                        self.breaker.release()
+                    if kind == QUOTA and not isinstance(exc, QuotaExceededError):
+                        raise QuotaExceededError(
+                            f"{description}: daily quota exceeded", seconds_until_quota_reset()
+                        ) from exc
+                    raise
+                if self.breaker:
+                    self.breaker.record_failure()
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt - 1, kind)
+                print(f"[EXCEPTION] {description} failed ({kind}, attempt {attempt}): {exc}; "
+                      f"retrying in {delay:.1f}s")
+                self.sleep(delay)
+            else:
+                if start is not None:
+                    metrics.observe("chat_api_call_seconds", time.perf_counter() - start,
+                                    method=description)
+                if self.breaker:
+                    self.breaker.record_success()
+                return result
@@ -0,0 +1,113 @@
+import os
+import threading
+
+# one httplib2.Http per thread: Http objects are not thread-safe, but a
+# per-thread instance still keeps its connection alive between polls
+_local = threading.local()
+
+# process-wide service objects, one per API key (see get_service)
+_services = {}
+_services_lock = threading.Lock()
+
+
+def _thread_http():
+    http = getattr(_local, 'http', None)
+    if http is None:
+        import httplib2
+        http = _local.http = httplib2.Http(timeout=30)
+    return http
+
+
+def _request_builder(http, *args, **kwargs):
+    from googleapiclient.http import HttpRequest
+    return HttpRequest(_thread_http(), *args, **kwargs)
+
+
+def discovery_cache_path():
+    """Where the YouTube v3 discovery document is cached on disk.
+
+    Set YOUTUBE_DISCOVERY_CACHE to move it (or to point tests at a fixture).
+    """
+    env = os.getenv('YOUTUBE_DISCOVERY_CACHE')
+    if env:
+        return env
+    return os.path.join(os.path.expanduser('~'), '.cache', 'youtube-chat-python',
+                        'youtube.v3.discovery.json')
+
+
+def load_discovery_document(cache_path=None):
+    """Return the discovery document as a string, caching it on disk.
+
+    The cached copy is used when present, so no network (and no lookup in
+    googleapiclient's bundled documents) is needed at startup.  Otherwise
+    the document bundled with googleapiclient is used, falling back to a
+    download for client versions that don't ship one.
+    """
+    cache_path = cache_path or discovery_cache_path()
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        pass
+
+    doc = None
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        doc = get_static_doc('youtube', 'v3')
+    except ImportError:
+        pass
+    if doc is None:
+        import httplib2
+        from googleapiclient.discovery import DISCOVERY_URI
+        url = DISCOVERY_URI.format(api='youtube', apiVersion='v3')
+        resp, content = httplib2.Http(timeout=30).request(url)
+        if resp.status >= 400:
+            raise RuntimeError(f"Could not download discovery document: HTTP {resp.status}")
+        doc = content.decode('utf-8')
+
+    try:
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = cache_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(doc)
+        os.replace(tmp, cache_path)
+    except OSError:
+        # caching is an optimisation; a read-only home is not an error
+        pass
+    return doc
+
+
+def build_service(api_key, discovery_doc=None, api_endpoint=None):
+    """Build a YouTube Data API service object that threads can share.
+
+    The discovery document is parsed once; every request made through the
+    service runs on the calling thread's own HTTP connection, so worker
+    threads polling different chats never share an ``httplib2.Http``.
+    ``api_endpoint`` points the service at another server, e.g. the fake
+    API in ``src.testing.fake_api``.
+    """
+    from googleapiclient.discovery import build_from_document
+    if discovery_doc is None:
+        discovery_doc = load_discovery_document()
+    client_options = {'api_endpoint': api_endpoint} if api_endpoint else None
+    return build_from_document(discovery_doc, developerKey=api_key,
+                               requestBuilder=_request_builder,
+                               client_options=client_options)
+
+
+def get_service(api_key):
+    """Return the process-wide service object for ``api_key``.
+
+    Built lazily on first use and then shared by YouTubeChat,
+    YouTubeClient and StreamSupervisor, so startup pays for one build.
+    Set YOUTUBE_API_ENDPOINT to send every call to another server (for
+    load tests against the fake API).
+    """
+    api_endpoint = os.getenv('YOUTUBE_API_ENDPOINT') or None
+    with _services_lock:
+        service = _services.get((api_key, api_endpoint))
+        if service is None:
+            service = _services[(api_key, api_endpoint)] = build_service(
+                api_key, api_endpoint=api_endpoint)
+        return service
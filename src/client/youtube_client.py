@@ -1,28 +1,126 @@
 import os
 
 class YouTubeClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, service=None, debug_dump=None, cache_ttl=None, retry=None,
+                 quota=None):
+        """Wrap the YouTube Data API for chat lookups.
+
+        ``debug_dump`` writes each ``videos.list`` response to
+        youtube_api_response.json; it defaults to the YOUTUBE_DEBUG_DUMP
+        environment variable and is off otherwise.  ``cache_ttl`` (seconds)
+        bounds how long cached chat IDs are trusted; defaults to
+        CHAT_ID_CACHE_TTL or 6 hours.  ``retry`` is the RetryPolicy used for
+        API calls (default: ``RetryPolicy.from_env()``); with ``quota`` (a
+        QuotaBudget) every attempt is charged to it and calls are spread over
+        its API keys, like YouTubeChat does.
+        """
         self.api_key = api_key
-        self.service = self.authenticate()
+        if debug_dump is None:
+            debug_dump = os.getenv('YOUTUBE_DEBUG_DUMP', '').lower() in ('1', 'true', 'yes')
+        self.debug_dump = debug_dump
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv('CHAT_ID_CACHE_TTL', str(6 * 3600)))
+        self.cache_ttl = cache_ttl
+        if retry is None:
+            from src.client.retry import RetryPolicy
+            retry = RetryPolicy.from_env()
+        self.retry = retry
+        self.quota = quota
+        # reuse an existing service object when given one, so lookups don't
+        # parse the discovery document again; otherwise it is built on first
+        # use, so a client that never calls the API costs nothing
+        self._service_obj = service
+        # per-chat `nextPageToken` and delivered message IDs, so repeated
+        # calls to get_chat_messages only return new messages
+        self._page_tokens = {}
+        self._seen_ids = {}
+        # services for the budget's other API keys, built on first use
+        self._services = {}
+
+    @property
+    def service(self):
+        if self._service_obj is None:
+            self._service_obj = self.authenticate()
+        return self._service_obj
+
+    @service.setter
+    def service(self, service):
+        self._service_obj = service
 
     def authenticate(self):
-        from googleapiclient.discovery import build
-        return build('youtube', 'v3', developerKey=self.api_key)
+        from src.client.service import get_service
+        return get_service(self.api_key)
+
+    def _pick_key(self):
+        """API key for the next call: ours, or the budget's best key."""
+        if self.quota is None:
+            return self.api_key
+        key = self.quota.pick_key()
+        if key is None:
+            from src.client.retry import QuotaExceededError, seconds_until_quota_reset
+            raise QuotaExceededError("all API keys are out of quota", seconds_until_quota_reset())
+        return key
+
+    def _service(self, key):
+        if key == self.api_key:
+            return self.service
+        service = self._services.get(key)
+        if service is None:
+            from src.client.service import get_service
+            service = self._services[key] = get_service(key)
+        return service
+
+    def _call(self, method, make_request):
+        """Run ``make_request(service).execute()`` with retries and the quota budget.
+
+        Every attempt, retries included, is charged to the key it used; a
+        key the API reports as out of quota is skipped until the reset.
+        """
+        from src.client.retry import QuotaExceededError
+        while True:
+            key = self._pick_key()
+            request = make_request(self._service(key))
+
+            def execute():
+                if self.quota is not None:
+                    self.quota.spend(key, method)
+                return request.execute()
+
+            try:
+                return self.retry.call(execute, description=method)
+            except QuotaExceededError:
+                if self.quota is None:
+                    raise
+                self.quota.mark_exhausted(key)
 
     def connect(self):
-        """Return True if the underlying service object was created."""
+        """Build the service object if needed; True if that worked."""
         return self.service is not None
 
+    def _chat_id_cache(self, cache_file):
+        from src.client.chat_id_cache import ChatIdCache
+        return ChatIdCache(cache_file, ttl=self.cache_ttl)
+
     def get_live_chat_id(self, video_id, cache_file=None):
-        """Return the live chat ID for a video. Caching is disabled."""
+        """Return the live chat ID for a video.
+
+        With ``cache_file`` the ID is looked up there first and stored after
+        a successful lookup (see ChatIdCache); entries expire after
+        ``cache_ttl`` and are removed by invalidate_live_chat_id.
+        """
+        if cache_file:
+            cached = self._chat_id_cache(cache_file).get(video_id)
+            if cached:
+                return cached
         try:
-            request = self.service.videos().list(part='liveStreamingDetails', id=video_id)
-            response = request.execute()
-            # Store the API response in a file for debugging
-            import json
-            with open("youtube_api_response.json", "w", encoding="utf-8") as f:
-                json.dump(response, f, ensure_ascii=False, indent=2)
-            # print("[DEBUG] YouTube API response for liveStreamingDetails written to youtube_api_response.json")
+            response = self._call(
+                "videos.list",
+                lambda service: service.videos().list(part='liveStreamingDetails', id=video_id))
+            if self.debug_dump:
+                # Store the API response in a file for debugging
+                import json
+                with open("youtube_api_response.json", "w", encoding="utf-8") as f:
+                    json.dump(response, f, ensure_ascii=False, indent=2)
             items = response.get('items', [])
             if not items:
                 print(f"[ERROR] No video found with ID '{video_id}'. Please check the video ID and try again.")
@@ -38,6 +136,8 @@ class YouTubeClient:
                 else:
                     print("[ERROR] Live chat is not available for this video. It may be disabled or ended.")
                     raise ValueError("Live chat is not available for this video. It may be disabled or ended.")
+            if cache_file:
+                self._chat_id_cache(cache_file).put(video_id, live_chat_id)
             return live_chat_id
         except Exception as exc:
             print(f"[EXCEPTION] Exception in get_live_chat_id: {exc}")
@@ -45,19 +145,34 @@ class YouTubeClient:
             traceback.print_exc()
             raise
 
+    def invalidate_live_chat_id(self, cache_file, video_id=None, live_chat_id=None):
+        """Drop a cached chat ID, e.g. once the API reports the chat ended."""
+        if cache_file:
+            self._chat_id_cache(cache_file).invalidate(video_id=video_id, live_chat_id=live_chat_id)
+
     def get_chat_messages(self, live_chat_id=None):
         """Fetch chat messages for a given live chat ID.
 
+        Each call continues from the page token returned by the previous one,
+        so only messages that have not been returned before are included.
+        Returning the list counts as delivery: callers that may fail to
+        process it should use ``YouTubeChat.fetch_page``/``commit_page``.
         If no ID is provided (e.g. during testing) return an empty list.
         """
         if live_chat_id is None:
             return []
 
-        request = self.service.liveChatMessages().list(
-            liveChatId=live_chat_id, part='snippet,authorDetails'
-        )
-        response = request.execute()
-        return response.get('items', [])
+        from src.client.paging import SeenIds
+        params = {'liveChatId': live_chat_id, 'part': 'snippet,authorDetails'}
+        page_token = self._page_tokens.get(live_chat_id)
+        if page_token:
+            params['pageToken'] = page_token
+        response = self._call("liveChatMessages.list",
+                              lambda service: service.liveChatMessages().list(**params))
+        if response.get('nextPageToken'):
+            self._page_tokens[live_chat_id] = response['nextPageToken']
+        seen = self._seen_ids.setdefault(live_chat_id, SeenIds())
+        return seen.filter_new(response.get('items', []))
 
     def close(self):
         # Placeholder for any cleanup if necessary
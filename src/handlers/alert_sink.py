@@ -0,0 +1,67 @@
+import json
+import time
+
+from src.handlers.filters import RulesFile
+from src.handlers.sinks import Sink
+
+
+class AlertSink(Sink):
+    """Match every message against a rules file and record the hits.
+
+    Each batch is run through the compiled rules (see
+    ``src.handlers.filters``); a message that fires at least one rule is
+    appended to ``path`` as a JSON line with the rules and terms it hit, and
+    passed to ``on_alert(message, matches)`` if given.  Messages that match
+    nothing - nearly all of them - cost one automaton pass and, if the file
+    has patterns, one regex search.
+
+    The rules file is watched while the sink runs: edits are picked up
+    within ``reload_interval`` seconds without restarting the collector.
+    """
+
+    name = "alerts"
+
+    def __init__(self, rules, path=None, reload_interval=2.0, on_alert=None):
+        self.rules = rules if isinstance(rules, RulesFile) else RulesFile(rules, reload_interval)
+        self.path = path
+        self.on_alert = on_alert
+        self.count = 0
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+
+    def write_batch(self, messages):
+        from src.utils import metrics
+        match = self.rules.current().match
+        lines = []
+        for m in messages:
+            matches = match(m.text)
+            if not matches:
+                continue
+            self.count += 1
+            if self._file is not None:
+                lines.append(json.dumps({
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "id": m.id,
+                    "published_at": m.published_at,
+                    "author": m.author,
+                    "channel_id": m.channel_id,
+                    "text": m.text,
+                    "rules": sorted({rule for rule, _ in matches}),
+                    "terms": [term for _, term in matches],
+                }, ensure_ascii=False))
+            if self.on_alert is not None:
+                try:
+                    self.on_alert(m, matches)
+                except Exception as exc:
+                    print(f"[EXCEPTION] Alert callback failed: {exc}")
+            if metrics.ENABLED:
+                for rule in {rule for rule, _ in matches}:
+                    metrics.inc("chat_alerts_total", rule=rule)
+        if lines:
+            # alerts are rare and wanted promptly, so they aren't buffered
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
@@ -0,0 +1,184 @@
+import hashlib
+import math
+import re
+import threading
+import time
+
+
+class SlidingWindowCounter:
+    """Count events over the last ``window`` seconds in fixed memory.
+
+    Events land in one of ``window / resolution`` buckets in a ring; a bucket
+    is cleared when time wraps around to it, so old counts fall out without
+    keeping per-event timestamps.
+    """
+
+    def __init__(self, window=60.0, resolution=1.0):
+        self.window = window
+        self.resolution = resolution
+        self._size = max(1, int(math.ceil(window / resolution)))
+        self._counts = [0] * self._size
+        self._slots = [None] * self._size
+
+    def add(self, n=1, now=None):
+        slot = int((time.time() if now is None else now) // self.resolution)
+        i = slot % self._size
+        if self._slots[i] != slot:
+            self._slots[i] = slot
+            self._counts[i] = 0
+        self._counts[i] += n
+
+    def count(self, now=None):
+        """Events in the window ending at ``now``."""
+        current = int((time.time() if now is None else now) // self.resolution)
+        oldest = current - self._size + 1
+        return sum(c for c, s in zip(self._counts, self._slots)
+                   if s is not None and oldest <= s <= current)
+
+    def rate_per_minute(self, now=None, elapsed=None):
+        """Average rate over the window, or over ``elapsed`` seconds if shorter."""
+        span = self._size * self.resolution
+        if elapsed is not None:
+            span = max(min(span, elapsed), self.resolution)
+        return self.count(now) * 60.0 / span
+
+
+class SpaceSaving:
+    """Approximate top-K heavy hitters (Metwally et al.'s Space-Saving).
+
+    Tracks at most ``capacity`` keys.  A new key evicts the smallest counter
+    and inherits its count, which bounds the over-estimate of any reported
+    count by that inherited ``error``; every key seen more than
+    ``total / capacity`` times is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, key, n=1):
+        if key in self.counts:
+            self.counts[key] += n
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = n
+            self.errors[key] = 0
+            return
+        victim = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(victim)
+        del self.errors[victim]
+        self.counts[key] = floor + n
+        self.errors[key] = floor
+
+    def top(self, n=10):
+        """``[(key, count, error), ...]`` for the ``n`` largest counts."""
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+
+class HyperLogLog:
+    """Estimate distinct counts in ``2 ** precision`` bytes.
+
+    The standard error is about ``1.04 / sqrt(2 ** precision)``: 1.6% with
+    the default 4 KiB of registers.
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        if self.m >= 128:
+            self._alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self._alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    def add(self, value):
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        estimate = self._alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # small-range correction: linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class ChatAnalytics:
+    """Live chat statistics maintained incrementally in bounded memory.
+
+    Fed with ``ChatMessage`` records (``ChatHandler(analytics=...)`` does
+    this for every batch), it keeps messages per minute over a short and a
+    long sliding window, the top authors (Space-Saving), the number of
+    distinct authors (HyperLogLog) and counts for a fixed set of keywords.
+    :meth:`snapshot` can be called from any thread at any time; nothing is
+    rescanned, and memory does not grow with the length of the session.
+
+    Rates are by arrival time, i.e. when the poller delivered the message.
+    """
+
+    def __init__(self, keywords=(), top_k=100, short_window=60.0, long_window=600.0,
+                 hll_precision=12):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.started = time.time()
+        self.short = SlidingWindowCounter(short_window, 1.0)
+        self.long = SlidingWindowCounter(long_window, 10.0)
+        self.authors = SpaceSaving(top_k)
+        self.unique = HyperLogLog(hll_precision)
+        self.keywords = {k.lower(): 0 for k in keywords if k}
+        # casefolded text of a match -> its key in self.keywords; the matched
+        # text itself may differ from the key in case (e.g. "STRAßE")
+        self._keyword_keys = {k.casefold(): k for k in self.keywords}
+        self._keyword_re = None
+        if self.keywords:
+            # lookarounds rather than \b, so keywords that start or end with
+            # punctuation (":yt:", "!raid", "<3") can match too
+            self._keyword_re = re.compile(
+                r"(?<!\w)(" + "|".join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True))
+                + r")(?!\w)", re.IGNORECASE)
+
+    def add_batch(self, messages, now=None):
+        """Account for a batch of ``ChatMessage`` records received at ``now``."""
+        if not messages:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self.total += len(messages)
+            self.short.add(len(messages), now)
+            self.long.add(len(messages), now)
+            for m in messages:
+                self.authors.add(m.author)
+                # display names are neither unique nor stable; channel IDs are
+                self.unique.add(m.channel_id or m.author)
+                if self._keyword_re:
+                    for match in self._keyword_re.findall(m.text):
+                        key = self._keyword_keys.get(match.casefold())
+                        if key is not None:
+                            self.keywords[key] += 1
+
+    def add(self, author, text, now=None):
+        from src.handlers.message import ChatMessage
+        self.add_batch([ChatMessage(author, text)], now)
+
+    def snapshot(self, top=10, now=None):
+        """Return the current statistics as a plain dict."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return {
+                "total": self.total,
+                "uptime_seconds": now - self.started,
+                "per_minute_short": self.short.rate_per_minute(now, now - self.started),
+                "per_minute_long": self.long.rate_per_minute(now, now - self.started),
+                "unique_authors": self.unique.count(),
+                "top_authors": self.authors.top(top),
+                "keywords": dict(self.keywords),
+            }
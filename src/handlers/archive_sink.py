@@ -0,0 +1,132 @@
+import gzip
+import json
+import os
+import time
+import zlib
+
+from src.handlers.sinks import Sink
+
+GZIP_MAGIC = b'\x1f\x8b\x08'
+
+
+class ArchiveSink(Sink):
+    """Append raw ``liveChatMessages`` items to a gzipped JSONL file.
+
+    Every item is stored exactly as the API returned it (one JSON object per
+    line), so nothing the other outputs drop - badges, super chat details,
+    message types - is lost, and the archive can be replayed later with
+    ``python -m src.testing.fake_api --replay``.
+
+    Lines collect in memory and each :meth:`flush` appends them as one
+    complete gzip member; ``gzip`` readers treat consecutive members as a
+    single stream.  The file is therefore valid after every flush, and a
+    crash can at worst leave a torn last member, which :func:`read_archive`
+    skips.  Flushes happen at most every ``flush_interval`` seconds while
+    writing, or once ``max_buffer`` bytes are waiting (``flush_interval=0``
+    flushes after every batch); :meth:`sync` also fsyncs the file.
+    """
+
+    name = "archive"
+    raw = True
+
+    def __init__(self, path, compresslevel=6, flush_interval=5.0, max_buffer=1024 * 1024):
+        self.path = path
+        self.compresslevel = compresslevel
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._last_flush = time.monotonic()
+        self._buffer = []
+        self._buffered = 0
+        self._file = open(path, 'ab')
+
+    def write_batch(self, items):
+        if self._file is None or not items:
+            return
+        for item in items:
+            line = json.dumps(item, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            self._buffer.append(line)
+            self._buffered += len(line) + 1
+        if (self._buffered >= self.max_buffer
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self._file is not None and self._buffer:
+            data = b'\n'.join(self._buffer) + b'\n'
+            self._file.write(gzip.compress(data, self.compresslevel, mtime=0))
+            self._file.flush()
+            self._buffer = []
+            self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def sync(self):
+        """Flush and fsync, so the data survives a power cut as well."""
+        self.flush()
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self.flush()
+            finally:
+                self._file.close()
+        self._file = None
+
+
+def _next_member(f, start):
+    """Offset of the next gzip header at or after ``start``, or None."""
+    f.seek(start)
+    offset = start
+    tail = b''
+    while True:
+        chunk = f.read(1 << 16)
+        if not chunk:
+            return None
+        data = tail + chunk
+        i = data.find(GZIP_MAGIC)
+        if i >= 0:
+            return offset - len(tail) + i
+        tail = data[-(len(GZIP_MAGIC) - 1):]
+        offset += len(chunk)
+
+
+def read_archive(path):
+    """Yield the items of an archive written by ArchiveSink.
+
+    Damage from a crash - a torn gzip member, possibly followed by members
+    appended after a restart - is skipped and reading carries on at the
+    next intact member.  Nothing in a torn member was covered by a
+    checkpoint yet, so a resumed session fetches those messages again.
+    """
+    with open(path, 'rb') as f:
+        pos = _next_member(f, 0)
+        while pos is not None:
+            f.seek(pos)
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            consumed = 0
+            pending = b''
+            while not decoder.eof:
+                chunk = f.read(1 << 16)
+                if not chunk:
+                    break
+                try:
+                    out = decoder.decompress(chunk)
+                except zlib.error:
+                    break
+                consumed += len(chunk)
+                pending += out
+                lines = pending.split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+            if decoder.eof:
+                pos += consumed - len(decoder.unused_data)
+                if pending.strip():
+                    # a member always ends with a newline; be lenient anyway
+                    yield json.loads(pending)
+                pos = _next_member(f, pos)
+            else:
+                # torn member: resynchronise on the next header
+                pos = _next_member(f, pos + 1)
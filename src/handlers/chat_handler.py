@@ -1,178 +1,151 @@
-import logging
-import os
+import threading
 import time
 
 class ChatHandler:
     # ...existing code...
-    def __init__(self, youtube_client, ui=None, log_file="chat.log", db_path=None, csv_path=None, xlsx_path=None):
+    def __init__(self, youtube_client, ui=None, log_file="chat.log", db_path=None, csv_path=None, xlsx_path=None,
+                 db_synchronous=None, db_wal=True, csv_buffer_size=None, csv_flush_interval=None,
+                 analytics=None, archive_path=None, sinks=None):
         """Create a handler tied to a YouTube client.
 
         Args:
             youtube_client: the YouTubeClient instance (may be unused).
             ui: optional object with ``append_message(author, text)`` method.
-            log_file: path for a simple text logfile (uses ``logging``). By default, logs are written to Logs/TXT/chat [TIMESTAMP].log
+            log_file: path for a simple text logfile (uses ``logging``); ``None`` disables it. By default, logs are written to Logs/TXT/chat [TIMESTAMP].log
             db_path: if provided, each message will also be stored in an SQLite database at this path (creates a ``messages`` table). By default, Logs/ChatDatabase/chat [TIMESTAMP].db
             csv_path: path for CSV output. By default, Logs/Chat Principal/chat [TIMESTAMP].csv (or chat.csv for non-versioned runs)
+            xlsx_path: path for a streamed Excel export with emotes kept (requires openpyxl; written on close). By default, Logs/Chat principal com emotes/chat [TIMESTAMP].xlsx
+            db_synchronous: SQLite ``PRAGMA synchronous`` level; defaults to the CHAT_DB_SYNCHRONOUS environment variable or ``NORMAL``.
+            db_wal: open the database in write-ahead-logging mode.
+            csv_buffer_size: CSV write buffer in bytes; defaults to CHAT_CSV_BUFFER_SIZE or 64 KiB.
+            csv_flush_interval: seconds between CSV flushes (0 flushes every batch); defaults to CHAT_CSV_FLUSH_SECONDS or 1.
+            analytics: optional ``ChatAnalytics`` (or anything with ``add_batch``) updated with every batch.
+            archive_path: path for a gzipped JSONL archive of the raw API items (see ``ArchiveSink``). By default, Logs/Raw/chat [TIMESTAMP].jsonl.gz
+            sinks: outputs as ``{name: options or Sink}`` (see ``src.handlers.sinks``).  The arguments above are shorthands that add the matching entry when it isn't configured here already.
         """
+        from src.handlers.sinks import build_sinks
+        # serializes writes against close() so a shutdown from another
+        # thread never tears a sink down in the middle of a batch
+        self._lock = threading.Lock()
+        self._closed = False
+        self.sinks = {}
         self.youtube_client = youtube_client
-        self.ui = ui
-        self.log_file = log_file
-        self.db_path = db_path
-
-        # configure file logger
-        self.logger = logging.getLogger("youtube_chat")
-        self.logger.setLevel(logging.INFO)
-        if not any(isinstance(h, logging.FileHandler) and h.baseFilename == self.log_file
-                   for h in self.logger.handlers):
-            # force UTF-8 encoding for the log file so emoji and non-ASCII
-            # characters don't raise UnicodeEncodeError on Windows
-            handler = logging.FileHandler(self.log_file, encoding="utf-8")
-            formatter = logging.Formatter("%(asctime)s - %(message)s")
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
-
-        # open or initialize database if requested
-        if self.db_path:
-            import sqlite3
-            self._db_conn = sqlite3.connect(self.db_path)
-            self._db_conn.execute(
-                """CREATE TABLE IF NOT EXISTS messages
-                   (timestamp TEXT, author TEXT, text TEXT)"""
-            )
-            self._db_conn.commit()
-        else:
-            self._db_conn = None
 
-        # prepare CSV logging if requested
-        self.csv_path = csv_path
-        self._csv_file = None
-        self._csv_writer = None
-        if self.csv_path:
-            import csv
-            import locale
-            # Allow explicit override via environment variable for edge cases
-            csv_delimiter = os.getenv('CHAT_CSV_DELIMITER')
-            if not csv_delimiter:
-                # Prefer semicolon only for the default chat.csv on Windows.
-                # For custom filenames (used in tests) keep comma to avoid
-                # surprising callers.
-                if os.name == 'nt' and os.path.basename(self.csv_path) == 'chat.csv':
-                    csv_delimiter = ';'
-                else:
-                    # choose delimiter according to locale decimal separator:
-                    # many locales that use comma as decimal point expect
-                    # semicolon as CSV separator in Excel (e.g., pt-BR).
-                    dec = locale.localeconv().get('decimal_point', '.')
-                    csv_delimiter = ';' if dec == ',' else ','
-
-            file_exists = os.path.exists(self.csv_path)
-            # If the file doesn't exist yet, create it with a UTF-8 BOM so
-            # Excel on Windows recognises the encoding and shows Portuguese
-            # characters correctly. Use 'utf-8' for appends to avoid writing
-            # another BOM.
-            if file_exists:
-                try:
-                    self._csv_file = open(self.csv_path, 'a', newline='', encoding='utf-8')
-                except PermissionError:
-                    # file may be locked by Excel or another process; silently
-                    # disable CSV writing so the application doesn't crash.
-                    self._csv_file = None
-                    self._csv_writer = None
-            else:
-                # Only write a UTF-8 BOM when using the default CSV filename
-                # (chat.csv). This helps Excel on Windows detect UTF-8 but
-                # avoids surprising tests or callers who provide a custom
-                # filename.
-                if os.path.basename(self.csv_path) == "chat.csv":
-                    # 'utf-8-sig' writes a BOM at the start of the file
-                    self._csv_file = open(self.csv_path, 'w', newline='', encoding='utf-8-sig')
-                else:
-                    self._csv_file = open(self.csv_path, 'w', newline='', encoding='utf-8')
-            # use the selected delimiter; quoting left at minimal level
-            if self._csv_file:
-                self._csv_writer = csv.writer(self._csv_file, delimiter=csv_delimiter, quoting=csv.QUOTE_MINIMAL)
-                if not file_exists:
-                    # write header (uppercase for easier scanning)
-                    self._csv_writer.writerow(["AUTHOR", "MESSAGE"])
-                    self._csv_file.flush()
-            else:
-                # If the file already existed but uses a different delimiter
-                # (common when switching locales), attempt a gentle conversion
-                # so Excel will split columns correctly for this locale.
-                try:
-                    with open(self.csv_path, 'r', encoding='utf-8-sig', newline='') as f:
-                        first = f.readline()
-                    # if the file's header contains a comma but our locale
-                    # expects semicolons, convert the file
-                    if csv_delimiter == ';' and ',' in first and ';' not in first:
-                        # read with comma and rewrite with semicolon
-                        with open(self.csv_path, 'r', encoding='utf-8-sig', newline='') as fr:
-                            reader = csv.reader(fr, delimiter=',')
-                            rows = list(reader)
-                        with open(self.csv_path, 'w', encoding='utf-8-sig', newline='') as fw:
-                            writer = csv.writer(fw, delimiter=';')
-                            writer.writerows(rows)
-                        # reopen in append mode for future writes
-                        # If we couldn't open the file earlier (locked), skip
-                        # reopening and leave writer disabled.
-                        try:
-                            if self._csv_file is not None:
-                                self._csv_file.close()
-                            self._csv_file = open(self.csv_path, 'a', newline='', encoding='utf-8')
-                            self._csv_writer = csv.writer(self._csv_file, delimiter=csv_delimiter, quoting=csv.QUOTE_MINIMAL)
-                        except Exception:
-                            self._csv_file = None
-                            self._csv_writer = None
-                except Exception:
-                    # conversion is best-effort; ignore failures and continue
-                    pass
+        config = dict(sinks or {})
+        legacy = {
+            "log": log_file and {"path": log_file},
+            "csv": csv_path and {"path": csv_path, "buffer_size": csv_buffer_size,
+                                 "flush_interval": csv_flush_interval},
+            "xlsx": xlsx_path and {"path": xlsx_path},
+            "sqlite": db_path and {"path": db_path, "synchronous": db_synchronous, "wal": db_wal},
+            "archive": archive_path and {"path": archive_path},
+            "analytics": analytics and {"analytics": analytics},
+            "ui": ui and {"ui": ui},
+        }
+        for name, options in legacy.items():
+            if options and name not in config:
+                config[name] = options
+        self.sinks = build_sinks(config)
+        # sinks that take ChatMessage records; the rest get the raw items
+        self._parsed_sinks = any(not getattr(s, "raw", False) for s in self.sinks.values())
+        # outputs already reported as failing, so a broken disk doesn't
+        # print the same error for every batch
+        self._failing = set()
+
+        # attributes older callers and the tests look at
+        log = self.sinks.get("log")
+        self.logger = getattr(log, "logger", None)
+        self.log_file = getattr(log, "path", None)
+        self.csv_path = getattr(self.sinks.get("csv"), "path", None)
+        self.xlsx_path = getattr(self.sinks.get("xlsx"), "path", None)
+        self.db_path = getattr(self.sinks.get("sqlite"), "db_path", None)
+        self._db_conn = getattr(self.sinks.get("sqlite"), "conn", None)
+        self.archive_path = getattr(self.sinks.get("archive"), "path", None)
+        self.analytics = getattr(self.sinks.get("analytics"), "analytics", None)
+        self.ui = getattr(self.sinks.get("ui"), "ui", None)
 
     def process_message(self, message):
         """Log and optionally display an incoming message.
 
         Normalizes both API-style messages and the simple dict used by tests.
         """
-        author = None
-        text = None
-        if isinstance(message, dict):
-            author = (message.get("authorDetails", {}).get("displayName")
-                      or message.get("author"))
-            text = (message.get("snippet", {}).get("displayMessage")
-                    or message.get("text"))
-        author = author or ""
-        text = text or ""
-
-        # write to log file
-        self.logger.info(f"{author}: {text}")
-
-        # append CSV row if enabled
-        if self._csv_writer:
-            try:
-                self._csv_writer.writerow([author, text])
-                self._csv_file.flush()
-            except Exception:
-                pass
-
-        # store in database too, if requested
-        if self._db_conn:
-            try:
-                self._db_conn.execute(
-                    "INSERT INTO messages(timestamp, author, text) VALUES(?,?,?)",
-                    (time.strftime("%Y-%m-%d %H:%M:%S"), author, text)
-                )
-                self._db_conn.commit()
-            except Exception:
-                pass
-
-        # update UI widget if available
-        if self.ui:
-            try:
-                self.ui.append_message(author, text)
-            except Exception:
-                pass
-
-        # return normalized message for callers/tests
-        return {"author": author, "text": text}
+        result = self.process_batch([message])
+        if result:
+            return result[0]
+        from src.handlers.message import ChatMessage
+        parsed = ChatMessage.from_item(message)
+        return {"author": parsed.author, "text": parsed.text}
+
+    def process_batch(self, messages):
+        """Log, store and display a batch of messages (e.g. one poll's page).
+
+        Each item (API-style or the simple dict used by tests) is parsed
+        once into a ``ChatMessage``, which every sink then reads.  Sinks
+        receive the whole batch at once, so the database is written in a
+        single transaction.  Returns the normalized messages, or an empty
+        list if every sink takes raw items, in which case nothing is parsed.
+        """
+        from src.handlers.message import ChatMessage
+        if not messages:
+            return []
+        if self._parsed_sinks:
+            parsed = [ChatMessage.from_item(message) for message in messages]
+        else:
+            parsed = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ChatHandler is closed")
+            self._write_batch(parsed, messages)
+        if parsed is None:
+            return []
+        # return normalized messages for callers/tests
+        return [{"author": m.author, "text": m.text} for m in parsed]
+
+    def _to_sink(self, name, write, batch):
+        """Run ``write(batch)``; return the exception instead of raising it.
+
+        One failing output must not stop the others.  With metrics enabled
+        the write is timed and failures are counted per output.
+        """
+        from src.utils import metrics
+        start = time.perf_counter() if metrics.ENABLED else None
+        try:
+            write(batch)
+        except Exception as exc:
+            metrics.inc("chat_sink_errors_total", sink=name)
+            return exc
+        if start is not None:
+            metrics.observe("chat_sink_write_seconds", time.perf_counter() - start, sink=name)
+        return None
+
+    def _write_batch(self, parsed, raw=None):
+        # called with self._lock held.  Sinks run in registry order, so the
+        # raw archive is written before anything else can fail.
+        for name, sink in self.sinks.items():
+            if getattr(sink, "raw", False):
+                if not raw:
+                    continue
+                batch = raw
+            else:
+                batch = parsed
+            self._report(name, self._to_sink(name, sink.write_batch, batch), "write to")
+
+        from src.utils import metrics
+        if metrics.ENABLED:
+            if parsed is None:
+                from src.handlers.message import ChatMessage
+                parsed = [ChatMessage.from_item(item) for item in raw]
+            self._record_lag(parsed, metrics)
+
+    @staticmethod
+    def _record_lag(parsed, metrics):
+        """Count the batch and how long after publishedAt it was written."""
+        from src.handlers.message import published_to_micros
+        metrics.inc("chat_messages_total", len(parsed))
+        now = time.time()
+        published = [published_to_micros(m.published_at) for m in parsed]
+        metrics.observe_many("chat_lag_seconds",
+                             [max(0.0, now - p / 1e6) for p in published if p is not None])
 
     def respond_to_message(self, message, response):
         # Send a response to a chat message
@@ -181,16 +154,73 @@ class ChatHandler:
     def manage_chat_events(self):
         # Manage chat events such as new messages or user interactions
         pass
-    def __del__(self):
-        # clean up opened resources (CSV file, DB connection)
-        if getattr(self, '_csv_file', None):
-            try:
-                self._csv_file.close()
-            except Exception:
-                pass
-        if getattr(self, '_db_conn', None):
-            try:
-                self._db_conn.close()
-            except Exception:
-                pass
+    def _report(self, name, exc, action):
+        """Print a sink failure once until the sink works again; True if it failed."""
+        if exc is None:
+            self._failing.discard(name)
+            return False
+        if name not in self._failing:
+            self._failing.add(name)
+            print(f"[EXCEPTION] Could not {action} the {name} output: {exc}")
+        return True
+
+    def _flush_sinks(self, sync=False):
+        # called with self._lock held; returns True if every sink succeeded
+        from src.utils import metrics
+        ok = True
+        for name, sink in self.sinks.items():
+            for method, action in ((sink.flush, "flush"),
+                                   (getattr(sink, "sync", None) if sync else None, "sync")):
+                if method is None:
+                    continue
+                try:
+                    method()
+                except Exception as exc:
+                    metrics.inc("chat_sink_errors_total", sink=name)
+                    self._report(name, exc, action)
+                    ok = False
+                    break
+        return ok
+
+    def flush(self):
+        """Push any buffered output to disk without closing it."""
+        with self._lock:
+            self._flush_sinks()
+
+    def on_flushed(self, callback):
+        """Flush everything written so far to disk, then call ``callback()``.
+
+        Sinks with a ``sync`` method (the archive) are also fsynced first,
+        so a checkpoint saved by the callback never points past data a crash
+        could still lose.  If a sink fails to flush or sync, the failure is
+        reported like a failed write and the callback is skipped; nothing is
+        raised to the poller.
+        """
+        with self._lock:
+            ok = self._flush_sinks(sync=True)
+        if ok:
+            callback()
 
+    def close(self):
+        """Flush and close every output.  Safe to call more than once.
+
+        Waits for a batch that is being written on another thread to finish
+        first; later calls to process_batch raise RuntimeError.
+        """
+        lock = getattr(self, '_lock', None)
+        if lock is None:
+            # __init__ failed before anything was opened
+            return
+        with lock:
+            self._closed = True
+            sinks, self.sinks = self.sinks, {}
+            self._db_conn = None
+            for name, sink in sinks.items():
+                try:
+                    sink.close()
+                except Exception as exc:
+                    print(f"[EXCEPTION] Could not close the {name} output: {exc}")
+
+    def __del__(self):
+        # clean up opened resources (log file, CSV file, DB connection)
+        self.close()
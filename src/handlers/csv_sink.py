@@ -0,0 +1,134 @@
+import csv
+import locale
+import os
+import time
+
+from src.handlers.sinks import Sink
+
+
+class CsvSink(Sink):
+    """Append chat messages to a CSV file through a write buffer.
+
+    Rows are not flushed one by one: they collect in a ``buffer_size``-byte
+    file buffer and are pushed to disk at most every ``flush_interval``
+    seconds (and whenever the buffer fills, on :meth:`flush` and on
+    :meth:`close`).  ``flush_interval=0`` flushes after every batch.
+
+    The delimiter and BOM rules are the ones ChatHandler always used:
+    CHAT_CSV_DELIMITER wins, then semicolon for the default ``chat.csv`` on
+    Windows, otherwise whatever suits the locale's decimal separator.
+    """
+
+    name = "csv"
+
+    def __init__(self, csv_path, buffer_size=64 * 1024, flush_interval=1.0):
+        self.path = self.csv_path = csv_path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._csv_file = None
+        self._csv_writer = None
+
+        # Allow explicit override via environment variable for edge cases
+        csv_delimiter = os.getenv('CHAT_CSV_DELIMITER')
+        if not csv_delimiter:
+            # Prefer semicolon only for the default chat.csv on Windows.
+            # For custom filenames (used in tests) keep comma to avoid
+            # surprising callers.
+            if os.name == 'nt' and os.path.basename(self.csv_path) == 'chat.csv':
+                csv_delimiter = ';'
+            else:
+                # choose delimiter according to locale decimal separator:
+                # many locales that use comma as decimal point expect
+                # semicolon as CSV separator in Excel (e.g., pt-BR).
+                dec = locale.localeconv().get('decimal_point', '.')
+                csv_delimiter = ';' if dec == ',' else ','
+        self.delimiter = csv_delimiter
+
+        file_exists = os.path.exists(self.csv_path)
+        # If the file doesn't exist yet, create it with a UTF-8 BOM so
+        # Excel on Windows recognises the encoding and shows Portuguese
+        # characters correctly. Use 'utf-8' for appends to avoid writing
+        # another BOM.
+        if file_exists:
+            try:
+                self._csv_file = self._open('a', 'utf-8')
+            except PermissionError:
+                # file may be locked by Excel or another process; silently
+                # disable CSV writing so the application doesn't crash.
+                self._csv_file = None
+                self._csv_writer = None
+        else:
+            # Only write a UTF-8 BOM when using the default CSV filename
+            # (chat.csv). This helps Excel on Windows detect UTF-8 but
+            # avoids surprising tests or callers who provide a custom
+            # filename.
+            if os.path.basename(self.csv_path) == "chat.csv":
+                # 'utf-8-sig' writes a BOM at the start of the file
+                self._csv_file = self._open('w', 'utf-8-sig')
+            else:
+                self._csv_file = self._open('w', 'utf-8')
+        # use the selected delimiter; quoting left at minimal level
+        if self._csv_file:
+            self._csv_writer = csv.writer(self._csv_file, delimiter=csv_delimiter, quoting=csv.QUOTE_MINIMAL)
+            if not file_exists:
+                # write header (uppercase for easier scanning)
+                self._csv_writer.writerow(["AUTHOR", "MESSAGE"])
+                self._csv_file.flush()
+        else:
+            # If the file already existed but uses a different delimiter
+            # (common when switching locales), attempt a gentle conversion
+            # so Excel will split columns correctly for this locale.
+            try:
+                with open(self.csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+                    first = f.readline()
+                # if the file's header contains a comma but our locale
+                # expects semicolons, convert the file
+                if csv_delimiter == ';' and ',' in first and ';' not in first:
+                    # stream it through a temp file with comma in, semicolon out
+                    from src.utils.csv_convert import convert_delimiter
+                    convert_delimiter(self.csv_path, from_delim=',', to_delim=';')
+                    # reopen in append mode for future writes
+                    # If we couldn't open the file earlier (locked), skip
+                    # reopening and leave writer disabled.
+                    try:
+                        if self._csv_file is not None:
+                            self._csv_file.close()
+                        self._csv_file = self._open('a', 'utf-8')
+                        self._csv_writer = csv.writer(self._csv_file, delimiter=csv_delimiter, quoting=csv.QUOTE_MINIMAL)
+                    except Exception:
+                        self._csv_file = None
+                        self._csv_writer = None
+            except Exception:
+                # conversion is best-effort; ignore failures and continue
+                pass
+
+    def _open(self, mode, encoding):
+        return open(self.csv_path, mode, newline='', encoding=encoding,
+                    buffering=self.buffer_size)
+
+    @property
+    def enabled(self):
+        return self._csv_writer is not None
+
+    def write_batch(self, messages):
+        """Append ``ChatMessage`` rows; flush if the interval has passed."""
+        if not self._csv_writer or not messages:
+            return
+        self._csv_writer.writerows([(m.author, m.text) for m in messages])
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._csv_file:
+            self._csv_file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._csv_file:
+            try:
+                self._csv_file.close()
+            except Exception:
+                pass
+        self._csv_file = None
+        self._csv_writer = None
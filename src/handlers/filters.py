@@ -0,0 +1,246 @@
+"""Keyword and pattern matching over chat messages.
+
+Rules are kept in a plain text file, one per line::
+
+    # comments and blank lines are ignored; rules below [spam]
+    # belong to the "spam" rule set
+    [spam]
+    free robux
+    # a regular expression (case-insensitive)
+    re:https?://\\S+
+    [banned]
+    # matches anywhere, even inside other words
+    sub:badword
+
+Plain keywords and phrases match whole words, ignoring case (``gg`` fires
+on "GG wp" but not on "eggs").  All keywords of all rule sets are compiled
+into one Aho-Corasick automaton, so a message is scanned once however many
+there are.  Regular expressions without groups or inline flags are also
+combined into one alternation that rejects the (usual) non-matching
+message in a single search; only on a hit are they run one by one to tell
+which of them matched.  Expressions that can't be combined safely (groups,
+backreferences, ``(?i)``-style flags) are always searched on their own.
+"""
+import os
+import re
+import time
+
+DEFAULT_RULE = "keyword"
+
+# "(?i)", "(?P<name>...)" and friends: such expressions change meaning or
+# fail to compile when joined with others
+_INLINE_FLAGS = re.compile(r"\(\?[a-zA-Z]")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a set of lower-cased keywords.
+
+    ``search(text)`` yields ``(end, value)`` for every occurrence of every
+    keyword in one left-to-right pass, where ``end`` is the index just past
+    the occurrence and ``value`` is what was passed to :meth:`add`.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        # per state: tuple of (length, value) for keywords ending exactly there
+        self._own = [()]
+        # the same plus those inherited through the failure links (by build)
+        self._out = [()]
+        self._built = False
+
+    def add(self, keyword, value):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+            state = nxt
+        self._own[state] += ((len(keyword), value),)
+        self._built = False
+
+    def build(self):
+        """Compute the failure links (breadth first); called by search too.
+
+        Starts from scratch every time, so it can be called again after
+        more keywords were added.
+        """
+        goto = self._goto
+        fail = self._fail = [0] * len(goto)
+        out = self._out = list(self._own)
+        queue = list(goto[0].values())
+        for state in queue:
+            fail[state] = 0
+        i = 0
+        while i < len(queue):
+            state = queue[i]
+            i += 1
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                if out[fail[nxt]]:
+                    out[nxt] += out[fail[nxt]]
+        self._built = True
+        return self
+
+    def __len__(self):
+        return sum(len(o) for o in self._own)
+
+    def search(self, text):
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if out[state]:
+                for item in out[state]:
+                    yield i + 1, item
+
+
+class KeywordFilter:
+    """Compiled rule sets; :meth:`match` returns the rules a text hits.
+
+    ``rules`` is a list of ``(rule, kind, term)`` with ``kind`` one of
+    ``"word"``, ``"sub"`` or ``"re"``, as produced by :func:`parse_rules`.
+    Raises ``re.error`` for an invalid pattern.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self._automaton = KeywordAutomaton()
+        combined, separate = [], []
+        for rule, kind, term in self.rules:
+            if kind == "re":
+                pattern = re.compile(term, re.IGNORECASE)
+                if pattern.groups or _INLINE_FLAGS.search(term):
+                    separate.append((rule, term, pattern))
+                else:
+                    combined.append((rule, term, pattern))
+            else:
+                key = term.casefold()
+                if key:
+                    self._automaton.add(key, (rule, term, kind == "word"))
+        self._automaton.build()
+        self._order = {(rule, term): i for i, (rule, _, term) in enumerate(self.rules)}
+        self._combined = combined
+        self._separate = separate
+        # one search rejects messages none of the combinable patterns match
+        self._any_pattern = (re.compile("|".join(f"(?:{p.pattern})" for _, _, p in combined),
+                                        re.IGNORECASE)
+                             if combined else None)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, text):
+        """``(rule, term)`` for each rule that fires on ``text``, in file order."""
+        if not text:
+            return []
+        found = {}
+        folded = text.casefold()
+        for end, (length, (rule, term, whole_word)) in self._automaton.search(folded):
+            if whole_word:
+                start = end - length
+                if ((start > 0 and _is_word(folded[start - 1]))
+                        or (end < len(folded) and _is_word(folded[end]))):
+                    continue
+            found.setdefault((rule, term), None)
+        if self._any_pattern is not None and self._any_pattern.search(text):
+            for rule, term, pattern in self._combined:
+                if pattern.search(text):
+                    found.setdefault((rule, term), None)
+        for rule, term, pattern in self._separate:
+            if pattern.search(text):
+                found.setdefault((rule, term), None)
+        if not found:
+            return []
+        return sorted(found, key=self._order.get)
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def parse_rules(text):
+    """Parse a rules file (see the module docstring) into ``(rule, kind, term)``."""
+    rules = []
+    rule = DEFAULT_RULE
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            rule = line[1:-1].strip() or DEFAULT_RULE
+        elif line.startswith("re:"):
+            rules.append((rule, "re", line[3:].strip()))
+        elif line.startswith("sub:"):
+            rules.append((rule, "sub", line[4:].strip()))
+        else:
+            rules.append((rule, "word", line))
+    return rules
+
+
+class RulesFile:
+    """A rules file that is reloaded when it changes on disk.
+
+    :meth:`current` stats the file at most every ``reload_interval``
+    seconds and recompiles it when its modification time or size changed.
+    A file that fails to compile (e.g. a broken regular expression) while
+    running is reported and the previous rules stay in force, so a typo in
+    a live edit never stops the filter.  At startup there are no previous
+    rules, so a missing or broken file raises ``ValueError`` instead.
+    """
+
+    def __init__(self, path, reload_interval=2.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._stamp = None
+        self._next_check = time.monotonic() + reload_interval
+        try:
+            self.filter = self._load()
+        except (OSError, re.error) as exc:
+            raise ValueError(f"could not load filter rules from {path}: {exc}") from exc
+
+    def _load(self):
+        st = os.stat(self.path)
+        # remembered even if the file is broken, so it is reported once
+        self._stamp = (st.st_mtime_ns, st.st_size)
+        with open(self.path, encoding="utf-8") as f:
+            return KeywordFilter(parse_rules(f.read()))
+
+    def reload(self):
+        """Recompile the file now; returns True if new rules were loaded."""
+        self._next_check = time.monotonic() + self.reload_interval
+        try:
+            self.filter = self._load()
+        except (OSError, re.error) as exc:
+            print(f"[WARNING] Could not load filter rules from {self.path}: {exc}")
+            return False
+        return True
+
+    def current(self):
+        """The compiled rules, reloaded first if the file changed."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.reload_interval
+            try:
+                st = os.stat(self.path)
+                stamp = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamp = self._stamp
+            if stamp != self._stamp:
+                self.reload()
+        return self.filter
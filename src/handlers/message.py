@@ -0,0 +1,68 @@
+import sys
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def published_to_micros(published_at):
+    """Convert an API ``publishedAt`` string to microseconds since the epoch."""
+    if not published_at:
+        return None
+    try:
+        dt = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+class ChatMessage:
+    """The fields of a chat message the outputs use, parsed once.
+
+    ChatHandler turns every incoming item into one of these before handing
+    the batch to its sinks, instead of each sink digging through the nested
+    API dict.  ``__slots__`` keeps an instance to five references, and
+    author names and channel IDs are interned, so the same chatter's name is
+    stored once however many messages they send.  ``published_at`` is the
+    API's ISO 8601 string; only the database needs it as a number
+    (:func:`published_to_micros`), so it isn't parsed for every output.
+    """
+
+    __slots__ = ("id", "author", "text", "channel_id", "published_at")
+
+    def __init__(self, author, text, id=None, channel_id=None, published_at=None):
+        self.author = author
+        self.text = text
+        self.id = id
+        self.channel_id = channel_id
+        self.published_at = published_at
+
+    @classmethod
+    def from_item(cls, item):
+        """Parse a ``liveChatMessages`` item or a simple ``{"author", "text"}`` dict."""
+        if isinstance(item, cls):
+            return item
+        if not isinstance(item, dict):
+            return cls("", "")
+        snippet = item.get("snippet") or {}
+        details = item.get("authorDetails") or {}
+        author = details.get("displayName") or item.get("author") or ""
+        channel_id = details.get("channelId") or snippet.get("authorChannelId")
+        return cls(
+            sys.intern(author),
+            snippet.get("displayMessage") or item.get("text") or "",
+            item.get("id"),
+            sys.intern(channel_id) if channel_id else None,
+            snippet.get("publishedAt"),
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, ChatMessage):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ChatMessage(author={self.author!r}, text={self.text!r}, id={self.id!r})"
@@ -0,0 +1,328 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+OVERFLOW_POLICIES = ("block", "drop-oldest", "spill")
+
+
+class _Barrier:
+    """Queue entry that runs ``callback`` once everything before it is flushed."""
+
+    __slots__ = ("callback",)
+
+    def __init__(self, callback):
+        self.callback = callback
+
+
+class WriterPipeline:
+    """Decouple API polling from the (slow) output sinks.
+
+    The poller calls :meth:`process_batch` (or :meth:`submit`), which only
+    appends messages to a bounded in-memory queue.  A dedicated writer
+    thread drains the queue and hands the messages to ``handler`` in
+    batches, so a slow disk never delays the next API call.
+
+    When the queue is full ``overflow`` decides what happens:
+
+    * ``block`` - the poller waits until the writer has made room
+      (backpressure, nothing is lost);
+    * ``drop-oldest`` - the oldest queued messages are discarded;
+    * ``spill`` - messages go to a JSONL file on disk and are read back
+      once the writer catches up, preserving order.
+
+    :meth:`on_flushed` queues a callback behind the messages submitted so
+    far; YouTubeChat uses it to save its resume checkpoint only once the
+    page it describes is on disk.
+    """
+
+    def __init__(self, handler, maxsize=10000, overflow="block", spill_path=None,
+                 max_batch=500, idle_flush=1.0, name=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.max_batch = max_batch
+        # seconds without new messages after which the handler's buffers
+        # are flushed, so a quiet chat doesn't leave rows sitting in memory
+        self.idle_flush = idle_flush
+        self.spill_path = spill_path
+        # only delete the spill file on close if we created it ourselves
+        self._owns_spill = False
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+        self._handler_closed = False
+        self._thread = None
+
+        # spill file state: number of spilled messages not yet read back and
+        # the offset of the next unread line
+        self._spilled_pending = 0
+        self._spill_offset = 0
+        # barriers that went through the spill file, by sequence number
+        self._spilled_barriers = {}
+        self._barrier_seq = 0
+
+        # counters exposed through metrics()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.errors = 0
+        self.high_water = 0
+        self._failed_since_barrier = False
+
+        # label for this queue in the metrics (e.g. the stream's video ID)
+        self.name = name or "default"
+        from src.utils import metrics
+        if metrics.ENABLED:
+            metrics.gauge("chat_queue_depth", self.depth, queue=self.name)
+
+    # -- producer side ----------------------------------------------------
+
+    def start(self):
+        """Start the writer thread.  Returns self for chaining."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, messages):
+        """Queue ``messages`` for writing, applying the overflow policy."""
+        messages = list(messages)
+        if not messages:
+            return
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("pipeline is closed")
+            for message in messages:
+                if self._spilled_pending:
+                    # keep ordering: once spilling started, everything goes
+                    # to disk until the writer has read the backlog back
+                    self._spill([message])
+                    continue
+                while len(self._queue) >= self.maxsize:
+                    if self.overflow == "block":
+                        # wake the writer before waiting for it to make room
+                        self._not_empty.notify()
+                        self._not_full.wait()
+                    elif self.overflow == "drop-oldest":
+                        if not isinstance(self._queue.popleft(), _Barrier):
+                            self.dropped += 1
+                    else:
+                        break
+                if len(self._queue) >= self.maxsize:
+                    self._spill([message])
+                    continue
+                self._queue.append(message)
+                self.enqueued += 1
+            self.high_water = max(self.high_water, len(self._queue))
+            self._not_empty.notify()
+
+    # ChatHandler-compatible entry points, so YouTubeChat can use the
+    # pipeline wherever it expects a handler
+    def process_batch(self, messages):
+        self.submit(messages)
+
+    def process_message(self, message):
+        self.submit([message])
+
+    def on_flushed(self, callback):
+        """Call ``callback()`` on the writer thread once every message
+        submitted before it was written and the handler flushed.
+
+        The callback is skipped if writing any of those messages failed,
+        and it never runs if the pipeline is closed before reaching it.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("pipeline is closed")
+            if self._spilled_pending:
+                # stay in order behind the spilled messages
+                self._barrier_seq += 1
+                self._spilled_barriers[self._barrier_seq] = callback
+                self._spill([{"__barrier__": self._barrier_seq}], count=False)
+            else:
+                self._queue.append(_Barrier(callback))
+            self._not_empty.notify()
+
+    # -- spill file -------------------------------------------------------
+
+    def _spill(self, messages, count=True):
+        # called with the lock held
+        if self.spill_path is None:
+            import tempfile
+            fd, self.spill_path = tempfile.mkstemp(prefix="chat-spill-", suffix=".jsonl")
+            os.close(fd)
+            self._owns_spill = True
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False) + "\n")
+        self._spilled_pending += len(messages)
+        if count:
+            self.spilled += len(messages)
+            self.enqueued += len(messages)
+
+    def _read_spill(self, limit):
+        # called with the lock held
+        batch = []
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            f.seek(self._spill_offset)
+            while len(batch) < limit:
+                line = f.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if isinstance(message, dict) and "__barrier__" in message:
+                    message = _Barrier(self._spilled_barriers.pop(message["__barrier__"]))
+                batch.append(message)
+            self._spill_offset = f.tell()
+        self._spilled_pending -= len(batch)
+        if not self._spilled_pending:
+            # backlog fully read back; start the next spill from scratch
+            open(self.spill_path, "w").close()
+            self._spill_offset = 0
+        return batch
+
+    # -- writer side ------------------------------------------------------
+
+    def _next_batch(self):
+        """Return the next batch, [] once closed and drained, None when idle."""
+        with self._lock:
+            while not self._queue and not self._spilled_pending and not self._closed:
+                if not self._not_empty.wait(self.idle_flush):
+                    return None
+            batch = []
+            while self._queue and len(batch) < self.max_batch:
+                batch.append(self._queue.popleft())
+            if not batch and self._spilled_pending:
+                batch = self._read_spill(self.max_batch)
+            self._not_full.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                flush = getattr(self.handler, "flush", None)
+                if flush:
+                    try:
+                        flush()
+                    except Exception as exc:
+                        print(f"[EXCEPTION] Exception flushing handler: {exc}")
+                continue
+            if not batch:
+                # closed and fully drained
+                return
+            messages = []
+            for entry in batch:
+                if isinstance(entry, _Barrier):
+                    self._write(messages)
+                    messages = []
+                    self._run_barrier(entry)
+                else:
+                    messages.append(entry)
+            self._write(messages)
+
+    def _write(self, messages):
+        if not messages:
+            return
+        try:
+            self.handler.process_batch(messages)
+        except Exception as exc:
+            self.errors += 1
+            self.failed += len(messages)
+            self._failed_since_barrier = True
+            from src.utils import metrics
+            metrics.inc("chat_writer_errors_total", queue=self.name)
+            print(f"[EXCEPTION] Exception in writer thread: {exc}")
+        else:
+            self.written += len(messages)
+
+    def _run_barrier(self, barrier):
+        failed, self._failed_since_barrier = self._failed_since_barrier, False
+        if failed:
+            return
+        try:
+            flush = getattr(self.handler, "on_flushed", None)
+            if flush:
+                flush(barrier.callback)
+            else:
+                flush = getattr(self.handler, "flush", None)
+                if flush:
+                    flush()
+                barrier.callback()
+        except Exception as exc:
+            print(f"[EXCEPTION] Exception in flush callback: {exc}")
+
+    def depth(self):
+        """Number of messages waiting to be written (memory and disk)."""
+        with self._lock:
+            return len(self._queue) + self._spilled_pending
+
+    def metrics(self):
+        """Return a snapshot of the queue counters."""
+        with self._lock:
+            return {
+                "depth": len(self._queue) + self._spilled_pending,
+                "high_water": self.high_water,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "errors": self.errors,
+            }
+
+    def close(self, timeout=None):
+        """Drain the queue, stop the writer and close the handler.
+
+        Returns True once everything was written and the handler closed.  If
+        the writer is still busy after ``timeout`` seconds the handler is
+        left open (it is still in use) and False is returned.
+        """
+        with self._lock:
+            if self._handler_closed:
+                return True
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                print(f"[WARNING] Writer thread still busy after {timeout}s; "
+                      f"{self.depth()} messages not written")
+                return False
+        else:
+            # never started: write whatever was queued synchronously
+            self._run()
+        self._handler_closed = True
+        from src.utils import metrics
+        if metrics.registry() is not None:
+            metrics.registry().remove_gauge("chat_queue_depth", queue=self.name)
+        close = getattr(self.handler, "close", None)
+        if close:
+            close()
+        if self._owns_spill and self.spill_path and os.path.exists(self.spill_path):
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+        return True
+
+    def wait_idle(self, timeout=None):
+        """Block until every queued message has been written (for tests)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.written + self.failed < self.enqueued - self.dropped:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
@@ -0,0 +1,203 @@
+"""Output sinks for ChatHandler and the registry that builds them from config.
+
+A sink receives each batch of messages once, as a list of ``ChatMessage``
+records (or, if its ``raw`` attribute is true, the API items exactly as
+received).  ChatHandler only creates the sinks named in its configuration,
+so an output that isn't wanted costs nothing::
+
+    ChatHandler(client, log_file=None, sinks={
+        "csv": {"path": "chat.csv"},
+        "sqlite": {"path": "chat.db", "synchronous": "OFF"},
+        "alerts": MyAlertSink(),          # any Sink instance works too
+    })
+
+New kinds of output can be registered by name with :func:`register_sink`.
+"""
+import logging
+import os
+
+
+class Sink:
+    """Interface every output implements.
+
+    ``open`` is called once before the first batch (sinks that open their
+    file in ``__init__`` don't need it), ``write_batch`` for every batch,
+    ``flush`` when buffered data should reach the disk and ``close`` at the
+    end.  Exceptions from ``write_batch`` are contained by ChatHandler, so
+    one failing output never stops the others.
+    """
+
+    name = "sink"
+    # True: write_batch gets the raw API items instead of ChatMessage records
+    raw = False
+
+    def open(self):
+        return self
+
+    def write_batch(self, messages):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LogSink(Sink):
+    """Append ``author: text`` lines to a text log through ``logging``.
+
+    The logger is private to the sink (not registered with
+    logging.getLogger) so two handlers in the same process don't write every
+    message into each other's files, which is where the doubled lines in
+    chat.log came from.  The file is UTF-8 so emoji and non-ASCII characters
+    don't raise UnicodeEncodeError on Windows.
+    """
+
+    name = "log"
+
+    def __init__(self, path):
+        self.path = path
+        self.logger = logging.Logger("youtube_chat", logging.INFO)
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+        self.logger.addHandler(handler)
+
+    def write_batch(self, messages):
+        for m in messages:
+            self.logger.info(f"{m.author}: {m.text}")
+
+    def close(self):
+        for log_handler in list(self.logger.handlers):
+            self.logger.removeHandler(log_handler)
+            try:
+                log_handler.close()
+            except Exception:
+                pass
+
+
+class AnalyticsSink(Sink):
+    """Feed a ``ChatAnalytics`` (or anything with ``add_batch``)."""
+
+    name = "analytics"
+
+    def __init__(self, analytics):
+        self.analytics = analytics
+
+    def write_batch(self, messages):
+        self.analytics.add_batch(messages)
+
+
+class UISink(Sink):
+    """Show messages in a window with ``append_message(author, text)``."""
+
+    name = "ui"
+
+    def __init__(self, ui):
+        self.ui = ui
+
+    def write_batch(self, messages):
+        for m in messages:
+            try:
+                self.ui.append_message(m.author, m.text)
+            except Exception:
+                pass
+
+
+# -- registry -------------------------------------------------------------
+#
+# Factories import their sink module on first use, so e.g. sqlite3 or
+# openpyxl are only loaded when that output is configured.
+
+def _log(path):
+    return LogSink(path)
+
+
+def _csv(path, buffer_size=None, flush_interval=None):
+    from src.handlers.csv_sink import CsvSink
+    if buffer_size is None:
+        buffer_size = int(os.getenv('CHAT_CSV_BUFFER_SIZE', str(64 * 1024)))
+    if flush_interval is None:
+        flush_interval = float(os.getenv('CHAT_CSV_FLUSH_SECONDS', '1'))
+    return CsvSink(path, buffer_size=buffer_size, flush_interval=flush_interval)
+
+
+def _xlsx(path):
+    from src.handlers.xlsx_sink import XlsxSink
+    return XlsxSink(path)
+
+
+def _sqlite(path, synchronous=None, wal=True):
+    from src.handlers.sqlite_sink import SQLiteSink
+    return SQLiteSink(path, synchronous=synchronous or os.getenv('CHAT_DB_SYNCHRONOUS', 'NORMAL'),
+                      wal=wal)
+
+
+def _archive(path, compresslevel=6, flush_interval=5.0):
+    from src.handlers.archive_sink import ArchiveSink
+    return ArchiveSink(path, compresslevel=compresslevel, flush_interval=flush_interval)
+
+
+def _alerts(rules, path=None, reload_interval=None, on_alert=None):
+    from src.handlers.alert_sink import AlertSink
+    if reload_interval is None:
+        reload_interval = float(os.getenv('CHAT_FILTER_RELOAD_SECONDS', '2'))
+    return AlertSink(rules, path=path, reload_interval=reload_interval, on_alert=on_alert)
+
+
+def _analytics(analytics):
+    return AnalyticsSink(analytics)
+
+
+def _ui(ui):
+    return UISink(ui)
+
+
+SINKS = {
+    "archive": _archive,
+    "log": _log,
+    "csv": _csv,
+    "xlsx": _xlsx,
+    "sqlite": _sqlite,
+    "alerts": _alerts,
+    "analytics": _analytics,
+    "ui": _ui,
+}
+
+
+def register_sink(name, factory):
+    """Make ``factory(**options)`` available as output ``name``."""
+    SINKS[name] = factory
+
+
+def build_sinks(config):
+    """Create and open the sinks in ``config`` (``{name: options}``).
+
+    ``options`` is a dict of keyword arguments for the registered factory,
+    or a ready-made Sink, which is used as is.  Returns ``{name: sink}`` in
+    the order batches should be written: built-in outputs in registry order
+    (the raw archive first, the window last), others after them.  If one
+    fails to open, those already opened are closed again.
+    """
+    order = list(SINKS)
+    names = sorted(config, key=lambda n: order.index(n) if n in order else len(order))
+    sinks = {}
+    try:
+        for name in names:
+            options = config[name]
+            if hasattr(options, "write_batch"):
+                sink = options
+            elif name in SINKS:
+                sink = SINKS[name](**(options or {}))
+            else:
+                raise ValueError(f"unknown sink {name!r}; registered: {', '.join(SINKS)}")
+            open_sink = getattr(sink, "open", None)
+            sinks[name] = (open_sink() if open_sink else None) or sink
+    except BaseException:
+        for sink in sinks.values():
+            try:
+                sink.close()
+            except Exception:
+                pass
+        raise
+    return sinks
@@ -0,0 +1,162 @@
+import sqlite3
+import time
+
+from src.handlers.message import published_to_micros
+from src.handlers.sinks import Sink
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# bump when the layout below changes and add a step to _migrate
+SCHEMA_VERSION = 2
+
+_CREATE_MESSAGES = """CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT,
+    published_at INTEGER,
+    author_channel_id TEXT,
+    author TEXT,
+    text TEXT
+)"""
+
+_CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS messages_author ON messages(author)",
+    "CREATE INDEX IF NOT EXISTS messages_author_channel ON messages(author_channel_id)",
+    "CREATE INDEX IF NOT EXISTS messages_published ON messages(published_at)",
+)
+
+# external-content FTS5 index over the messages table.  write_batch indexes
+# each batch with one INSERT ... SELECT (a per-row AFTER INSERT trigger is
+# several times slower); the triggers keep the index right when rows are
+# edited or deleted by hand.
+_CREATE_FTS = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+       USING fts5(author, text, content='messages', content_rowid='rowid')""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+           INSERT INTO messages_fts(messages_fts, rowid, author, text)
+           VALUES ('delete', old.rowid, old.author, old.text);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE ON messages BEGIN
+           INSERT INTO messages_fts(messages_fts, rowid, author, text)
+           VALUES ('delete', old.rowid, old.author, old.text);
+           INSERT INTO messages_fts(rowid, author, text) VALUES (new.rowid, new.author, new.text);
+       END""",
+)
+
+
+class SQLiteSink(Sink):
+    """Store chat messages in an SQLite ``messages`` table.
+
+    Rows are written a batch at a time: every call to :meth:`write_batch`
+    is a single ``executemany`` inside one transaction, so a poll that
+    returns 200 messages costs one commit (and one fsync) instead of 200.
+
+    The table is keyed on the YouTube message ID, so a message delivered
+    twice (e.g. replayed after a crash) is stored once, and indexed on
+    author, author channel ID and ``published_at`` (microseconds since the
+    epoch, UTC).  ``messages_fts`` is an FTS5 index over author and text,
+    filled by :meth:`write_batch`::
+
+        SELECT m.* FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+        WHERE messages_fts MATCH 'giveaway'
+
+    Databases from older versions (``timestamp, author, text`` only) are
+    migrated in place on open; ``PRAGMA user_version`` records the schema.
+    If this SQLite build lacks FTS5 the full-text index is skipped.
+
+    Args:
+        db_path: database file; the schema is created or migrated if needed.
+        synchronous: SQLite ``PRAGMA synchronous`` level.  ``NORMAL`` is
+            safe with WAL and only risks the last transaction on power loss.
+        wal: switch the database to write-ahead logging so readers (e.g. a
+            dashboard querying the file) never block the writer.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path, synchronous="NORMAL", wal=True):
+        synchronous = (synchronous or "NORMAL").upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"synchronous must be one of {SYNCHRONOUS_LEVELS}, got {synchronous!r}")
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        if wal:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.fts = False
+        self._migrate()
+
+    def _migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        with self.conn:
+            if version < 2:
+                columns = [row[1] for row in self.conn.execute("PRAGMA table_info(messages)")]
+                if columns:
+                    # version 1: (timestamp, author, text) without a key.  SQLite
+                    # can't add a primary key in place, so copy into a new table,
+                    # keeping rowids so the original order survives.
+                    self.conn.execute("ALTER TABLE messages RENAME TO messages_v1")
+                    self.conn.execute(_CREATE_MESSAGES)
+                    self.conn.execute(
+                        "INSERT INTO messages(rowid, timestamp, author, text) "
+                        "SELECT rowid, timestamp, author, text FROM messages_v1"
+                    )
+                    self.conn.execute("DROP TABLE messages_v1")
+                else:
+                    self.conn.execute(_CREATE_MESSAGES)
+                for statement in _CREATE_INDEXES:
+                    self.conn.execute(statement)
+                self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        try:
+            with self.conn:
+                exists = self.conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name='messages_fts'").fetchone()
+                for statement in _CREATE_FTS:
+                    self.conn.execute(statement)
+                if not exists:
+                    # index whatever was there before (e.g. migrated rows)
+                    self.conn.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
+            self.fts = True
+        except sqlite3.OperationalError as exc:
+            print(f"[WARNING] Full-text search unavailable in this SQLite build: {exc}")
+
+    def write_batch(self, messages):
+        """Store a batch of ``ChatMessage`` records in one transaction."""
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.write_rows([
+            (m.id, timestamp, published_to_micros(m.published_at), m.channel_id, m.author, m.text)
+            for m in messages
+        ])
+
+    def write_rows(self, rows):
+        """Insert rows in one transaction, skipping message IDs already stored.
+
+        Each row is ``(id, timestamp, published_at, author_channel_id,
+        author, text)``; ``id`` may be None for messages without one.
+        """
+        if not rows:
+            return
+        with self.conn:
+            if self.fts:
+                last = self.conn.execute("SELECT max(rowid) FROM messages").fetchone()[0] or 0
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO messages"
+                "(id, timestamp, published_at, author_channel_id, author, text) "
+                "VALUES(?,?,?,?,?,?)", rows
+            )
+            if self.fts:
+                # new rows are appended, so everything past ``last`` is this batch
+                # (minus the duplicates that were ignored)
+                self.conn.execute(
+                    "INSERT INTO messages_fts(rowid, author, text) "
+                    "SELECT rowid, author, text FROM messages WHERE rowid > ?", (last,)
+                )
+
+    def flush(self):
+        # every batch is committed as it is written; nothing is buffered
+        pass
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
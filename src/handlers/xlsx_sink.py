@@ -0,0 +1,114 @@
+import re
+
+from src.handlers.sinks import Sink
+
+# Custom channel emotes arrive in ``displayMessage`` as ``:name:`` shortcodes;
+# standard emoji arrive as Unicode.  Both count as emotes here.
+_EMOTE_RE = re.compile(
+    r":[A-Za-z0-9_\-]+:"
+    r"|[\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF]"
+    r"[\uFE0F\u200D\U0001F3FB-\U0001F3FF\U0001F000-\U0001FAFF\u2600-\u27BF]*"
+)
+
+# Excel's hard limit per worksheet (including the header row)
+MAX_ROWS_PER_SHEET = 1048576
+
+
+def split_runs(text):
+    """Split a chat message into ``(kind, value)`` runs.
+
+    ``kind`` is ``"text"`` or ``"emote"``; adjacent emotes (with only spaces
+    between them) are merged into a single run so spam like
+    ``:yt::yt::yt:`` stays one unit.
+    """
+    runs = []
+    pos = 0
+    for match in _EMOTE_RE.finditer(text):
+        if match.start() > pos:
+            chunk = text[pos:match.start()]
+            if runs and runs[-1][0] == "emote" and not chunk.strip():
+                runs[-1] = ("emote", runs[-1][1] + chunk + match.group())
+                pos = match.end()
+                continue
+            runs.append(("text", chunk))
+        elif runs and runs[-1][0] == "emote":
+            runs[-1] = ("emote", runs[-1][1] + match.group())
+            pos = match.end()
+            continue
+        runs.append(("emote", match.group()))
+        pos = match.end()
+    if pos < len(text):
+        runs.append(("text", text[pos:]))
+    return runs
+
+
+class XlsxSink(Sink):
+    """Stream chat rows into an .xlsx workbook in constant memory.
+
+    Uses openpyxl's write-only mode, which writes each row straight to a
+    temporary file instead of keeping the worksheet in memory, so multi-hour
+    streams can be exported.  Columns are AUTHOR, MESSAGE (emotes kept
+    inline) and EMOTES (the emote runs, one per line).  When a sheet reaches
+    Excel's row limit a new one is started.
+
+    The workbook is only assembled on :meth:`close`; if openpyxl is not
+    installed the sink disables itself and ``enabled`` is False.
+    """
+
+    name = "xlsx"
+    HEADER = ["AUTHOR", "MESSAGE", "EMOTES"]
+
+    def __init__(self, xlsx_path):
+        self.path = self.xlsx_path = xlsx_path
+        self.rows_written = 0
+        self._sheet_rows = 0
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        except ImportError:
+            print("[WARNING] openpyxl is not installed; XLSX export disabled.")
+            self._workbook = None
+            return
+        self._illegal = ILLEGAL_CHARACTERS_RE
+        self._workbook = Workbook(write_only=True)
+        self._new_sheet()
+
+    @property
+    def enabled(self):
+        return self._workbook is not None
+
+    def _new_sheet(self):
+        index = len(self._workbook.worksheets) + 1
+        self._sheet = self._workbook.create_sheet(title="Chat" if index == 1 else f"Chat {index}")
+        self._sheet.append(self.HEADER)
+        self._sheet_rows = 1
+
+    def _clean(self, value):
+        # openpyxl refuses control characters that are illegal in XML
+        return self._illegal.sub("", value)
+
+    def write_batch(self, messages):
+        """Append a row per ``ChatMessage``."""
+        if not self._workbook:
+            return
+        for m in messages:
+            author, text = m.author, m.text
+            if self._sheet_rows >= MAX_ROWS_PER_SHEET:
+                self._new_sheet()
+            emotes = "\n".join(value for kind, value in split_runs(text) if kind == "emote")
+            self._sheet.append([self._clean(author), self._clean(text), self._clean(emotes)])
+            self._sheet_rows += 1
+            self.rows_written += 1
+
+    def flush(self):
+        # write-only workbooks can only be saved once, on close
+        pass
+
+    def close(self):
+        if self._workbook is None:
+            return
+        workbook, self._workbook = self._workbook, None
+        try:
+            workbook.save(self.xlsx_path)
+        except Exception as exc:
+            print(f"[EXCEPTION] Could not save XLSX export {self.xlsx_path}: {exc}")
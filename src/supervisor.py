@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StreamSupervisor:
+    """Poll many live chats concurrently from a single process.
+
+    Every stream is an ordinary `YouTubeChat` with its own scheduler and
+    handler (so its own sinks), but all of them share the process-wide API
+    service object and therefore one parsed discovery document.  A dispatcher thread keeps
+    the streams in a heap ordered by their next due time and hands due polls
+    to a bounded worker pool; a stream is never polled twice at once, and
+    ``max_workers`` caps how many HTTP calls are in flight.
+
+    Example::
+
+        sup = StreamSupervisor(api_key, max_workers=8)
+        for vid in video_ids:
+            sup.add_stream(video_id=vid, handler=make_handler(vid))
+        sup.start()
+    """
+
+    def __init__(self, api_key, max_workers=8, service=None, scheduler_factory=None,
+                 error_delay=30.0, quota=None):
+        if service is None:
+            from src.client.service import get_service
+            service = get_service(api_key)
+        self.api_key = api_key
+        self.service = service
+        self.max_workers = max_workers
+        self.scheduler_factory = scheduler_factory
+        # how long to wait before polling a stream again after an error
+        self.error_delay = error_delay
+        # optional QuotaBudget shared by every stream (see src.client.quota)
+        self.quota = quota
+
+        self.streams = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._executor = None
+        self._thread = None
+
+    def add_stream(self, live_chat_id=None, video_id=None, handler=None, name=None,
+                   cache_file=None, checkpoint=None):
+        """Register a chat and schedule its first poll right away.
+
+        ``checkpoint`` is passed on to YouTubeChat to resume the stream
+        where a previous run stopped.  Returns the stream's name (``name``,
+        else the video or chat ID).
+        """
+        from src.youtube_chat import YouTubeChat
+        name = name or video_id or live_chat_id
+        with self._cond:
+            if name in self.streams:
+                raise ValueError(f"stream {name!r} is already registered")
+        scheduler = self.scheduler_factory() if self.scheduler_factory else None
+        chat = YouTubeChat(self.api_key, live_chat_id=live_chat_id, video_id=video_id,
+                           cache_file=cache_file, handler=handler, scheduler=scheduler,
+                           service=self.service, quota=self.quota, checkpoint=checkpoint)
+        with self._cond:
+            self.streams[name] = chat
+            self._schedule(name, 0)
+        return name
+
+    def remove_stream(self, name):
+        """Stop polling ``name``; returns its YouTubeChat (or None)."""
+        with self._cond:
+            chat = self.streams.pop(name, None)
+        if chat is not None:
+            chat.release_quota()
+        return chat
+
+    def _schedule(self, name, delay):
+        # called with self._cond held
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), name))
+        self._cond.notify()
+
+    def _poll(self, name):
+        chat = self.streams.get(name)
+        if chat is None:
+            return
+        from src.client.errors import ChatEndedError
+        from src.client.retry import (QUOTA, RETRYABLE, CircuitOpenError, QuotaExceededError,
+                                      classify)
+        from src.utils import metrics
+        try:
+            messages, next_page_token = chat.fetch_page()
+        except ChatEndedError:
+            print(f"Live chat for stream {name} has ended.")
+            self._drop(name, chat)
+            return
+        except (QuotaExceededError, CircuitOpenError) as exc:
+            print(f"[EXCEPTION] Stream {name} paused for {exc.retry_after:.0f}s: {exc}")
+            metrics.inc("chat_poll_errors_total",
+                        kind="circuit_open" if isinstance(exc, CircuitOpenError) else QUOTA)
+            delay = exc.retry_after
+        except Exception as exc:
+            kind = classify(exc)
+            metrics.inc("chat_poll_errors_total", kind=kind)
+            if kind not in RETRYABLE:
+                # e.g. a bad key or a forbidden chat: polling again can't help
+                print(f"[EXCEPTION] Stream {name} stopped ({kind} error): {exc}")
+                self._drop(name, chat)
+                return
+            print(f"[EXCEPTION] Exception polling stream {name}: {exc}")
+            delay = self.error_delay
+        else:
+            try:
+                delay = chat.deliver_page(messages, next_page_token)
+            except Exception as exc:
+                # a closed pipeline or a bug in the handler; retrying the
+                # poll would only repeat it
+                print(f"[EXCEPTION] Stream {name} stopped, its handler failed: {exc}")
+                metrics.inc("chat_poll_errors_total", kind="handler")
+                import traceback
+                traceback.print_exc()
+                self._drop(name, chat)
+                return
+        with self._cond:
+            if name in self.streams and not self._stopped:
+                self._schedule(name, delay)
+
+    def _drop(self, name, chat):
+        """Stop following stream ``name`` and close its handler."""
+        with self._cond:
+            self.streams.pop(name, None)
+        chat.release_quota()
+        close = getattr(chat.handler, 'close', None)
+        if close:
+            close()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._heap:
+                        wait = self._heap[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, name = heapq.heappop(self._heap)
+                if name not in self.streams:
+                    # removed while waiting
+                    continue
+            self._executor.submit(self._poll, name)
+
+    def start(self):
+        """Start the dispatcher and worker pool in the background."""
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="chat-poll")
+            self._thread = threading.Thread(target=self._dispatch, name="chat-dispatch",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self):
+        """Start and block until :meth:`stop` is called (e.g. from a signal)."""
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(0.5)
+        finally:
+            self.stop()
+
+    def stop(self, close_handlers=True):
+        """Stop dispatching, wait for in-flight polls and close the handlers."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if close_handlers:
+            for chat in list(self.streams.values()):
+                # queued behind the last messages, so it lands before the close
+                chat.save_checkpoint()
+                close = getattr(chat.handler, 'close', None)
+                if close:
+                    close()
@@ -0,0 +1,367 @@
+"""Local stand-in for the parts of the YouTube Data API this project uses.
+
+Serves ``videos.list`` (live chat lookup) and ``liveChatMessages.list``
+with real page tokens and ``pollingIntervalMillis``, so the unmodified
+client can be load-tested on a laptop by pointing it at the server with
+YOUTUBE_API_ENDPOINT (or ``build_service(..., api_endpoint=url)``).
+
+Messages are either synthesised at a configurable rate shaped by a burst
+profile, or replayed from a recorded session (JSONL of raw API items or
+pages, optionally gzipped) with the original timing.  Synthetic messages
+are derived from their index, so the server runs in constant memory for
+any session length.
+
+Run standalone::
+
+    python -m src.testing.fake_api --port 8765 --rate 30 --profile raid
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8765/ YOUTUBE_API_KEY=x \\
+        YOUTUBE_VIDEO_ID=fakevideo01 python src/youtube_chat.py
+"""
+import bisect
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# burst profiles: repeating (seconds, rate multiplier) segments
+PROFILES = {
+    "steady": [(60, 1.0)],
+    "bursty": [(20, 0.5), (5, 4.0)],
+    "raid": [(50, 1.0), (10, 10.0)],
+    "dead": [(60, 0.0)],
+}
+
+_WORDS = ("gg", "lol", "hello", "nice", "what", "wow", "play", "again", "chat", "hype",
+          "is", "this", "live", "the", "best", "stream", "ever", "kkkk", "boa", "noite",
+          "first", "time", "here", "love", "it", "pog", "clip", "that", "no", "way")
+_EMOTES = (":yt:", ":oops:", ":hand-pink-waving:", ":face-blue-smiling:",
+           "😂", "🔥", "\u2764\ufe0f", "👍", "🎉", "😍", "👀", "🙏")
+
+
+def parse_profile(spec):
+    """Return a profile from a name in PROFILES or ``"secs:mult,secs:mult"``."""
+    if spec in PROFILES:
+        return PROFILES[spec]
+    segments = []
+    for part in spec.split(","):
+        seconds, mult = part.split(":")
+        segments.append((float(seconds), float(mult)))
+    if not segments or any(seconds <= 0 for seconds, _ in segments):
+        raise ValueError(f"invalid profile {spec!r}")
+    return segments
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def load_recording(path):
+    """Load recorded items from a JSONL (or .jsonl.gz) file.
+
+    Each line may be a single ``liveChatMessages`` item or a whole response
+    page with an ``items`` list.  Gzipped files are read with
+    ``read_archive``, so an archive left torn by a crash still replays.
+    """
+    if path.endswith(".gz"):
+        from src.handlers.archive_sink import read_archive
+        records = read_archive(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    items = []
+    for record in records:
+        if isinstance(record, dict) and "items" in record:
+            items.extend(record["items"])
+        else:
+            items.append(record)
+    return items
+
+
+class _SyntheticSource:
+    """Messages at ``rate`` per second, shaped by a repeating profile."""
+
+    def __init__(self, rate, profile, seed, authors, live_chat_id):
+        self.live_chat_id = live_chat_id
+        self.seed = seed
+        self.segments = []
+        start = 0.0
+        for seconds, mult in profile:
+            count = int(round(seconds * rate * mult))
+            self.segments.append((start, seconds, count))
+            start += seconds
+        self.cycle_seconds = start
+        self.cycle_count = sum(count for _, _, count in self.segments)
+        # zipf-like author popularity: a few regulars write most messages
+        self.authors = [f"viewer{i:04d}" for i in range(authors)]
+        self.author_weights = list(itertools.accumulate(1.0 / (i + 1) for i in range(authors)))
+
+    def available(self, elapsed):
+        if not self.cycle_count:
+            return 0
+        cycles, rem = divmod(elapsed, self.cycle_seconds)
+        total = int(cycles) * self.cycle_count
+        for start, seconds, count in self.segments:
+            if not count or rem < start:
+                continue
+            if rem >= start + seconds:
+                total += count
+            else:
+                step = seconds / count
+                total += min(count, int((rem - start) / step + 0.5))
+        return total
+
+    def offset_of(self, index):
+        cycles, j = divmod(index, self.cycle_count)
+        for start, seconds, count in self.segments:
+            if j < count:
+                return cycles * self.cycle_seconds + start + (j + 0.5) * seconds / count
+            j -= count
+        raise IndexError(index)
+
+    def item(self, index, started_at):
+        rng = random.Random(self.seed * 1000003 + index)
+        author = rng.choices(self.authors, cum_weights=self.author_weights)[0]
+        words = rng.choices(_WORDS, k=rng.randint(1, 12))
+        if rng.random() < 0.35:
+            words.insert(rng.randint(0, len(words)), rng.choice(_EMOTES) * rng.randint(1, 3))
+        text = " ".join(words)
+        channel_id = "UC" + author.rjust(22, "x")
+        published = _iso(started_at + self.offset_of(index))
+        return {
+            "kind": "youtube#liveChatMessage",
+            "id": f"fake.{self.seed}.{index}",
+            "snippet": {
+                "type": "textMessageEvent",
+                "liveChatId": self.live_chat_id,
+                "authorChannelId": channel_id,
+                "publishedAt": published,
+                "hasDisplayContent": True,
+                "displayMessage": text,
+                "textMessageDetails": {"messageText": text},
+            },
+            "authorDetails": {
+                "channelId": channel_id,
+                "displayName": author,
+                "isVerified": False,
+                "isChatOwner": False,
+                "isChatSponsor": rng.random() < 0.1,
+                "isChatModerator": False,
+            },
+        }
+
+
+def generate_messages(count, seed=1, authors=500, live_chat_id="fake-live-chat",
+                      started_at=None):
+    """Return ``count`` synthetic ``liveChatMessages`` items.
+
+    Same author/text/emote distribution as the server, for benchmarks that
+    feed handlers directly.
+    """
+    source = _SyntheticSource(max(count, 1), [(1, 1.0)], seed, authors, live_chat_id)
+    started_at = time.time() if started_at is None else started_at
+    return [source.item(i, started_at) for i in range(count)]
+
+
+class _ReplaySource:
+    """Recorded items released with their original spacing (÷ ``speed``)."""
+
+    def __init__(self, items, speed, rate):
+        self.items = items
+        offsets = []
+        first = None
+        for i, item in enumerate(items):
+            try:
+                ts = _parse_iso(item["snippet"]["publishedAt"])
+            except (KeyError, TypeError, ValueError):
+                ts = None
+            if ts is None:
+                offsets.append(i / rate)
+                continue
+            if first is None:
+                first = ts
+            offsets.append(max(0.0, ts - first) / speed)
+        # keep offsets monotonic even if the recording is slightly unordered
+        self.offsets = list(itertools.accumulate(offsets, max))
+
+    def available(self, elapsed):
+        return bisect.bisect_right(self.offsets, elapsed)
+
+    def offset_of(self, index):
+        return self.offsets[index]
+
+    def item(self, index, started_at):
+        # re-stamp publishedAt so lag measurements see replay time
+        item = dict(self.items[index])
+        if isinstance(item.get("snippet"), dict):
+            item["snippet"] = dict(item["snippet"], publishedAt=_iso(started_at + self.offsets[index]))
+        return item
+
+
+class FakeYouTubeAPI:
+    """Threaded HTTP server imitating ``videos.list`` and ``liveChatMessages.list``.
+
+    Args:
+        rate: average synthetic messages per second.
+        profile: burst profile name (see PROFILES) or ``"secs:mult,..."``.
+        polling_interval_ms: ``pollingIntervalMillis`` returned on every page.
+        replay: list of recorded items (see load_recording) to serve instead
+            of synthetic messages.
+        speed: replay speed factor (2.0 = twice as fast as recorded).
+        duration: seconds after which the chat reports ``offlineAt``.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, rate=10.0, profile="steady",
+                 polling_interval_ms=2000, replay=None, speed=1.0, duration=None,
+                 video_id="fakevideo01", live_chat_id="fake-live-chat", authors=500, seed=1):
+        self.video_id = video_id
+        self.live_chat_id = live_chat_id
+        self.polling_interval_ms = polling_interval_ms
+        self.duration = duration
+        if replay is not None:
+            self.source = _ReplaySource(replay, speed, rate or 1.0)
+        else:
+            self.source = _SyntheticSource(rate, parse_profile(profile), seed, authors,
+                                           live_chat_id)
+        self.started_at = None
+        self.requests = 0
+        self.messages_served = 0
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Serve in a background thread; returns self."""
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="fake-youtube-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            # shutdown() waits for serve_forever, so only call it when serving
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # -- API responses ------------------------------------------------------
+
+    def videos_list(self, query):
+        ids = query.get("id", [""])[0].split(",")
+        items = []
+        if self.video_id in ids:
+            items.append({
+                "kind": "youtube#video",
+                "id": self.video_id,
+                "liveStreamingDetails": {
+                    "actualStartTime": _iso(self.started_at),
+                    "activeLiveChatId": self.live_chat_id,
+                },
+            })
+        return 200, {"kind": "youtube#videoListResponse", "items": items,
+                     "pageInfo": {"totalResults": len(items), "resultsPerPage": len(items)}}
+
+    def messages_list(self, query):
+        if query.get("liveChatId", [""])[0] != self.live_chat_id:
+            return 404, {"error": {"code": 404, "message": "live chat not found",
+                                   "errors": [{"reason": "liveChatNotFound"}]}}
+        elapsed = time.time() - self.started_at
+        max_results = min(2000, max(200, int(query.get("maxResults", ["500"])[0])))
+        available = self.source.available(elapsed)
+        token = query.get("pageToken", [None])[0]
+        start = int(token) if token else max(0, available - 20)
+        end = min(available, start + max_results)
+        items = [self.source.item(i, self.started_at) for i in range(start, end)]
+        with self._stats_lock:
+            self.requests += 1
+            self.messages_served += len(items)
+        body = {
+            "kind": "youtube#liveChatMessageListResponse",
+            "pollingIntervalMillis": self.polling_interval_ms,
+            "pageInfo": {"totalResults": len(items), "resultsPerPage": len(items)},
+            "nextPageToken": str(end),
+            "items": items,
+        }
+        if self.duration is not None and elapsed >= self.duration and end >= available:
+            body["offlineAt"] = _iso(self.started_at + self.duration)
+        return 200, body
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path.endswith("/youtube/v3/videos"):
+                    status, body = api.videos_list(query)
+                elif url.path.endswith("/youtube/v3/liveChat/messages"):
+                    status, body = api.messages_list(query)
+                else:
+                    status, body = 404, {"error": {"code": 404, "message": "not found"}}
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # keep load tests quiet
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Fake YouTube live chat API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=10.0, help="messages per second")
+    parser.add_argument("--profile", default="steady",
+                        help=f"one of {', '.join(PROFILES)} or 'secs:mult,...'")
+    parser.add_argument("--polling-interval-ms", type=int, default=2000)
+    parser.add_argument("--replay", help="recorded session (.jsonl or .jsonl.gz) to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument("--duration", type=float, help="seconds until the chat goes offline")
+    parser.add_argument("--video-id", default="fakevideo01")
+    args = parser.parse_args(argv)
+
+    replay = load_recording(args.replay) if args.replay else None
+    api = FakeYouTubeAPI(args.host, args.port, rate=args.rate, profile=args.profile,
+                         polling_interval_ms=args.polling_interval_ms, replay=replay,
+                         speed=args.speed, duration=args.duration, video_id=args.video_id)
+    api.start()
+    print(f"Fake YouTube API on {api.url} (video ID {api.video_id}); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
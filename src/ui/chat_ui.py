@@ -1,11 +1,39 @@
+import collections
+import queue
+import sys
+import threading
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
 
 
 class ChatUI:
-    """Very simple GUI for displaying chat messages."""
+    """Very simple GUI for displaying chat messages.
+
+    Messages passed to :meth:`append_message` are buffered and drawn in one
+    insert every ``refresh_ms`` milliseconds, and only the newest
+    ``max_lines`` lines are kept in the widget, so a busy chat neither lags
+    the window nor grows memory without limit.  The view follows new
+    messages only while it is scrolled to the bottom; scroll up to read and
+    it stays put until you scroll back down.  ``refresh_ms=0`` draws every
+    message as soon as the Tk thread gets to it.
+
+    Only the Tk thread touches widgets.  :meth:`append_message` and
+    :meth:`call_soon` may be called from any thread: they hand work over
+    through queues that never block, and a loop scheduled with
+    ``root.after`` drains them on the Tk thread.
+    """
+
+    # how often (ms) the Tk thread checks for work when refresh_ms is 0
+    IDLE_POLL_MS = 20
+
+    def __init__(self, title="YouTube Chat", max_lines=5000, refresh_ms=100):
+        self.max_lines = max_lines
+        self.refresh_ms = refresh_ms
+        # nothing older than max_lines could ever be shown, so don't keep it
+        self._pending = collections.deque(maxlen=max_lines or None)
+        self._calls = queue.SimpleQueue()
+        self._tk_thread = threading.get_ident()
 
-    def __init__(self, title="YouTube Chat"):
         self.root = tk.Tk()
         self.root.title(title)
 
@@ -21,6 +49,8 @@ class ChatUI:
         self.text_area = ScrolledText(self.root, state="disabled", wrap="word")
         self.text_area.pack(expand=True, fill="both")
 
+        self.root.after(self.refresh_ms or self.IDLE_POLL_MS, self._drain_loop)
+
     def prompt_credentials(self):
         """Show a modal dialog asking for API key and a video URL/ID.
 
@@ -62,11 +92,56 @@ class ChatUI:
         return result['api'], result['video']
 
     def append_message(self, author: str, message: str):
-        """Add a line to the chat window."""
+        """Queue a line for the chat window; safe to call from any thread."""
+        self._pending.append(f"{author}: {message}\n")
+        if not self.refresh_ms and threading.get_ident() == self._tk_thread:
+            self.render()
+
+    def call_soon(self, func, *args):
+        """Run ``func(*args)`` on the Tk thread; safe to call from any thread."""
+        self._calls.put((func, args))
+
+    def render(self):
+        """Draw all queued lines at once and trim the scrollback.
+
+        Must run on the Tk thread.
+        """
+        if not self._pending:
+            return
+        lines = []
+        while self._pending:
+            lines.append(self._pending.popleft())
+        # follow the chat only if the user hasn't scrolled up to read
+        at_bottom = self.text_area.yview()[1] >= 0.999
         self.text_area.configure(state="normal")
-        self.text_area.insert("end", f"{author}: {message}\n")
+        self.text_area.insert("end", "".join(lines))
+        if self.max_lines:
+            # the widget always ends with an empty line after the last "\n"
+            excess = int(self.text_area.index("end-1c").split(".")[0]) - 1 - self.max_lines
+            if excess > 0:
+                self.text_area.delete("1.0", f"{excess + 1}.0")
         self.text_area.configure(state="disabled")
-        self.text_area.yview("end")
+        if at_bottom:
+            self.text_area.yview("end")
+
+    def drain(self):
+        """Run queued calls and draw queued lines.  Must run on the Tk thread."""
+        while True:
+            try:
+                func, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        self.render()
+
+    def _drain_loop(self):
+        try:
+            self.drain()
+        finally:
+            self.root.after(self.refresh_ms or self.IDLE_POLL_MS, self._drain_loop)
 
     def start(self):
         """Run the Tk main loop."""
@@ -0,0 +1,137 @@
+"""Streaming rewrites of chat CSV files.
+
+Every function here reads its input row by row (or line by line) and
+writes to a temporary file next to the target, which then atomically
+replaces it with ``os.replace``.  Memory use does not depend on the size of
+the file, and an interrupted run leaves the original untouched.
+"""
+import csv
+import os
+import shutil
+import tempfile
+
+HEADER = ("AUTHOR", "MESSAGE")
+
+
+def sniff_delimiter(first_line, default=';'):
+    """Guess a chat CSV's delimiter from its header line."""
+    if ';' in first_line:
+        return ';'
+    if ',' in first_line:
+        return ','
+    return default
+
+
+def read_first_line(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return f.readline()
+
+
+def _replace_from(target, write):
+    """Call ``write(file)`` on a temp file beside ``target``, then swap it in."""
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, tmp = tempfile.mkstemp(prefix='.convert-', suffix='.csv', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8-sig', newline='') as out:
+            write(out)
+        if os.path.exists(target):
+            shutil.copymode(target, tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def convert_delimiter(src, dst=None, from_delim=',', to_delim=';'):
+    """Rewrite ``src`` with ``to_delim`` (UTF-8 with BOM, for Excel).
+
+    Writes to ``dst`` if given, otherwise replaces ``src``.  Returns the
+    number of rows written.
+    """
+    count = 0
+
+    def write(out):
+        nonlocal count
+        writer = csv.writer(out, delimiter=to_delim)
+        with open(src, 'r', encoding='utf-8-sig', newline='') as fr:
+            for row in csv.reader(fr, delimiter=from_delim):
+                writer.writerow(row)
+                count += 1
+
+    _replace_from(dst or src, write)
+    return count
+
+
+def rewrite_header(path, header=HEADER):
+    """Make the first line of ``path`` the uppercase header.
+
+    Returns True if the file was changed.  The rest of the file is copied
+    through unchanged in fixed-size chunks.
+    """
+    first = read_first_line(path)
+    if not first:
+        return False
+    wanted = sniff_delimiter(first).join(header)
+    if first.strip() == wanted:
+        return False
+    ending = '\r\n' if first.endswith('\r\n') else '\n'
+
+    def write(out):
+        out.write(wanted + ending)
+        # reopened here (not held across the replace) so Windows can swap the file
+        with open(path, 'r', encoding='utf-8-sig', newline='') as fr:
+            fr.readline()
+            shutil.copyfileobj(fr, out, 1024 * 1024)
+
+    _replace_from(path, write)
+    return True
+
+
+def convert_file(path, to_delim=';', backup=False):
+    """Convert one file unless it already uses ``to_delim``.
+
+    Returns ``(path, status)`` where status is "converted", "skipped" or an
+    error message.  Safe to run in a worker process.
+    """
+    try:
+        first = read_first_line(path)
+        from_delim = sniff_delimiter(first, default=to_delim)
+        if not first or from_delim == to_delim:
+            return path, "skipped"
+        if backup:
+            shutil.copy2(path, path + '.bak')
+        convert_delimiter(path, from_delim=from_delim, to_delim=to_delim)
+        return path, "converted"
+    except Exception as exc:
+        return path, f"error: {exc}"
+
+
+def find_csv_files(root):
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            # skip temp files from a conversion that is still running
+            if name.lower().endswith('.csv') and not name.startswith('.convert-'):
+                yield os.path.join(dirpath, name)
+
+
+def convert_tree(root, to_delim=';', backup=False, workers=None):
+    """Convert every ``*.csv`` under ``root`` in parallel worker processes.
+
+    ``workers`` defaults to the number of CPUs; each file is streamed by a
+    single worker, so memory stays flat however large the files are.
+    Returns a list of ``(path, status)``.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+
+    paths = list(find_csv_files(root))
+    if not paths:
+        return []
+    job = partial(convert_file, to_delim=to_delim, backup=backup)
+    if workers == 1 or len(paths) == 1:
+        return [job(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(job, paths))
@@ -0,0 +1,260 @@
+"""Counters and histograms for the collector, in Prometheus text format.
+
+Metrics are off unless :func:`enable` is called (the CLI's
+``--metrics-port`` or CHAT_METRICS_PORT does that).  Instrumented code
+checks the module-level ``ENABLED`` flag before measuring anything::
+
+    from src.utils import metrics
+    if metrics.ENABLED:
+        metrics.observe("chat_api_call_seconds", elapsed, method="videos.list")
+
+so a disabled build pays for one attribute lookup per call site.  :func:`serve`
+exposes the registry on ``/metrics`` for Prometheus; :func:`render` returns
+the same text for a dump.
+"""
+import bisect
+import threading
+
+ENABLED = False
+
+# seconds; API calls, sink writes and delivery lag all fit this range
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 200, 500, 1000, 2000)
+
+# name -> (type, help, buckets)
+DEFINITIONS = {
+    "chat_api_call_seconds": ("histogram", "Latency of each API call attempt.", TIME_BUCKETS),
+    "chat_api_errors_total": ("counter", "Failed API call attempts by error class.", None),
+    "chat_messages_per_poll": ("histogram", "New messages returned by each poll.", SIZE_BUCKETS),
+    "chat_messages_total": ("counter", "Messages handed to the outputs.", None),
+    "chat_lag_seconds": ("histogram", "Delay from publishedAt to the outputs being written.",
+                         TIME_BUCKETS),
+    "chat_sink_write_seconds": ("histogram", "Time spent writing one batch, per output.",
+                                TIME_BUCKETS),
+    "chat_sink_errors_total": ("counter", "Batches an output failed to write.", None),
+    "chat_writer_errors_total": ("counter", "Batches the writer thread failed to hand over.",
+                                 None),
+    "chat_poll_errors_total": ("counter", "Polls that ended in an error, by error class.", None),
+    "chat_alerts_total": ("counter", "Messages that fired a filter rule, by rule set.", None),
+    "chat_queue_depth": ("gauge", "Messages waiting in a writer queue.", None),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """Thread-safe store of counters, histograms and callback gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        self.observe_many(name, (value,), **labels)
+
+    def observe_many(self, name, values, **labels):
+        """Record several values under one lock (e.g. a whole batch)."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(DEFINITIONS[name][2])
+            for value in values:
+                hist.observe(value)
+
+    def gauge(self, name, func, **labels):
+        """Report ``func()`` as ``name`` whenever the registry is read."""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = func
+
+    def remove_gauge(self, name, **labels):
+        with self._lock:
+            self._gauges.pop((name, tuple(sorted(labels.items()))), None)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            if labels:
+                return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+            return sum(v for (n, _), v in self._counters.items() if n == name)
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (list(h.counts), h.sum, h.count, h.buckets)
+                          for k, h in self._histograms.items()}
+            gauges = dict(self._gauges)
+        lines = []
+        for name, (kind, help_text, _) in DEFINITIONS.items():
+            samples = []
+            if kind == "counter":
+                for (n, labels), value in sorted(counters.items()):
+                    if n == name:
+                        samples.append(f"{name}{_labels(labels)} {value}")
+            elif kind == "gauge":
+                for (n, labels), func in sorted(gauges.items(), key=lambda kv: kv[0]):
+                    if n == name:
+                        try:
+                            value = func()
+                        except Exception:
+                            continue
+                        samples.append(f"{name}{_labels(labels)} {value}")
+            else:
+                for (n, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, c in zip(buckets, counts):
+                        cumulative += c
+                        samples.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+                    samples.append(f"{name}_bucket{_labels(labels, le='+Inf')} {count}")
+                    samples.append(f"{name}_sum{_labels(labels)} {total}")
+                    samples.append(f"{name}_count{_labels(labels)} {count}")
+            if samples:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, le=None):
+    items = list(labels)
+    if le is not None:
+        items.append(("le", le))
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+_registry = None
+
+
+def enable():
+    """Start collecting; returns the registry (the same one on every call)."""
+    global _registry, ENABLED
+    if _registry is None:
+        _registry = Registry()
+    ENABLED = True
+    return _registry
+
+
+def disable():
+    global _registry, ENABLED
+    ENABLED = False
+    _registry = None
+
+
+def registry():
+    """The active registry, or None while metrics are disabled."""
+    return _registry
+
+
+def inc(name, value=1, **labels):
+    if _registry is not None:
+        _registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    if _registry is not None:
+        _registry.observe(name, value, **labels)
+
+
+def observe_many(name, values, **labels):
+    if _registry is not None:
+        _registry.observe_many(name, values, **labels)
+
+
+def gauge(name, func, **labels):
+    if _registry is not None:
+        _registry.gauge(name, func, **labels)
+
+
+def render():
+    return _registry.render() if _registry is not None else ""
+
+
+def summary():
+    """One line with the headline numbers, for periodic console dumps."""
+    reg = _registry
+    if reg is None:
+        return ""
+    api = reg.histogram("chat_api_call_seconds", method="liveChatMessages.list")
+    lag = reg.histogram("chat_lag_seconds")
+    parts = [f"{reg.counter_value('chat_messages_total')} msgs"]
+    if api is not None and api.count:
+        parts.append(f"api p50<={api.quantile(0.5)}s p99<={api.quantile(0.99)}s")
+    if lag is not None and lag.count:
+        parts.append(f"lag p50<={lag.quantile(0.5)}s p99<={lag.quantile(0.99)}s")
+    parts.append(f"{reg.counter_value('chat_api_errors_total')} api errors")
+    parts.append(f"{reg.counter_value('chat_sink_errors_total')} sink errors")
+    return "[metrics] " + ", ".join(parts)
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve ``/metrics`` on a daemon thread; returns the HTTP server.
+
+    Binds to localhost by default; pass ``host="0.0.0.0"`` to let a
+    Prometheus server on another machine scrape it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    enable()
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,57 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Time the phases of a cold start and report them.
+
+    Usage::
+
+        prof = StartupProfiler(enabled=args.profile_startup, budget=2.0)
+        with prof.phase("api service"):
+            service = get_service(key)
+        prof.report()
+
+    When disabled, :meth:`phase` does nothing and :meth:`report` prints
+    nothing, so the calls can stay in the startup path permanently.
+    ``budget`` (seconds) adds an over/under-budget line to the report.
+    """
+
+    def __init__(self, enabled=True, budget=None, stream=None):
+        self.enabled = enabled
+        self.budget = budget
+        self.stream = stream
+        self.phases = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - t))
+
+    def total(self):
+        return time.perf_counter() - self._start
+
+    def report(self):
+        """Print each phase and the total; return True if within budget."""
+        total = self.total()
+        within = self.budget is None or total <= self.budget
+        if not self.enabled:
+            return within
+        out = self.stream or sys.stderr
+        print("Startup profile:", file=out)
+        for name, seconds in self.phases:
+            print(f"  {name:24s} {seconds * 1000:8.1f} ms", file=out)
+        print(f"  {'total':24s} {total * 1000:8.1f} ms", file=out)
+        if self.budget is not None:
+            verdict = "within" if within else "OVER"
+            print(f"  {verdict} budget of {self.budget * 1000:.0f} ms", file=out)
+        print("  (python -X importtime shows a per-module breakdown)", file=out)
+        return within
@@ -1,8 +1,6 @@
-from googleapiclient.discovery import build
 import os
 import sys
 import time
-import googleapiclient.errors
 
 
 def _get_base_dir():
@@ -20,35 +18,69 @@ def _get_base_dir():
 # tests can import it and so that the main script uses the same logic.
 #
 # `csv_path` defaults to the value of the CHAT_CSV_FILE environment
-# variable or `chat.csv` when unset.
+# variable or `chat.csv` when unset.  `output_dir` replaces the default
+# Logs/ folder and `sinks` picks which of "log", "csv", "sqlite", "xlsx"
+# and "archive" (raw API items, gzipped JSONL) are written (all of them
+# when None).  Any other registered sink name is created with its
+# defaults, and `analytics`/`ui` are fed whenever they are given.
+# `filter_rules` (default: the CHAT_FILTER_FILE environment variable) adds
+# the keyword/moderation filter, whose hits go to Logs/Alerts.
 def create_handler(youtube_client, ui=None, log_file="chat.log",
-                   db_path="chat.db", csv_path=None, versioned=False):
+                   db_path="chat.db", csv_path=None, versioned=False, stream_name=None,
+                   output_dir=None, sinks=None, analytics=None, filter_rules=None):
     from src.handlers.chat_handler import ChatHandler
+    if sinks is None:
+        sinks = ("log", "csv", "sqlite", "xlsx", "archive")
     # Environment variable takes precedence
     env_csv = os.getenv("CHAT_CSV_FILE")
     timestamp = time.strftime('%Y%m%d_%H%M%S')
-    logs_dir = os.path.join(_get_base_dir(), 'Logs')
+    # with several streams per process, keep each stream's files apart
+    suffix = f" {stream_name}" if stream_name else ""
+    logs_dir = output_dir or os.path.join(_get_base_dir(), 'Logs')
     txt_dir = os.path.join(logs_dir, 'TXT')
     db_dir = os.path.join(logs_dir, 'ChatDatabase')
     csv_dir = os.path.join(logs_dir, 'Chat Principal CSV')
     xlsx_dir = os.path.join(logs_dir, 'Chat principal com emotes')
-    os.makedirs(xlsx_dir, exist_ok=True)
-
-    xlsx_path = os.path.join(xlsx_dir, f"chat [{timestamp}].xlsx")
-    os.makedirs(txt_dir, exist_ok=True)
-    os.makedirs(db_dir, exist_ok=True)
-    os.makedirs(csv_dir, exist_ok=True)
-
-    if log_file is None or log_file == "chat.log":
-        log_file = os.path.join(txt_dir, f"chat [{timestamp}].log")
-    if db_path is None or db_path == "chat.db":
-        db_path = os.path.join(db_dir, f"chat [{timestamp}].db")
-    if csv_path is None:
+    raw_dir = os.path.join(logs_dir, 'Raw')
+    alerts_dir = os.path.join(logs_dir, 'Alerts')
+
+    if "log" not in sinks:
+        log_file = None
+    elif log_file is None or log_file == "chat.log":
+        os.makedirs(txt_dir, exist_ok=True)
+        log_file = os.path.join(txt_dir, f"chat [{timestamp}]{suffix}.log")
+
+    xlsx_path = None
+    if "xlsx" in sinks:
+        os.makedirs(xlsx_dir, exist_ok=True)
+        xlsx_path = os.path.join(xlsx_dir, f"chat [{timestamp}]{suffix}.xlsx")
+
+    archive_path = None
+    if "archive" in sinks:
+        os.makedirs(raw_dir, exist_ok=True)
+        archive_path = os.path.join(raw_dir, f"chat [{timestamp}]{suffix}.jsonl.gz")
+
+    filter_rules = filter_rules or os.getenv("CHAT_FILTER_FILE") or None
+    alerts_path = None
+    if filter_rules:
+        os.makedirs(alerts_dir, exist_ok=True)
+        alerts_path = os.path.join(alerts_dir, f"alerts [{timestamp}]{suffix}.jsonl")
+
+    if "sqlite" not in sinks:
+        db_path = None
+    elif db_path is None or db_path == "chat.db":
+        os.makedirs(db_dir, exist_ok=True)
+        db_path = os.path.join(db_dir, f"chat [{timestamp}]{suffix}.db")
+
+    if "csv" not in sinks:
+        csv_path = None
+    elif csv_path is None:
         if env_csv:
             csv_path = env_csv
         else:
+            os.makedirs(csv_dir, exist_ok=True)
             if versioned:
-                csv_path = os.path.join(csv_dir, f"chat [{timestamp}].csv")
+                csv_path = os.path.join(csv_dir, f"chat [{timestamp}]{suffix}.csv")
             else:
                 csv_path = os.path.join(csv_dir, "chat.csv")
 
@@ -58,17 +90,28 @@ def create_handler(youtube_client, ui=None, log_file="chat.log",
         f"  CSV : {csv_path}\n"
         f"  DB  : {db_path}\n"
         f"  XLSX: {xlsx_path}\n"
+        f"  Raw : {archive_path}\n"
+        f"  Alerts: {alerts_path}\n"
     )
 
     prev = os.environ.get('CHAT_CSV_DELIMITER')
     try:
         if versioned and os.name == 'nt' and prev is None:
             os.environ['CHAT_CSV_DELIMITER'] = ';'
+        # registered outputs without a file of their own, e.g. alerts
+        extra = {name: {} for name in sinks
+                 if name not in ("log", "csv", "sqlite", "xlsx", "archive", "analytics", "alerts",
+                                 "ui")}
+        if filter_rules:
+            extra["alerts"] = {"rules": filter_rules, "path": alerts_path}
         return ChatHandler(youtube_client, ui=ui,
                            log_file=log_file,
                            db_path=db_path,
                            csv_path=csv_path,
-                           xlsx_path=xlsx_path)
+                           xlsx_path=xlsx_path,
+                           analytics=analytics,
+                           archive_path=archive_path,
+                           sinks=extra)
     finally:
         if prev is None and 'CHAT_CSV_DELIMITER' in os.environ:
             del os.environ['CHAT_CSV_DELIMITER']
@@ -77,66 +120,286 @@ def create_handler(youtube_client, ui=None, log_file="chat.log",
 
 
 class YouTubeChat:
-    def __init__(self, api_key, live_chat_id=None, video_id=None, cache_file=None, handler=None):
+    def __init__(self, api_key, live_chat_id=None, video_id=None, cache_file=None, handler=None,
+                 scheduler=None, service=None, retry=None, quota=None, checkpoint=None):
         """Manage a chat session.
 
         Either `live_chat_id` or `video_id` must be provided.  If a video
         ID is given the live chat ID is looked up and optionally cached to
-        `cache_file`.
+        `cache_file`.  `scheduler` decides the delay between polls; by
+        default a `PollScheduler` bounded by the CHAT_POLL_MIN_SECONDS and
+        CHAT_POLL_MAX_SECONDS environment variables is used.  `service`
+        defaults to the process-wide service object for `api_key` (see
+        `src.client.service.get_service`).  `retry` is the `RetryPolicy`
+        wrapped around every API call (default: `RetryPolicy.from_env()`).
+        `quota` is an optional shared `QuotaBudget`: calls are charged to it,
+        spread over its API keys, and polls are spaced out so the budget
+        lasts until the daily reset.  `checkpoint` is an optional
+        `Checkpoint`: a session for the same live chat resumes from the
+        page token and message IDs saved there, and new ones are saved as
+        pages reach the handler's outputs.
         """
         self.api_key = api_key
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+        if service is None:
+            from src.client.service import get_service
+            service = get_service(api_key)
+        self.youtube = service
         self.handler = handler
+        if retry is None:
+            from src.client.retry import RetryPolicy
+            retry = RetryPolicy.from_env()
+        self.retry = retry
+        self.quota = quota
+        # services for the budget's other API keys, built on first use
+        self._services = {}
+        # set once this stream stopped counting towards the quota budget
+        self._unregistered = False
+        if scheduler is None:
+            from src.client.polling import PollScheduler
+            scheduler = PollScheduler(
+                min_interval=float(os.getenv('CHAT_POLL_MIN_SECONDS', '5')),
+                max_interval=float(os.getenv('CHAT_POLL_MAX_SECONDS', '30')),
+            )
+        self.scheduler = scheduler
+        # last `pollingIntervalMillis` reported by the API
+        self.polling_interval_ms = None
+        # `nextPageToken` from the previous page; each poll only returns
+        # messages posted since then.  IDs are remembered as well so a
+        # retried page is never delivered twice.  Both are only advanced
+        # after a page was delivered (see poll_once).
+        from src.client.paging import SeenIds
+        self.page_token = None
+        self.seen_ids = SeenIds()
+        # kept so the cached chat ID can be invalidated once the chat ends
+        self.video_id = video_id
+        self.cache_file = cache_file
         if live_chat_id:
             self.live_chat_id = live_chat_id
         elif video_id:
             from src.client.youtube_client import YouTubeClient
-            client = YouTubeClient(api_key)
+            client = YouTubeClient(api_key, service=service, retry=retry, quota=quota)
             self.live_chat_id = client.get_live_chat_id(video_id, cache_file=cache_file)
         else:
             raise ValueError("either live_chat_id or video_id must be provided")
+        # only now, so a failed lookup never leaves the budget paced for
+        # a stream that doesn't exist
+        if quota is not None:
+            quota.register_stream()
+        self.checkpoint = checkpoint
+        # the restored token, until the first page fetched with it succeeded
+        self._resumed_token = None
+        if checkpoint is not None:
+            state = checkpoint.load(self.live_chat_id)
+            if state and state.get('page_token'):
+                self.page_token = self._resumed_token = state['page_token']
+                for message_id in state.get('seen_ids', []):
+                    self.seen_ids.add(message_id)
+                print(f"Resuming live chat {self.live_chat_id} from the saved checkpoint")
+
+    def fetch_page(self):
+        """Fetch the next page without marking it as delivered.
+
+        Returns ``(messages, next_page_token)``; pass both to
+        :meth:`commit_page` once the messages were handed over.  Until then
+        the page token does not advance, so a failed delivery is retried on
+        the next poll instead of being lost.
+        """
+        # transient failures are retried with backoff by self.retry; whatever
+        # is left (quota, open circuit, 4xx, retries exhausted) is raised
+        from src.client.errors import ChatEndedError, is_chat_ended
+        from src.client.retry import CLIENT, QuotaExceededError, classify
+        params = {'liveChatId': self.live_chat_id, 'part': 'snippet,authorDetails'}
+        if self.page_token:
+            params['pageToken'] = self.page_token
+        while True:
+            key = self._pick_key()
+            request = self._service(key).liveChatMessages().list(**params)
+
+            def execute():
+                if self.quota is not None:
+                    self.quota.spend(key, "liveChatMessages.list")
+                return request.execute()
 
-    def get_live_chat_messages(self):
-        # note: use the correct service name `liveChatMessages`
-        max_retries = 2
-        for attempt in range(max_retries + 1):
             try:
-                response = self.youtube.liveChatMessages().list(
-                    liveChatId=self.live_chat_id,
-                    part='snippet,authorDetails'
-                ).execute()
-                # print(f"[DEBUG] liveChatMessages API response (attempt {attempt+1}):", response)
-                return response.get('items', [])
-            except Exception as exc:
-                print(f"[EXCEPTION] Exception in get_live_chat_messages (attempt {attempt+1}): {exc}")
-                import traceback
-                traceback.print_exc()
-                if attempt == max_retries:
+                # note: use the correct service name `liveChatMessages`
+                response = self.retry.call(execute, description="liveChatMessages.list")
+                break
+            except ChatEndedError:
+                raise
+            except QuotaExceededError:
+                if self.quota is None:
                     raise
+                # rotate to the next key with quota left, if any
+                self.quota.mark_exhausted(key)
+            except Exception as exc:
+                if is_chat_ended(exc):
+                    self._chat_ended()
+                if (self._resumed_token and params.get('pageToken') == self._resumed_token
+                        and classify(exc) == CLIENT):
+                    # the saved token is too old; the overlap is deduplicated
+                    # by the restored message IDs
+                    print(f"[WARNING] Saved page token was rejected ({exc}); "
+                          f"continuing from the current page")
+                    self._resumed_token = self.page_token = None
+                    del params['pageToken']
+                    continue
+                raise
+        self._resumed_token = None
+        if response.get('offlineAt'):
+            self._chat_ended()
+        self.polling_interval_ms = response.get('pollingIntervalMillis')
+        messages = self.seen_ids.filter_unseen(response.get('items', []))
+        return messages, response.get('nextPageToken')
+
+    def _pick_key(self):
+        """API key for the next call: ours, or the budget's best key."""
+        if self.quota is None:
+            return self.api_key
+        key = self.quota.pick_key()
+        if key is None:
+            from src.client.retry import QuotaExceededError, seconds_until_quota_reset
+            raise QuotaExceededError("all API keys are out of quota", seconds_until_quota_reset())
+        return key
+
+    def _service(self, key):
+        if key == self.api_key:
+            return self.youtube
+        service = self._services.get(key)
+        if service is None:
+            from src.client.service import get_service
+            service = self._services[key] = get_service(key)
+        return service
+
+    def _chat_ended(self):
+        """Drop the cached chat ID and raise ChatEndedError."""
+        from src.client.errors import ChatEndedError
+        self.release_quota()
+        if self.cache_file:
+            from src.client.chat_id_cache import ChatIdCache
+            ChatIdCache(self.cache_file).invalidate(video_id=self.video_id,
+                                                    live_chat_id=self.live_chat_id)
+        raise ChatEndedError(f"live chat {self.live_chat_id} has ended")
+
+    def release_quota(self):
+        """Stop counting this stream in the quota budget's pacing (once)."""
+        if self.quota is not None and not self._unregistered:
+            self._unregistered = True
+            self.quota.unregister_stream()
+
+    def commit_page(self, messages, next_page_token):
+        """Record a fetched page as delivered and advance the page token."""
+        self.seen_ids.mark_delivered(messages)
+        self.page_token = next_page_token or self.page_token
+        if self.checkpoint is not None and self.checkpoint.due():
+            self.save_checkpoint()
+
+    def save_checkpoint(self):
+        """Save the current position once the handler has flushed it to disk.
+
+        With a handler that supports ``on_flushed`` (WriterPipeline,
+        ChatHandler) the checkpoint is written only after everything
+        delivered so far is on disk; otherwise it is written right away.
+        """
+        if self.checkpoint is None:
+            return
+        checkpoint = self.checkpoint
+        state = checkpoint.state(self.live_chat_id, self.page_token, self.seen_ids)
+
+        def save():
+            try:
+                checkpoint.save(state)
+            except OSError as exc:
+                print(f"[EXCEPTION] Could not save checkpoint: {exc}")
+
+        on_flushed = getattr(self.handler, 'on_flushed', None)
+        if on_flushed:
+            on_flushed(save)
+        else:
+            save()
+
+    def get_live_chat_messages(self):
+        """Return the messages posted since the previous call.
+
+        The page counts as delivered as soon as it is returned.
+        """
+        messages, next_page_token = self.fetch_page()
+        self.commit_page(messages, next_page_token)
+        return messages
+
+    def poll_once(self):
+        """Fetch one page of messages, forward it and return the next delay.
+
+        The page is only marked as delivered once the handler accepted all
+        of it; if the handler raises, the same page is fetched again on the
+        next poll and messages already handed over may be repeated (at
+        least once rather than lost).  The returned value is the number of
+        seconds to wait before polling again, as decided by the scheduler
+        from the page size and the server-provided polling interval.
+        """
+        messages, next_page_token = self.fetch_page()
+        return self.deliver_page(messages, next_page_token)
+
+    def deliver_page(self, messages, next_page_token):
+        """Hand a fetched page to the handler, commit it and return the next delay."""
+        if self.handler and hasattr(self.handler, 'process_batch'):
+            self.handler.process_batch(messages)
+        else:
+            for message in messages:
+                if self.handler:
+                    self.handler.process_message(message)
                 else:
-                    import time
-                    time.sleep(2)  # Wait 2 seconds before retrying
+                    # fallback if no handler was supplied
+                    from src.handlers.message import ChatMessage
+                    parsed = ChatMessage.from_item(message)
+                    print(f"{parsed.author}: {parsed.text}")
+        self.commit_page(messages, next_page_token)
+        from src.utils import metrics
+        if metrics.ENABLED:
+            metrics.observe("chat_messages_per_poll", len(messages))
+        delay = self.scheduler.next_delay(len(messages), self.polling_interval_ms)
+        if self.quota is not None:
+            delay = self.quota.interval_for(delay, len(messages))
+        return delay
 
     def start_chat_session(self):
-        """Poll the YouTube API forever, forwarding each message to the handler."""
+        """Poll the YouTube API until the chat ends, forwarding each message to the handler.
+
+        Transient API failures don't end the session: an exhausted quota
+        waits for the daily reset, an open circuit breaker for its timeout,
+        and network/5xx errors that outlived their retries for
+        ``retry.max_delay``.  Only "chat ended" (returns) and errors that
+        retrying can't fix, such as an invalid key, stop it (raised).
+        Errors from the handler are never mistaken for API failures: they
+        are raised straight away.
+        """
+        from src.client.errors import ChatEndedError
+        from src.client.retry import (QUOTA, RETRYABLE, CircuitOpenError, QuotaExceededError,
+                                      classify)
+        from src.utils import metrics
         print("Starting YouTube chat session...")  # User-facing info, keep this
         while True:
             try:
-                messages = self.get_live_chat_messages()
-                for message in messages:
-                    if self.handler:
-                        self.handler.process_message(message)
-                    else:
-                        # fallback if no handler was supplied
-                        author = message.get('authorDetails', {}).get('displayName')
-                        text = message.get('snippet', {}).get('displayMessage')
-                        print(f"{author}: {text}")
-                time.sleep(18)  # Polling interval
+                messages, next_page_token = self.fetch_page()
+            except ChatEndedError:
+                print("Live chat has ended.")  # User-facing info, keep this
+                return
+            except (QuotaExceededError, CircuitOpenError) as exc:
+                print(f"[EXCEPTION] {exc}; pausing for {exc.retry_after:.0f}s")
+                metrics.inc("chat_poll_errors_total",
+                            kind="circuit_open" if isinstance(exc, CircuitOpenError) else QUOTA)
+                delay = exc.retry_after
             except Exception as exc:
+                kind = classify(exc)
                 print(f"[EXCEPTION] Exception in start_chat_session polling loop: {exc}")
+                metrics.inc("chat_poll_errors_total", kind=kind)
                 import traceback
                 traceback.print_exc()
-                raise
+                if kind not in RETRYABLE:
+                    raise
+                delay = self.retry.max_delay
+            else:
+                delay = self.deliver_page(messages, next_page_token)
+            time.sleep(delay)  # Polling interval
 
 
 if __name__ == "__main__":
@@ -146,6 +409,12 @@ if __name__ == "__main__":
     if root not in sys.path:
         sys.path.insert(0, root)
 
+    # any command-line arguments select the headless collector, which
+    # never loads tkinter (see src/cli.py or --help)
+    if len(sys.argv) > 1:
+        from src.cli import main
+        sys.exit(main())
+
     # Obtain credentials from environment or prompt the user.
     API_KEY = os.getenv('YOUTUBE_API_KEY')
     LIVE_CHAT_ID = os.getenv('YOUTUBE_LIVE_CHAT_ID')
@@ -158,20 +427,15 @@ if __name__ == "__main__":
     # print(f"[DEBUG] CACHE_FILE: {CACHE_FILE}")
 
     # helper that strips a full youtube link down to the raw ID
-    import re
-    def normalize_video_id(val):
-        if not val:
-            return val
-        # common patterns: v=ID, youtu.be/ID
-        m = re.search(r"(?:v=|youtu\.be/)([A-Za-z0-9_-]{11})", val)
-        if m:
-            return m.group(1)
-        return val
+    from src.cli import normalize_video_id
 
     # start UI for optional prompting and display
     try:
         from src.ui.chat_ui import ChatUI
-        ui = ChatUI()
+        ui = ChatUI(
+            max_lines=int(os.getenv('CHAT_UI_MAX_LINES', '5000')),
+            refresh_ms=int(os.getenv('CHAT_UI_REFRESH_MS', '100')),
+        )
     except Exception:
         ui = None
 
@@ -212,14 +476,46 @@ if __name__ == "__main__":
             # print(f"[DEBUG] Creating YouTubeChat with API_KEY: {API_KEY}, LIVE_CHAT_ID: {LIVE_CHAT_ID}, VIDEO_ID: {VIDEO_ID}, CACHE_FILE: {CACHE_FILE}")
             # create a new, timestamped CSV for this run so logs are versioned
             handler = create_handler(yt_client, ui=ui, versioned=True)
+            # the poll thread only enqueues; a writer thread feeds the sinks
+            # so a slow disk never delays the next API call
+            from src.client.checkpoint import Checkpoint
+            from src.client.quota import budget_from_env
+            from src.handlers.pipeline import WriterPipeline
+            if os.getenv('CHAT_METRICS_PORT'):
+                # Prometheus-style counters and histograms on localhost
+                from src.utils import metrics
+                metrics.serve(int(os.getenv('CHAT_METRICS_PORT')),
+                              host=os.getenv('CHAT_METRICS_HOST', '127.0.0.1'))
+            pipeline = WriterPipeline(
+                handler,
+                maxsize=int(os.getenv('CHAT_QUEUE_MAXSIZE', '10000')),
+                overflow=os.getenv('CHAT_QUEUE_OVERFLOW', 'block'),
+            ).start()
+            # make sure queued and buffered output reaches disk however we exit;
+            # SIGTERM (e.g. from a service manager) goes through the same path
+            import atexit
+            import signal
+            atexit.register(pipeline.close, 10)
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
             chat = YouTubeChat(
                 API_KEY,
                 live_chat_id=LIVE_CHAT_ID,
                 video_id=VIDEO_ID,
                 cache_file=CACHE_FILE,
-                handler=handler,
+                handler=pipeline,
+                # pace polling to a daily budget if one is configured
+                quota=budget_from_env(API_KEY),
+                # carry on from the last run's position after a crash or restart
+                checkpoint=Checkpoint(
+                    os.path.join(_get_base_dir(), 'Logs', 'Checkpoints',
+                                 f"{VIDEO_ID or LIVE_CHAT_ID}.json"),
+                    interval=float(os.getenv('CHAT_CHECKPOINT_SECONDS', '5')),
+                ),
             )
             # print(f"[DEBUG] YouTubeChat created. live_chat_id: {getattr(chat, 'live_chat_id', None)}")
+            # registered after pipeline.close, so it runs first and the final
+            # checkpoint is queued behind the last messages
+            atexit.register(chat.save_checkpoint)
 
             import threading
             def run_poll():
@@ -238,8 +534,9 @@ if __name__ == "__main__":
                             ui.root.destroy()
                         except Exception:
                             pass
+                    # never touch Tk from this thread; let the UI loop do it
                     try:
-                        ui.root.after(0, show_error)
+                        ui.call_soon(show_error)
                     except Exception:
                         pass
             poll_thread = threading.Thread(target=run_poll, daemon=True)
@@ -0,0 +1,78 @@
+import random
+import unittest
+
+from src.handlers.analytics import ChatAnalytics, HyperLogLog, SlidingWindowCounter, SpaceSaving
+from src.handlers.chat_handler import ChatHandler
+
+
+class TestSketches(unittest.TestCase):
+
+    def test_sliding_window_forgets_old_buckets(self):
+        counter = SlidingWindowCounter(window=60, resolution=1)
+        counter.add(10, now=1000)
+        counter.add(5, now=1030)
+        self.assertEqual(counter.count(now=1030), 15)
+        self.assertEqual(counter.count(now=1065), 5)
+        self.assertEqual(counter.count(now=1200), 0)
+        self.assertAlmostEqual(counter.rate_per_minute(now=1030), 15)
+
+    def test_space_saving_finds_heavy_hitters(self):
+        rng = random.Random(3)
+        top = SpaceSaving(capacity=20)
+        stream = ["whale"] * 500 + ["fan"] * 300 + [f"u{rng.randrange(5000)}" for _ in range(3000)]
+        rng.shuffle(stream)
+        for author in stream:
+            top.add(author)
+        self.assertLessEqual(len(top.counts), 20)
+        ranked = top.top(2)
+        self.assertEqual([key for key, _, _ in ranked], ["whale", "fan"])
+        for key, count, error in ranked:
+            true = stream.count(key)
+            self.assertGreaterEqual(count, true)
+            self.assertLessEqual(count - error, true)
+
+    def test_hyperloglog_estimate_within_a_few_percent(self):
+        hll = HyperLogLog(precision=12)
+        for i in range(20000):
+            hll.add(f"author{i}")
+            hll.add(f"author{i}")
+        self.assertEqual(len(hll.registers), 4096)
+        self.assertLess(abs(hll.count() - 20000) / 20000, 0.05)
+        small = HyperLogLog()
+        for name in ("a", "b", "c", "a"):
+            small.add(name)
+        self.assertEqual(small.count(), 3)
+
+
+class TestChatAnalytics(unittest.TestCase):
+
+    def test_handler_feeds_analytics(self):
+        analytics = ChatAnalytics(keywords=["gg", "hype train"])
+        handler = ChatHandler(None, log_file="test.log", analytics=analytics)
+        handler.process_batch([{"author": "ana", "text": "GG everyone"},
+                               {"author": "bo", "text": "hype train! gg"},
+                               {"author": "ana", "text": "eggs"}])
+        handler.close()
+        snap = analytics.snapshot()
+        self.assertEqual(snap["total"], 3)
+        self.assertEqual(snap["unique_authors"], 2)
+        self.assertEqual(snap["top_authors"][0][:2], ("ana", 2))
+        self.assertEqual(snap["keywords"], {"gg": 2, "hype train": 1})
+        self.assertGreater(snap["per_minute_short"], 0)
+
+    def test_channel_ids_punctuated_and_unicode_keywords(self):
+        from src.handlers.message import ChatMessage
+        analytics = ChatAnalytics(keywords=[":yt:", "<3", "pass"])
+        analytics.add_batch([
+            ChatMessage("Ana", ":yt: <3", channel_id="UC1"),
+            # same person under a new display name, someone else under the old one
+            ChatMessage("Ana 2", "PAſS", channel_id="UC1"),
+            ChatMessage("Ana", "a:yt:b passes", channel_id="UC2"),
+        ])
+        snap = analytics.snapshot()
+        self.assertEqual(snap["unique_authors"], 2)
+        self.assertEqual(snap["keywords"], {":yt:": 1, "<3": 1, "pass": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import types
+import unittest
+
+from googleapiclient.errors import HttpError
+
+from src.client.checkpoint import Checkpoint
+from src.client.polling import PollScheduler
+from src.client.retry import RetryPolicy
+from src.handlers.archive_sink import ArchiveSink, read_archive
+from src.handlers.pipeline import WriterPipeline
+from src.youtube_chat import YouTubeChat
+
+
+def item(i):
+    return {"id": f"m{i}", "snippet": {"displayMessage": f"hello {i}"},
+            "authorDetails": {"displayName": "viewer"}}
+
+
+class Pages:
+    """liveChatMessages stand-in recording the page tokens it is asked for."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.tokens = []
+
+    def execute(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def liveChatMessages(self):
+        return self
+
+    def list(self, **kwargs):
+        self.tokens.append(kwargs.get("pageToken"))
+        return self
+
+
+class Recorder:
+    def __init__(self):
+        self.items = []
+        self.events = []
+
+    def process_batch(self, messages):
+        self.items.extend(messages)
+        self.events.append(("batch", len(messages)))
+
+    def flush(self):
+        self.events.append(("flush",))
+
+
+class TestArchiveSink(unittest.TestCase):
+
+    def test_round_trip_survives_torn_tail_and_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "raw.jsonl.gz")
+            sink = ArchiveSink(path, flush_interval=0)
+            sink.write_batch([item(i) for i in range(100)])
+            sink.write_batch([item(100)])
+            # crash in the middle of writing the last member
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) - 20)
+            sink._file.close()
+            self.assertEqual([m["id"] for m in read_archive(path)],
+                             [f"m{i}" for i in range(100)])
+            # a restarted collector appends after the damage
+            sink = ArchiveSink(path)
+            sink.write_batch([item(200)])
+            sink.close()
+            ids = [m["id"] for m in read_archive(path)]
+            self.assertEqual(len(ids), 101)
+            self.assertEqual(ids[-1], "m200")
+
+    def test_buffered_until_flush(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "raw.jsonl.gz")
+            sink = ArchiveSink(path, flush_interval=60)
+            sink.write_batch([item(1)])
+            self.assertEqual(list(read_archive(path)), [])
+            sink.sync()
+            self.assertEqual(list(read_archive(path)), [item(1)])
+            sink.close()
+
+
+class TestFlushBarrier(unittest.TestCase):
+
+    def test_callback_runs_after_earlier_messages_are_flushed(self):
+        handler = Recorder()
+        pipeline = WriterPipeline(handler)
+        pipeline.submit([item(1), item(2)])
+        pipeline.on_flushed(lambda: handler.events.append(("checkpoint",)))
+        pipeline.submit([item(3)])
+        pipeline.close()
+        self.assertEqual(handler.events[:3], [("batch", 2), ("flush",), ("checkpoint",)])
+        self.assertEqual(handler.events[3], ("batch", 1))
+
+    def test_barrier_keeps_its_place_when_spilling(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = Recorder()
+            pipeline = WriterPipeline(handler, maxsize=1, overflow="spill",
+                                      spill_path=os.path.join(tmp, "spill.jsonl"))
+            pipeline.submit([item(1), item(2), item(3)])
+            pipeline.on_flushed(lambda: handler.events.append(("checkpoint", len(handler.items))))
+            pipeline.submit([item(4)])
+            pipeline.close()
+            self.assertIn(("checkpoint", 3), handler.events)
+            self.assertEqual([m["id"] for m in handler.items], ["m1", "m2", "m3", "m4"])
+            self.assertEqual(pipeline.metrics()["written"], 4)
+
+    def test_callback_skipped_when_writing_failed(self):
+        class Failing(Recorder):
+            def process_batch(self, messages):
+                raise OSError("disk full")
+
+        called = []
+        pipeline = WriterPipeline(Failing())
+        pipeline.submit([item(1)])
+        pipeline.on_flushed(lambda: called.append(True))
+        pipeline.close()
+        self.assertEqual(called, [])
+
+
+class TestResume(unittest.TestCase):
+
+    def make_chat(self, service, checkpoint, handler):
+        return YouTubeChat("key", live_chat_id="chat1", service=service, handler=handler,
+                           scheduler=PollScheduler(0.01, 0.01), checkpoint=checkpoint,
+                           retry=RetryPolicy(sleep=lambda s: None))
+
+    def test_restart_resumes_from_saved_token(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "chat1.json")
+            handler = Recorder()
+            first = Pages({"items": [item(1), item(2)], "nextPageToken": "t1"},
+                          {"items": [item(3)], "nextPageToken": "t2"})
+            chat = self.make_chat(first, Checkpoint(path, interval=0), handler)
+            chat.poll_once()
+            chat.poll_once()
+            self.assertEqual(Checkpoint(path).load("chat1")["page_token"], "t2")
+            # another chat's checkpoint is never applied
+            self.assertIsNone(Checkpoint(path).load("chat2"))
+
+            # the restarted collector asks for t2; m3 repeated by the API is dropped
+            second = Pages({"items": [item(3), item(4)], "nextPageToken": "t3"})
+            chat = self.make_chat(second, Checkpoint(path, interval=0), handler)
+            chat.poll_once()
+            self.assertEqual(second.tokens, ["t2"])
+            self.assertEqual([m["id"] for m in handler.items], ["m1", "m2", "m3", "m4"])
+
+    def test_rejected_token_falls_back_to_live_edge(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = Checkpoint(os.path.join(tmp, "chat1.json"))
+            checkpoint.save({"live_chat_id": "chat1", "page_token": "stale", "seen_ids": ["m1"]})
+            content = json.dumps({"error": {"errors": [{"reason": "pageTokenInvalid"}]}}).encode()
+            error = HttpError(types.SimpleNamespace(status=400, reason="Bad Request"), content)
+            service = Pages(error, {"items": [item(1), item(2)], "nextPageToken": "t1"})
+            handler = Recorder()
+            chat = self.make_chat(service, checkpoint, handler)
+            chat.poll_once()
+            self.assertEqual(service.tokens, ["stale", None])
+            self.assertEqual([m["id"] for m in handler.items], ["m2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
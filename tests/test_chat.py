@@ -1,14 +1,35 @@
 import unittest
+import collections
+import queue
 import os
 import sqlite3
 import csv
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 from src.client.youtube_client import YouTubeClient
 from src.handlers.chat_handler import ChatHandler
 from src.youtube_chat import YouTubeChat
 
 
+def setUpModule():
+    # keep the discovery document cache out of the developer's home
+    global _discovery_dir, _discovery_env
+    _discovery_dir = tempfile.TemporaryDirectory()
+    _discovery_env = os.environ.get("YOUTUBE_DISCOVERY_CACHE")
+    os.environ["YOUTUBE_DISCOVERY_CACHE"] = os.path.join(_discovery_dir.name, "discovery.json")
+
+
+def tearDownModule():
+    if _discovery_env is None:
+        os.environ.pop("YOUTUBE_DISCOVERY_CACHE", None)
+    else:
+        os.environ["YOUTUBE_DISCOVERY_CACHE"] = _discovery_env
+    _discovery_dir.cleanup()
+
+
 class DummyUI:
     def __init__(self):
         self.messages = []
@@ -74,6 +95,66 @@ class TestYouTubeChat(unittest.TestCase):
         handler._db_conn.close()
         os.remove(db_file)
 
+    def test_batch_written_in_one_transaction(self):
+        db_file = "test_batch.db"
+        if os.path.exists(db_file):
+            os.remove(db_file)
+        handler = ChatHandler(self.client, db_path=db_file, log_file="test.log")
+        result = handler.process_batch([{'author': 'a', 'text': '1'},
+                                        {'author': 'b', 'text': '2'}])
+        self.assertEqual(result, [{"author": "a", "text": "1"},
+                                  {"author": "b", "text": "2"}])
+        mode = handler._db_conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+        handler.close()
+        conn = sqlite3.connect(db_file)
+        rows = conn.execute("SELECT author,text FROM messages ORDER BY rowid").fetchall()
+        conn.close()
+        self.assertEqual(rows, [("a", "1"), ("b", "2")])
+        os.remove(db_file)
+
+    def test_csv_rows_buffered_until_flush(self):
+        csv_file = "test_buffered.csv"
+        if os.path.exists(csv_file):
+            os.remove(csv_file)
+        handler = ChatHandler(self.client, csv_path=csv_file, log_file="test.log",
+                              csv_flush_interval=3600)
+        handler.process_message({'author': 'carl', 'text': 'hola'})
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            self.assertEqual(list(csv.reader(f)), [["AUTHOR", "MESSAGE"]])
+        handler.flush()
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            self.assertEqual(list(csv.reader(f))[1:], [["carl", "hola"]])
+        handler.close()
+        os.remove(csv_file)
+
+    def test_xlsx_export_keeps_emotes(self):
+        try:
+            import openpyxl
+        except ImportError:
+            self.skipTest("openpyxl not installed")
+        xlsx_file = "test_export.xlsx"
+        handler = ChatHandler(self.client, xlsx_path=xlsx_file, log_file="test.log")
+        handler.process_batch([{'author': 'carl', 'text': 'gg :yt::yt: 🎉'},
+                               {'author': 'dana', 'text': 'plain'}])
+        handler.close()
+        sheet = openpyxl.load_workbook(xlsx_file, read_only=True).active
+        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(rows[0], ["AUTHOR", "MESSAGE", "EMOTES"])
+        self.assertEqual(rows[1], ["carl", "gg :yt::yt: 🎉", ":yt::yt: 🎉"])
+        self.assertEqual(rows[2][:2], ["dana", "plain"])
+        os.remove(xlsx_file)
+
+    def test_close_releases_log_file_and_rejects_writes(self):
+        handler = ChatHandler(self.client, log_file="test.log")
+        log_handler = handler.logger.handlers[0]
+        handler.close()
+        self.assertEqual(handler.logger.handlers, [])
+        self.assertIsNone(log_handler.stream)
+        with self.assertRaises(RuntimeError):
+            handler.process_message({'author': 'late', 'text': 'too late'})
+        handler.close()
+
     def test_project_handler_default_csv(self):
         # ensure the helper used by the main script assigns a default csv path
         from src.youtube_chat import create_handler
@@ -116,6 +197,538 @@ class TestYouTubeChat(unittest.TestCase):
         YouTubeClient.get_live_chat_id = orig
 
 
+class FakeRequest:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self):
+        return self.response
+
+
+class FakeLiveChatMessages:
+    """Stand-in for ``service.liveChatMessages()`` returning canned pages."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.calls = []
+
+    def list(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeRequest(self.pages.pop(0))
+
+
+class FakeService:
+    def __init__(self, pages):
+        self.messages = FakeLiveChatMessages(pages)
+
+    def liveChatMessages(self):
+        return self.messages
+
+
+class TestPollScheduler(unittest.TestCase):
+
+    def test_backs_off_on_empty_pages(self):
+        from src.client.polling import PollScheduler
+        sched = PollScheduler(min_interval=2, max_interval=10, backoff_factor=2)
+        delays = [sched.next_delay(0) for _ in range(4)]
+        self.assertEqual(delays, [4, 8, 10, 10])
+        self.assertEqual(sched.empty_streak, 4)
+
+    def test_tightens_when_hot(self):
+        from src.client.polling import PollScheduler
+        sched = PollScheduler(min_interval=2, max_interval=10, initial_interval=10,
+                              hot_threshold=5)
+        self.assertEqual(sched.next_delay(50), 2)
+
+    def test_server_interval_is_a_floor(self):
+        from src.client.polling import PollScheduler
+        sched = PollScheduler(min_interval=1, max_interval=10)
+        self.assertEqual(sched.next_delay(100, server_interval_ms=3000), 3)
+
+    def test_poll_once_uses_server_interval(self):
+        page = {'pollingIntervalMillis': 7000,
+                'items': [{'author': 'eve', 'text': 'yo'}]}
+        chat = YouTubeChat(api_key="k", live_chat_id="LC")
+        chat.youtube = FakeService([page])
+        delay = chat.poll_once()
+        self.assertEqual(chat.polling_interval_ms, 7000)
+        self.assertGreaterEqual(delay, 7)
+
+
+class TestIncrementalPaging(unittest.TestCase):
+
+    def test_page_token_carried_and_duplicates_dropped(self):
+        first = {'nextPageToken': 'T1', 'items': [{'id': 'a', 'author': 'x', 'text': '1'},
+                                                  {'id': 'b', 'author': 'x', 'text': '2'}]}
+        second = {'nextPageToken': 'T2', 'items': [{'id': 'b', 'author': 'x', 'text': '2'},
+                                                   {'id': 'c', 'author': 'y', 'text': '3'}]}
+        chat = YouTubeChat(api_key="k", live_chat_id="LC")
+        chat.youtube = FakeService([first, second])
+        self.assertEqual([m['id'] for m in chat.get_live_chat_messages()], ['a', 'b'])
+        self.assertEqual([m['id'] for m in chat.get_live_chat_messages()], ['c'])
+        calls = chat.youtube.messages.calls
+        self.assertNotIn('pageToken', calls[0])
+        self.assertEqual(calls[1]['pageToken'], 'T1')
+        self.assertEqual(chat.page_token, 'T2')
+
+    def test_failed_delivery_is_retried(self):
+        page = {'nextPageToken': 'T1', 'items': [{'id': 'a', 'author': 'x', 'text': '1'}]}
+
+        class Flaky:
+            def __init__(self):
+                self.calls = 0
+                self.delivered = []
+
+            def process_batch(self, messages):
+                self.calls += 1
+                if self.calls == 1:
+                    raise IOError("disk full")
+                self.delivered.extend(messages)
+
+        handler = Flaky()
+        chat = YouTubeChat(api_key="k", live_chat_id="LC", handler=handler)
+        chat.youtube = FakeService([page, page])
+        with self.assertRaises(IOError):
+            chat.poll_once()
+        self.assertIsNone(chat.page_token)
+        chat.poll_once()
+        self.assertEqual([m['id'] for m in handler.delivered], ['a'])
+        self.assertNotIn('pageToken', chat.youtube.messages.calls[1])
+        self.assertEqual(chat.page_token, 'T1')
+
+    def test_client_carries_page_token(self):
+        client = YouTubeClient(api_key='k')
+        client.service = FakeService([
+            {'nextPageToken': 'N1', 'items': [{'id': 'a'}]},
+            {'nextPageToken': 'N2', 'items': [{'id': 'a'}, {'id': 'b'}]},
+        ])
+        self.assertEqual(client.get_chat_messages('LC'), [{'id': 'a'}])
+        self.assertEqual(client.get_chat_messages('LC'), [{'id': 'b'}])
+        self.assertEqual(client.service.messages.calls[1]['pageToken'], 'N1')
+
+    def test_seen_ids_is_bounded(self):
+        from src.client.paging import SeenIds
+        seen = SeenIds(maxlen=2)
+        for message_id in ('a', 'b', 'c'):
+            seen.add(message_id)
+        self.assertEqual(len(seen), 2)
+        self.assertNotIn('a', seen)
+        self.assertIn('c', seen)
+
+
+class RecordingHandler:
+    """Handler whose writes can be held back to simulate a slow disk."""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.closed = False
+
+    def process_batch(self, messages):
+        self.gate.wait()
+        self.batches.append(list(messages))
+
+    def close(self):
+        self.closed = True
+
+    def messages(self):
+        return [m for batch in self.batches for m in batch]
+
+
+class TestWriterPipeline(unittest.TestCase):
+
+    def test_messages_reach_handler_in_order(self):
+        from src.handlers.pipeline import WriterPipeline
+        handler = RecordingHandler()
+        pipeline = WriterPipeline(handler, maxsize=10).start()
+        pipeline.process_batch([{'id': i} for i in range(5)])
+        pipeline.process_message({'id': 5})
+        pipeline.close(timeout=5)
+        self.assertEqual([m['id'] for m in handler.messages()], list(range(6)))
+        self.assertTrue(handler.closed)
+        self.assertEqual(pipeline.metrics()['written'], 6)
+
+    def test_drop_oldest(self):
+        from src.handlers.pipeline import WriterPipeline
+        handler = RecordingHandler()
+        pipeline = WriterPipeline(handler, maxsize=3, overflow="drop-oldest")
+        pipeline.submit([{'id': i} for i in range(5)])
+        metrics = pipeline.metrics()
+        self.assertEqual(metrics['dropped'], 2)
+        self.assertEqual(metrics['depth'], 3)
+        pipeline.close()
+        self.assertEqual([m['id'] for m in handler.messages()], [2, 3, 4])
+
+    def test_spill_preserves_order(self):
+        from src.handlers.pipeline import WriterPipeline
+        spill = "test_spill.jsonl"
+        handler = RecordingHandler()
+        pipeline = WriterPipeline(handler, maxsize=2, overflow="spill",
+                                  spill_path=spill, max_batch=2)
+        pipeline.submit([{'id': i} for i in range(7)])
+        self.assertEqual(pipeline.metrics()['spilled'], 5)
+        self.assertEqual(pipeline.depth(), 7)
+        pipeline.close()
+        self.assertEqual([m['id'] for m in handler.messages()], list(range(7)))
+        os.remove(spill)
+
+    def test_block_applies_backpressure(self):
+        from src.handlers.pipeline import WriterPipeline
+        handler = RecordingHandler()
+        handler.gate.clear()
+        pipeline = WriterPipeline(handler, maxsize=2, max_batch=1).start()
+        producer = threading.Thread(
+            target=pipeline.submit, args=([{'id': i} for i in range(6)],))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        handler.gate.set()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        pipeline.close(timeout=5)
+        self.assertEqual(len(handler.messages()), 6)
+        self.assertLessEqual(pipeline.metrics()['high_water'], 2)
+
+
+class FailingHandler(RecordingHandler):
+    def process_batch(self, messages):
+        raise IOError("disk full")
+
+
+class TestWriterPipelineFailures(unittest.TestCase):
+
+    def test_failed_batches_not_counted_as_written(self):
+        from src.handlers.pipeline import WriterPipeline
+        pipeline = WriterPipeline(FailingHandler()).start()
+        pipeline.submit([{'id': 1}, {'id': 2}])
+        self.assertTrue(pipeline.wait_idle(timeout=5))
+        metrics = pipeline.metrics()
+        self.assertEqual(metrics['written'], 0)
+        self.assertEqual(metrics['failed'], 2)
+        pipeline.close(timeout=5)
+
+    def test_close_leaves_busy_handler_open(self):
+        from src.handlers.pipeline import WriterPipeline
+        handler = RecordingHandler()
+        handler.gate.clear()
+        pipeline = WriterPipeline(handler).start()
+        pipeline.submit([{'id': 1}])
+        self.assertFalse(pipeline.close(timeout=0.1))
+        self.assertFalse(handler.closed)
+        handler.gate.set()
+        self.assertTrue(pipeline.close(timeout=5))
+        self.assertTrue(handler.closed)
+
+    def test_idle_writer_flushes_handler(self):
+        from src.handlers.pipeline import WriterPipeline
+        handler = RecordingHandler()
+        flushed = threading.Event()
+        handler.flush = flushed.set
+        pipeline = WriterPipeline(handler, idle_flush=0.05).start()
+        self.assertTrue(flushed.wait(5))
+        pipeline.close(timeout=5)
+
+    def test_temporary_spill_file_removed(self):
+        from src.handlers.pipeline import WriterPipeline
+        pipeline = WriterPipeline(RecordingHandler(), maxsize=1, overflow="spill")
+        pipeline.submit([{'id': 1}, {'id': 2}])
+        spill = pipeline.spill_path
+        self.assertTrue(os.path.exists(spill))
+        pipeline.close()
+        self.assertFalse(os.path.exists(spill))
+
+
+class TestStreamSupervisor(unittest.TestCase):
+
+    def test_polls_each_stream_with_its_own_handler(self):
+        from src.client.polling import PollScheduler
+        from src.supervisor import StreamSupervisor
+
+        class Service:
+            """Returns one message per call, tagged with the chat ID."""
+
+            def __init__(self):
+                self.lock = threading.Lock()
+                self.count = 0
+
+            def liveChatMessages(self):
+                return self
+
+            def list(self, liveChatId, **kwargs):
+                with self.lock:
+                    self.count += 1
+                    n = self.count
+                return FakeRequest({'items': [{'id': f'{liveChatId}-{n}', 'chat': liveChatId}]})
+
+        service = Service()
+        sup = StreamSupervisor("k", max_workers=2, service=service,
+                               scheduler_factory=lambda: PollScheduler(0.01, 0.02))
+        handlers = {name: RecordingHandler() for name in ("A", "B", "C")}
+        for name, handler in handlers.items():
+            sup.add_stream(live_chat_id=name, handler=handler)
+        sup.start()
+        deadline = time.time() + 5
+        while time.time() < deadline and any(len(h.messages()) < 3 for h in handlers.values()):
+            time.sleep(0.01)
+        sup.stop()
+        for name, handler in handlers.items():
+            self.assertGreaterEqual(len(handler.messages()), 3)
+            self.assertTrue(all(m['chat'] == name for m in handler.messages()))
+            self.assertTrue(handler.closed)
+            self.assertIs(sup.streams[name].youtube, service)
+
+
+class TestSharedService(unittest.TestCase):
+
+    def test_one_service_shared_per_key(self):
+        client = YouTubeClient(api_key='shared_key')
+        chat = YouTubeChat(api_key='shared_key', live_chat_id='LC')
+        self.assertIs(client.service, chat.youtube)
+
+    def test_client_builds_service_on_first_use(self):
+        client = YouTubeClient(api_key='lazy_key')
+        self.assertIsNone(client._service_obj)
+        self.assertTrue(client.connect())
+        self.assertIsNotNone(client._service_obj)
+
+    def test_discovery_document_cached_on_disk(self):
+        from src.client.service import build_service, load_discovery_document
+        cache = "test_discovery.json"
+        if os.path.exists(cache):
+            os.remove(cache)
+        doc = load_discovery_document(cache)
+        self.assertTrue(os.path.exists(cache))
+        with open(cache, encoding='utf-8') as f:
+            self.assertEqual(f.read(), doc)
+        service = build_service('k', discovery_doc=load_discovery_document(cache))
+        self.assertTrue(hasattr(service, 'liveChatMessages'))
+        os.remove(cache)
+
+
+class FakeVideos:
+    def __init__(self, live_chat_id):
+        self.live_chat_id = live_chat_id
+        self.calls = 0
+
+    def videos(self):
+        return self
+
+    def list(self, **kwargs):
+        self.calls += 1
+        return FakeRequest({'items': [{'liveStreamingDetails': {
+            'activeLiveChatId': self.live_chat_id, 'actualStartTime': 'x'}}]})
+
+
+class TestChatIdCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = "test_chat_id.cache"
+        if os.path.exists(self.cache):
+            os.remove(self.cache)
+
+    def tearDown(self):
+        if os.path.exists(self.cache):
+            os.remove(self.cache)
+
+    def test_lookup_is_cached(self):
+        client = YouTubeClient(api_key='k', service=FakeVideos("LC1"), debug_dump=False)
+        self.assertEqual(client.get_live_chat_id("vid", cache_file=self.cache), "LC1")
+        self.assertEqual(client.get_live_chat_id("vid", cache_file=self.cache), "LC1")
+        self.assertEqual(client.service.calls, 1)
+        self.assertFalse(os.path.exists("youtube_api_response.json"))
+
+    def test_expired_and_invalidated_entries_are_refetched(self):
+        client = YouTubeClient(api_key='k', service=FakeVideos("LC1"), cache_ttl=0)
+        client.get_live_chat_id("vid", cache_file=self.cache)
+        time.sleep(0.01)
+        client.get_live_chat_id("vid", cache_file=self.cache)
+        self.assertEqual(client.service.calls, 2)
+        client.cache_ttl = 3600
+        client.invalidate_live_chat_id(self.cache, live_chat_id="LC1")
+        client.get_live_chat_id("vid", cache_file=self.cache)
+        self.assertEqual(client.service.calls, 3)
+
+    def test_legacy_cache_file_ignored(self):
+        with open(self.cache, 'w') as f:
+            f.write("ID123")
+        client = YouTubeClient(api_key='k', service=FakeVideos("LC1"))
+        self.assertEqual(client.get_live_chat_id("vid", cache_file=self.cache), "LC1")
+
+    def test_chat_end_invalidates_cache(self):
+        from src.client.errors import ChatEndedError
+        from src.client.chat_id_cache import ChatIdCache
+        ChatIdCache(self.cache).put("vid", "LC1")
+        chat = YouTubeChat(api_key="k", video_id="vid", cache_file=self.cache)
+        self.assertEqual(chat.live_chat_id, "LC1")
+        chat.youtube = FakeService([{'offlineAt': '2026-01-01T00:00:00Z', 'items': []}])
+        with self.assertRaises(ChatEndedError):
+            chat.poll_once()
+        self.assertIsNone(ChatIdCache(self.cache).get("vid"))
+
+
+class TestSQLiteSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.db_file = "test_schema.db"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_file + suffix):
+                os.remove(self.db_file + suffix)
+
+    def tearDown(self):
+        self.setUp()
+
+    def api_message(self, msg_id, author, text, published="2024-05-01T12:00:00.250000Z"):
+        return {"id": msg_id,
+                "snippet": {"displayMessage": text, "publishedAt": published},
+                "authorDetails": {"displayName": author, "channelId": "UC" + author}}
+
+    def test_ids_deduplicated_and_searchable(self):
+        handler = ChatHandler(None, db_path=self.db_file, log_file="test.log")
+        handler.process_batch([self.api_message("m1", "ana", "big giveaway today"),
+                               self.api_message("m2", "bo", "hello")])
+        handler.process_batch([self.api_message("m2", "bo", "hello"),
+                               self.api_message("m3", "cy", "another giveaway")])
+        handler.close()
+        conn = sqlite3.connect(self.db_file)
+        rows = conn.execute("SELECT id, author_channel_id, published_at FROM messages "
+                            "ORDER BY rowid").fetchall()
+        self.assertEqual([r[0] for r in rows], ["m1", "m2", "m3"])
+        self.assertEqual(rows[0][1], "UCana")
+        self.assertEqual(rows[0][2], 1714564800250000)
+        hits = conn.execute("SELECT m.id FROM messages_fts JOIN messages m "
+                            "ON m.rowid = messages_fts.rowid "
+                            "WHERE messages_fts MATCH 'giveaway' ORDER BY m.rowid").fetchall()
+        self.assertEqual(hits, [("m1",), ("m3",)])
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 2)
+        conn.close()
+
+    def test_legacy_database_migrated(self):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("CREATE TABLE messages (timestamp TEXT, author TEXT, text TEXT)")
+        conn.executemany("INSERT INTO messages VALUES(?,?,?)",
+                         [("t", "old1", "first words"), ("t", "old2", "second words")])
+        conn.commit()
+        conn.close()
+        handler = ChatHandler(None, db_path=self.db_file, log_file="test.log")
+        handler.process_message(self.api_message("m1", "new", "third words"))
+        handler.close()
+        conn = sqlite3.connect(self.db_file)
+        rows = conn.execute("SELECT author, text FROM messages ORDER BY rowid").fetchall()
+        hits = conn.execute("SELECT count(*) FROM messages_fts "
+                            "WHERE messages_fts MATCH 'words'").fetchone()[0]
+        conn.close()
+        self.assertEqual(rows, [("old1", "first words"), ("old2", "second words"),
+                                ("new", "third words")])
+        self.assertEqual(hits, 3)
+
+
+class TestChatMessage(unittest.TestCase):
+
+    def test_parses_api_and_simple_items_once(self):
+        from src.handlers.message import ChatMessage
+        item = {"id": "m1",
+                "snippet": {"displayMessage": "hi", "publishedAt": "2024-05-01T12:00:00Z",
+                            "authorChannelId": "UCana"},
+                "authorDetails": {"displayName": "".join(["a", "na"])}}
+        parsed = ChatMessage.from_item(item)
+        self.assertEqual((parsed.id, parsed.author, parsed.text, parsed.channel_id,
+                          parsed.published_at),
+                         ("m1", "ana", "hi", "UCana", "2024-05-01T12:00:00Z"))
+        self.assertEqual(ChatMessage.from_item({"author": "bo", "text": "yo"}),
+                         ChatMessage("bo", "yo"))
+        self.assertEqual(ChatMessage.from_item(None), ChatMessage("", ""))
+        # one copy of a chatter's name however many messages they send
+        again = ChatMessage.from_item(dict(item, authorDetails={"displayName": "".join(["an", "a"])}))
+        self.assertIs(parsed.author, again.author)
+        self.assertFalse(hasattr(parsed, "__dict__"))
+
+
+class FakeTextArea:
+    """Just enough of a Tk Text widget for ChatUI.render."""
+
+    def __init__(self):
+        self.lines = []
+        self.inserts = 0
+        self.scrolled = 0
+        self.view_bottom = 1.0
+
+    def configure(self, **kwargs):
+        pass
+
+    def insert(self, index, text):
+        self.inserts += 1
+        self.lines.extend(text.splitlines())
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def yview(self, *args):
+        if args:
+            self.scrolled += 1
+        return (0.0, self.view_bottom)
+
+
+class TestChatUIRendering(unittest.TestCase):
+
+    def make_ui(self, max_lines=3, refresh_ms=100):
+        from src.ui.chat_ui import ChatUI
+        ui = ChatUI.__new__(ChatUI)
+        ui.max_lines = max_lines
+        ui.refresh_ms = refresh_ms
+        ui._pending = collections.deque(maxlen=max_lines)
+        ui._calls = queue.SimpleQueue()
+        ui._tk_thread = threading.get_ident()
+        ui.text_area = FakeTextArea()
+        return ui
+
+    def test_messages_rendered_in_one_batch_and_trimmed(self):
+        ui = self.make_ui()
+        for i in range(5):
+            ui.append_message("a", str(i))
+        self.assertEqual(ui.text_area.inserts, 0)
+        ui.render()
+        self.assertEqual(ui.text_area.inserts, 1)
+        ui.append_message("a", "5")
+        ui.render()
+        self.assertEqual(ui.text_area.lines, ["a: 3", "a: 4", "a: 5"])
+
+    def test_autoscroll_paused_when_scrolled_up(self):
+        ui = self.make_ui(max_lines=100)
+        ui.append_message("a", "x")
+        ui.render()
+        self.assertEqual(ui.text_area.scrolled, 1)
+        ui.text_area.view_bottom = 0.5
+        ui.append_message("a", "y")
+        ui.render()
+        self.assertEqual(ui.text_area.scrolled, 1)
+
+
+    def test_other_threads_only_queue_work(self):
+        ui = self.make_ui(max_lines=100, refresh_ms=0)
+        calls = []
+
+        def producer():
+            for i in range(50):
+                ui.append_message("a", str(i))
+            ui.call_soon(calls.append, "done")
+
+        t = threading.Thread(target=producer)
+        t.start()
+        t.join()
+        self.assertEqual(ui.text_area.inserts, 0)
+        ui.drain()
+        self.assertEqual(calls, ["done"])
+        self.assertEqual(ui.text_area.inserts, 1)
+        self.assertEqual(len(ui.text_area.lines), 50)
+        # on the Tk thread itself refresh_ms=0 still draws straight away
+        ui.append_message("a", "now")
+        self.assertEqual(ui.text_area.inserts, 2)
+
+
 class TestYouTubeChatInvocation(unittest.TestCase):
     def test_invocation_as_script(self):
         """Test running youtube_chat.py as a script to catch token errors."""
@@ -0,0 +1,87 @@
+import csv
+import glob
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from src.testing.fake_api import FakeYouTubeAPI
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestHeadlessCLI(unittest.TestCase):
+
+    def test_sigterm_flushes_outputs(self):
+        with FakeYouTubeAPI(rate=100, polling_interval_ms=100) as api, \
+                tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       YOUTUBE_API_KEY="k",
+                       YOUTUBE_API_ENDPOINT=api.url,
+                       YOUTUBE_DISCOVERY_CACHE=os.path.join(tmp, "discovery.json"))
+            env.pop("CHAT_CSV_FILE", None)
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "src.cli", api.video_id,
+                 "--output-dir", tmp, "--sinks", "csv,sqlite",
+                 "--poll-min", "0.1", "--poll-max", "0.5", "--profile-startup",
+                 "--cache-file", os.path.join(tmp, "chat_id.cache")],
+                cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            time.sleep(2)
+            proc.send_signal(signal.SIGTERM)
+            out, err = proc.communicate(timeout=30)
+            self.assertEqual(proc.returncode, 0, msg=err)
+            self.assertIn("flushing", out)
+            self.assertIn("api service", err)
+
+            csv_files = glob.glob(os.path.join(tmp, "Chat Principal CSV", "*.csv"))
+            self.assertEqual(len(csv_files), 1)
+            with open(csv_files[0], encoding="utf-8-sig", newline="") as f:
+                rows = list(csv.reader(f))
+            self.assertGreater(len(rows), 1)
+            self.assertEqual(len(glob.glob(os.path.join(tmp, "ChatDatabase", "*.db"))), 1)
+            self.assertFalse(os.path.exists(os.path.join(tmp, "Chat principal com emotes")))
+            self.assertFalse(os.path.exists(os.path.join(tmp, "TXT")))
+
+    def test_headless_path_never_imports_tkinter(self):
+        code = ("import sys, src.cli, src.supervisor, src.youtube_chat, "
+                "src.handlers.chat_handler, src.handlers.pipeline; "
+                "src.cli.build_parser(); print('tkinter' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                                capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "False", msg=result.stderr)
+
+    def test_importing_entry_points_defers_google_client(self):
+        code = ("import sys, src.cli, src.youtube_chat, src.client.youtube_client, "
+                "src.handlers.chat_handler; "
+                "print(any(m.startswith('googleapiclient') for m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                                capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "False", msg=result.stderr)
+
+    def test_startup_profiler_reports_phases(self):
+        import io
+        from src.utils.startup import StartupProfiler
+        out = io.StringIO()
+        prof = StartupProfiler(budget=60, stream=out)
+        with prof.phase("imports"):
+            pass
+        self.assertTrue(prof.report())
+        self.assertIn("imports", out.getvalue())
+        self.assertIn("within budget", out.getvalue())
+        quiet = StartupProfiler(enabled=False, stream=out)
+        with quiet.phase("x"):
+            pass
+        self.assertEqual(quiet.phases, [])
+
+    def test_requires_a_stream(self):
+        result = subprocess.run([sys.executable, "-m", "src.cli", "--api-key", "k"],
+                                cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("VIDEO", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from src.utils.csv_convert import convert_delimiter, convert_tree, rewrite_header
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROWS = [["AUTHOR", "MESSAGE"], ["ana", "hello, world"], ["bo", 'multi\nline "quoted"'],
+        ["cy", "olá 🎉"]]
+
+
+def write_csv(path, rows, delimiter=","):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f, delimiter=delimiter).writerows(rows)
+
+
+def read_csv(path, delimiter=";"):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f, delimiter=delimiter))
+
+
+class TestCsvConvert(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_convert_delimiter_in_place(self):
+        path = os.path.join(self.dir, "chat.csv")
+        write_csv(path, ROWS)
+        self.assertEqual(convert_delimiter(path), len(ROWS))
+        self.assertEqual(read_csv(path), ROWS)
+        with open(path, "rb") as f:
+            self.assertTrue(f.read().startswith(b"\xef\xbb\xbf"))
+        self.assertEqual(os.listdir(self.dir), ["chat.csv"])
+
+    def test_rewrite_header_keeps_body(self):
+        path = os.path.join(self.dir, "chat1.csv")
+        write_csv(path, [["author", "message"]] + ROWS[1:], delimiter=";")
+        self.assertTrue(rewrite_header(path))
+        self.assertEqual(read_csv(path), ROWS)
+        self.assertFalse(rewrite_header(path))
+
+    def test_convert_tree_in_parallel(self):
+        for sub in ("a", "b"):
+            os.makedirs(os.path.join(self.dir, sub))
+            write_csv(os.path.join(self.dir, sub, "comma.csv"), ROWS)
+        write_csv(os.path.join(self.dir, "already.csv"), ROWS, delimiter=";")
+        results = dict(convert_tree(self.dir, workers=2))
+        self.assertEqual(sorted(results.values()), ["converted", "converted", "skipped"])
+        for sub in ("a", "b"):
+            self.assertEqual(read_csv(os.path.join(self.dir, sub, "comma.csv")), ROWS)
+
+    def test_tool_single_file_keeps_backup(self):
+        path = os.path.join(self.dir, "export.csv")
+        write_csv(path, ROWS)
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "tools", "convert_to_semicolon.py"),
+                                 path], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertEqual(read_csv(path), ROWS)
+        self.assertEqual(read_csv(path + ".bak", delimiter=","), ROWS)
+
+
+if __name__ == '__main__':
+    unittest.main()
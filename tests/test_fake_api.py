@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from src.client.polling import PollScheduler
+from src.client.service import build_service
+from src.client.errors import ChatEndedError
+from src.testing.fake_api import FakeYouTubeAPI, load_recording, parse_profile
+from src.youtube_chat import YouTubeChat
+
+
+def setUpModule():
+    # keep the discovery document cache out of the developer's home
+    global _discovery_dir, _discovery_env
+    _discovery_dir = tempfile.TemporaryDirectory()
+    _discovery_env = os.environ.get("YOUTUBE_DISCOVERY_CACHE")
+    os.environ["YOUTUBE_DISCOVERY_CACHE"] = os.path.join(_discovery_dir.name, "discovery.json")
+
+
+def tearDownModule():
+    if _discovery_env is None:
+        os.environ.pop("YOUTUBE_DISCOVERY_CACHE", None)
+    else:
+        os.environ["YOUTUBE_DISCOVERY_CACHE"] = _discovery_env
+    _discovery_dir.cleanup()
+
+
+class Collector:
+    def __init__(self):
+        self.messages = []
+
+    def process_batch(self, messages):
+        self.messages.extend(messages)
+
+
+class TestFakeYouTubeAPI(unittest.TestCase):
+
+    def test_real_client_pages_through_synthetic_chat(self):
+        with FakeYouTubeAPI(rate=200, polling_interval_ms=100) as api:
+            service = build_service("k", api_endpoint=api.url)
+            handler = Collector()
+            chat = YouTubeChat("k", video_id=api.video_id, handler=handler, service=service,
+                               scheduler=PollScheduler(0.05, 0.1))
+            self.assertEqual(chat.live_chat_id, api.live_chat_id)
+            delay = 0
+            for _ in range(4):
+                time.sleep(0.1)
+                delay = chat.poll_once()
+        ids = [m['id'] for m in handler.messages]
+        self.assertGreater(len(ids), 20)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertGreaterEqual(delay, 0.1)
+
+    def test_chat_goes_offline_after_duration(self):
+        with FakeYouTubeAPI(rate=10, duration=0) as api:
+            service = build_service("k", api_endpoint=api.url)
+            chat = YouTubeChat("k", live_chat_id=api.live_chat_id, service=service)
+            with self.assertRaises(ChatEndedError):
+                chat.poll_once()
+
+    def test_replay_keeps_recorded_items(self):
+        path = "test_replay.jsonl.gz"
+        recorded = [{'id': f'r{i}', 'snippet': {'publishedAt': f'2026-01-01T00:00:0{i}Z',
+                                                 'displayMessage': f'm{i}'},
+                     'authorDetails': {'displayName': 'rec'}} for i in range(3)]
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'items': recorded[:2]}) + "\n")
+            f.write(json.dumps(recorded[2]) + "\n")
+        items = load_recording(path)
+        os.remove(path)
+        with FakeYouTubeAPI(replay=items, speed=100) as api:
+            time.sleep(0.05)
+            status, body = api.messages_list({'liveChatId': [api.live_chat_id]})
+        self.assertEqual(status, 200)
+        self.assertEqual([m['id'] for m in body['items']], ['r0', 'r1', 'r2'])
+        self.assertEqual(body['nextPageToken'], '3')
+
+    def test_profile_shapes_rate(self):
+        self.assertEqual(parse_profile("2:1,1:5"), [(2.0, 1.0), (1.0, 5.0)])
+        api = FakeYouTubeAPI(rate=10, profile="2:1,1:5")
+        self.assertEqual(api.source.available(2.0), 20)
+        self.assertEqual(api.source.available(3.0), 70)
+        api.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
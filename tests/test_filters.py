@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from src.handlers.chat_handler import ChatHandler
+from src.handlers.filters import KeywordAutomaton, KeywordFilter, RulesFile, parse_rules
+
+RULES = """
+# hype words
+[hype]
+gg
+Hype Train
+[spam]
+re:https?://\\S+
+[banned]
+sub:bad
+"""
+
+
+class TestKeywordFilter(unittest.TestCase):
+
+    def test_automaton_finds_overlapping_keywords(self):
+        automaton = KeywordAutomaton()
+        for word in ("he", "she", "his", "hers"):
+            automaton.add(word, word)
+        found = sorted((end, value) for end, (_, value) in automaton.search("ushers"))
+        self.assertEqual(found, [(4, "he"), (4, "she"), (6, "hers")])
+
+    def test_rules_match_words_substrings_and_patterns(self):
+        rules = KeywordFilter(parse_rules(RULES))
+        self.assertEqual(rules.match("GG wp"), [("hype", "gg")])
+        self.assertEqual(rules.match("eggs and ham"), [])
+        self.assertEqual(rules.match("all aboard the HYPE TRAIN!"), [("hype", "Hype Train")])
+        self.assertEqual(rules.match("badass clip https://x.example gg"),
+                         [("hype", "gg"), ("spam", "https?://\\S+"), ("banned", "bad")])
+
+    def test_build_can_run_again(self):
+        automaton = KeywordAutomaton()
+        automaton.add("he", "he")
+        automaton.add("she", "she")
+        automaton.build()
+        automaton.add("hers", "hers")
+        automaton.build()
+        found = sorted(value for _, (_, value) in automaton.search("shers"))
+        self.assertEqual(found, ["he", "hers", "she"])
+
+    def test_patterns_that_cannot_be_combined(self):
+        rules = KeywordFilter([
+            ("flags", "re", "(?i)foo"),
+            ("named", "re", "(?P<n>x)y"),
+            ("named", "re", "(?P<n>z)y"),
+            ("backref", "re", r"(a)\1"),
+            ("backref", "re", r"(b)\1"),
+            ("plain", "re", "qux"),
+        ])
+        self.assertEqual(rules.match("FOO"), [("flags", "(?i)foo")])
+        self.assertEqual(rules.match("zy"), [("named", "(?P<n>z)y")])
+        self.assertEqual(rules.match("bb"), [("backref", r"(b)\1")])
+        self.assertEqual(rules.match("a qux"), [("plain", "qux")])
+
+    def test_broken_rules_at_startup_raise(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("re:(unclosed\n")
+            with self.assertRaises(ValueError):
+                RulesFile(path)
+
+    def test_hot_reload_keeps_old_rules_on_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("gg\n")
+            rules = RulesFile(path, reload_interval=0)
+            self.assertTrue(rules.current().match("gg"))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("raid\nlonger file\n")
+            self.assertEqual(rules.current().match("raid"), [("keyword", "raid")])
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("re:(unclosed\n")
+            with redirect_stdout(StringIO()) as out:
+                self.assertTrue(rules.current().match("raid"))
+            self.assertIn("[WARNING]", out.getvalue())
+
+    def test_alert_sink_records_only_matches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            rules = os.path.join(tmp, "rules.txt")
+            alerts = os.path.join(tmp, "alerts.jsonl")
+            with open(rules, "w", encoding="utf-8") as f:
+                f.write(RULES)
+            seen = []
+            handler = ChatHandler(None, log_file=None, sinks={"alerts": {
+                "rules": rules, "path": alerts,
+                "on_alert": lambda m, matches: seen.append(m.author)}})
+            handler.process_batch([{"author": "ana", "text": "hello"},
+                                   {"author": "bo", "text": "gg"}])
+            handler.close()
+            with open(alerts, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(seen, ["bo"])
+        self.assertEqual(len(lines), 1)
+        self.assertEqual((lines[0]["author"], lines[0]["rules"], lines[0]["terms"]),
+                         ("bo", ["hype"], ["gg"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import types
+import unittest
+import urllib.request
+
+from googleapiclient.errors import HttpError
+
+from src.client.retry import RetryPolicy
+from src.handlers.chat_handler import ChatHandler
+from src.handlers.pipeline import WriterPipeline
+from src.utils import metrics
+
+
+def api_message(i, published="2024-05-01T12:00:00Z"):
+    return {"id": f"m{i}", "snippet": {"displayMessage": "hi", "publishedAt": published},
+            "authorDetails": {"displayName": "ana"}}
+
+
+class TestMetrics(unittest.TestCase):
+
+    def tearDown(self):
+        metrics.disable()
+
+    def test_disabled_records_nothing(self):
+        self.assertFalse(metrics.ENABLED)
+        handler = ChatHandler(None, log_file="test.log")
+        handler.process_batch([api_message(1)])
+        handler.close()
+        self.assertIsNone(metrics.registry())
+        self.assertEqual(metrics.render(), "")
+
+    def test_handler_times_sinks_and_lag(self):
+        reg = metrics.enable()
+        with tempfile.TemporaryDirectory() as tmp:
+            handler = ChatHandler(None, log_file=os.path.join(tmp, "chat.log"),
+                                  csv_path=os.path.join(tmp, "chat.csv"))
+            handler.process_batch([api_message(1), api_message(2), {"author": "bo", "text": "x"}])
+            handler.close()
+        self.assertEqual(reg.counter_value("chat_messages_total"), 3)
+        self.assertEqual(reg.histogram("chat_sink_write_seconds", sink="csv").count, 1)
+        self.assertEqual(reg.histogram("chat_sink_write_seconds", sink="log").count, 1)
+        # only items with a publishedAt have a lag; these are long overdue
+        lag = reg.histogram("chat_lag_seconds")
+        self.assertEqual(lag.count, 2)
+        self.assertEqual(lag.quantile(0.5), float("inf"))
+
+    def test_retry_records_latency_and_errors(self):
+        reg = metrics.enable()
+        error = HttpError(types.SimpleNamespace(status=503, reason="Unavailable"),
+                          json.dumps({"error": {"errors": [{"reason": "backendError"}]}}).encode())
+        results = [error, {"items": []}]
+
+        def call():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        RetryPolicy(sleep=lambda s: None).call(call, description="liveChatMessages.list")
+        self.assertEqual(reg.histogram("chat_api_call_seconds",
+                                       method="liveChatMessages.list").count, 2)
+        self.assertEqual(reg.counter_value("chat_api_errors_total",
+                                           method="liveChatMessages.list", kind="server"), 1)
+
+    def test_endpoint_serves_prometheus_text(self):
+        server = metrics.serve(0)
+        try:
+            pipeline = WriterPipeline(types.SimpleNamespace(process_batch=lambda m: None),
+                                      name="vid1")
+            pipeline.submit([api_message(1)])
+            metrics.inc("chat_poll_errors_total", kind="network")
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as resp:
+                body = resp.read().decode("utf-8")
+            self.assertIn("# TYPE chat_queue_depth gauge", body)
+            self.assertIn('chat_queue_depth{queue="vid1"} 1', body)
+            self.assertIn('chat_poll_errors_total{kind="network"} 1', body)
+            pipeline.close()
+            self.assertNotIn("chat_queue_depth", metrics.render())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
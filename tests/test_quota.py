@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+import types
+import unittest
+
+from googleapiclient.errors import HttpError
+
+from src.client.quota import QuotaBudget
+from src.client.retry import RetryPolicy, seconds_until_quota_reset
+from src.youtube_chat import YouTubeChat
+
+
+def quota_error():
+    content = json.dumps({"error": {"errors": [{"reason": "quotaExceeded"}]}}).encode()
+    return HttpError(types.SimpleNamespace(status=403, reason="Forbidden"), content)
+
+
+class Pages:
+    """liveChatMessages stand-in returning (or raising) queued results."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    def execute(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def liveChatMessages(self):
+        return self
+
+    def list(self, **kwargs):
+        return self
+
+
+class TestQuotaBudget(unittest.TestCase):
+
+    def test_spend_and_pick_key_with_most_left(self):
+        budget = QuotaBudget(["a", "b"], daily_units=100, reserve=0)
+        budget.spend("a")
+        budget.spend("a", "videos.list")
+        self.assertEqual(budget.used, {"a": 6, "b": 0})
+        self.assertEqual(budget.pick_key(), "b")
+        self.assertEqual(budget.remaining(), 194)
+        budget.mark_exhausted("b")
+        self.assertEqual(budget.pick_key(), "a")
+        budget.spend("a", units=94)
+        self.assertIsNone(budget.pick_key())
+
+    def test_quiet_chats_stretched_more_than_busy_ones(self):
+        now = 1_700_000_000.0
+        budget = QuotaBudget(["a"], daily_units=1000, reserve=0, clock=lambda: now)
+        budget.register_stream()
+        budget.register_stream()
+        # 200 polls left for two streams until the reset
+        expected = 2 * seconds_until_quota_reset(now) / 200
+        self.assertAlmostEqual(budget.required_interval(), expected)
+        quiet = budget.interval_for(5, message_count=0)
+        normal = budget.interval_for(5, message_count=5)
+        busy = budget.interval_for(5, message_count=50)
+        self.assertGreater(quiet, normal)
+        self.assertGreater(normal, busy)
+        self.assertGreaterEqual(busy, 5)
+        # a generous budget leaves the scheduler's delay alone
+        roomy = QuotaBudget(["a"], daily_units=10 ** 9, clock=lambda: now)
+        self.assertEqual(roomy.interval_for(5, 0), 5)
+
+    def test_spend_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "quota.json")
+            budget = QuotaBudget(["secret-key"], state_path=path)
+            budget.spend("secret-key")
+            budget.save()
+            with open(path) as f:
+                self.assertNotIn("secret-key", f.read())
+            self.assertEqual(QuotaBudget(["secret-key"], state_path=path).used["secret-key"], 5)
+
+    def test_chat_rotates_to_next_key_on_quota_error(self):
+        budget = QuotaBudget(["k1", "k2"], daily_units=100, reserve=0)
+        budget.spend("k2")  # k1 has more left, so it's tried first
+        page = {"items": [{"id": "1", "author": "a", "text": "hi"}]}
+        chat = YouTubeChat("k1", live_chat_id="LC", quota=budget,
+                           service=Pages(quota_error()),
+                           retry=RetryPolicy(sleep=lambda s: None))
+        chat._services["k2"] = Pages(page)
+        messages, _ = chat.fetch_page()
+        self.assertEqual([m["id"] for m in messages], ["1"])
+        self.assertIn("k1", budget.exhausted)
+        self.assertEqual(budget.used, {"k1": 5, "k2": 10})
+
+    def test_client_charges_every_attempt_to_the_rotated_key(self):
+        from src.client.youtube_client import YouTubeClient
+
+        class Videos(Pages):
+            def videos(self):
+                return self
+
+        budget = QuotaBudget(["k1", "k2"], daily_units=100, reserve=0)
+        budget.spend("k1")  # k2 has more left
+        server_error = HttpError(types.SimpleNamespace(status=503, reason="Unavailable"), b"{}")
+        live = {"items": [{"liveStreamingDetails": {"activeLiveChatId": "LC"}}]}
+        client = YouTubeClient("k1", service=Videos(), quota=budget,
+                               retry=RetryPolicy(sleep=lambda s: None))
+        client._services["k2"] = Videos(server_error, live)
+        self.assertEqual(client.get_live_chat_id("vid"), "LC")
+        self.assertEqual(budget.used, {"k1": 5, "k2": 2})
+
+    def test_failed_lookup_does_not_register_stream(self):
+        class NoVideo(Pages):
+            def videos(self):
+                return self
+
+        budget = QuotaBudget(["k1"], daily_units=100, reserve=0)
+        with self.assertRaises(ValueError):
+            YouTubeChat("k1", video_id="gone", quota=budget, service=NoVideo({"items": []}),
+                        retry=RetryPolicy(sleep=lambda s: None))
+        self.assertEqual(budget._streams, 0)
+        chat = YouTubeChat("k1", live_chat_id="LC", quota=budget, service=Pages())
+        self.assertEqual(budget._streams, 1)
+        chat.release_quota()
+        chat.release_quota()
+        self.assertEqual(budget._streams, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import json
+import types
+import unittest
+
+from googleapiclient.errors import HttpError
+
+from src.client.retry import (CLIENT, NETWORK, QUOTA, RATE_LIMIT, SERVER, CHAT_ENDED,
+                              CircuitBreaker, CircuitOpenError, QuotaExceededError,
+                              RetryPolicy, classify)
+from src.youtube_chat import YouTubeChat
+
+
+def http_error(status, reason=""):
+    content = json.dumps({"error": {"code": status, "errors": [{"reason": reason}]}}).encode()
+    return HttpError(types.SimpleNamespace(status=status, reason=reason), content)
+
+
+class Flaky:
+    """Callable that raises the queued errors, then returns ``result``."""
+
+    def __init__(self, errors, result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def policy(**kwargs):
+    kwargs.setdefault("sleep", lambda seconds: None)
+    return RetryPolicy(**kwargs)
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_classify(self):
+        self.assertEqual(classify(http_error(403, "quotaExceeded")), QUOTA)
+        self.assertEqual(classify(http_error(403, "rateLimitExceeded")), RATE_LIMIT)
+        self.assertEqual(classify(http_error(429)), RATE_LIMIT)
+        self.assertEqual(classify(http_error(503)), SERVER)
+        self.assertEqual(classify(http_error(403, "liveChatEnded")), CHAT_ENDED)
+        self.assertEqual(classify(http_error(400, "badRequest")), CLIENT)
+        self.assertEqual(classify(ConnectionResetError()), NETWORK)
+
+    def test_transient_errors_retried_with_capped_backoff(self):
+        slept = []
+        retry = policy(max_attempts=4, base_delay=1, max_delay=3, sleep=slept.append)
+        func = Flaky([http_error(503), OSError("reset"), http_error(500)])
+        self.assertEqual(retry.call(func), "ok")
+        self.assertEqual(func.calls, 4)
+        self.assertEqual(len(slept), 3)
+        self.assertTrue(all(0 <= s <= 3 for s in slept))
+        self.assertEqual(retry.breaker.failures, 0)
+
+    def test_gives_up_after_max_attempts(self):
+        retry = policy(max_attempts=2)
+        func = Flaky([http_error(503)] * 5)
+        with self.assertRaises(HttpError):
+            retry.call(func)
+        self.assertEqual(func.calls, 2)
+
+    def test_quota_and_client_errors_not_retried(self):
+        retry = policy()
+        func = Flaky([http_error(403, "quotaExceeded")])
+        with self.assertRaises(QuotaExceededError) as ctx:
+            retry.call(func)
+        self.assertGreater(ctx.exception.retry_after, 0)
+        func = Flaky([http_error(400, "badRequest")])
+        with self.assertRaises(HttpError):
+            retry.call(func)
+        self.assertEqual(func.calls, 1)
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: now[0])
+        retry = policy(max_attempts=1, breaker=breaker)
+        for _ in range(3):
+            with self.assertRaises(OSError):
+                retry.call(Flaky([OSError()]))
+        func = Flaky([])
+        with self.assertRaises(CircuitOpenError):
+            retry.call(func)
+        self.assertEqual(func.calls, 0)
+        now[0] = 31
+        self.assertEqual(breaker.state, "half-open")
+        self.assertEqual(retry.call(func), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_half_open_lets_one_trial_through(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 31
+        self.assertTrue(breaker.before_call())
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        # a 4xx answer ends the trial without closing or reopening
+        breaker.release()
+        self.assertTrue(breaker.before_call())
+        breaker.record_success()
+        self.assertFalse(breaker.before_call())
+
+
+class ErrorThenEnd:
+    """liveChatMessages stand-in: one network error, one page, then chat over."""
+
+    def __init__(self):
+        self.results = [OSError("connection reset"),
+                        {"items": [{"id": "1", "author": "a", "text": "hi"}],
+                         "pollingIntervalMillis": 0},
+                        {"offlineAt": "2024-01-01T00:00:00Z"}]
+
+    def liveChatMessages(self):
+        return self
+
+    def list(self, **kwargs):
+        return self
+
+    def execute(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestSessionSurvivesErrors(unittest.TestCase):
+
+    def test_session_keeps_polling_after_exhausted_retries(self):
+        from src.client.polling import PollScheduler
+        delivered = []
+        handler = types.SimpleNamespace(process_batch=delivered.extend)
+        chat = YouTubeChat("k", live_chat_id="LC", handler=handler, service=ErrorThenEnd(),
+                           scheduler=PollScheduler(0.01, 0.01),
+                           retry=policy(max_attempts=1, max_delay=0))
+        chat.start_chat_session()
+        self.assertEqual([m["id"] for m in delivered], ["1"])
+
+    def test_handler_errors_are_not_retried_as_network_errors(self):
+        def broken(messages):
+            raise RuntimeError("ChatHandler is closed")
+
+        service = ErrorThenEnd()
+        service.results.pop(0)
+        chat = YouTubeChat("k", live_chat_id="LC", service=service,
+                           handler=types.SimpleNamespace(process_batch=broken),
+                           retry=policy(max_attempts=1, max_delay=0))
+        with self.assertRaises(RuntimeError):
+            chat.start_chat_session()
+        self.assertEqual(len(service.results), 1)
+
+    def test_supervisor_drops_stream_on_client_error(self):
+        from src.supervisor import StreamSupervisor
+
+        class Forbidden(ErrorThenEnd):
+            def __init__(self):
+                self.calls = 0
+
+            def execute(self):
+                self.calls += 1
+                raise http_error(403, "forbidden")
+
+        service = Forbidden()
+        closed = []
+        handler = types.SimpleNamespace(process_batch=lambda m: None,
+                                        close=lambda: closed.append(True))
+        sup = StreamSupervisor("k", service=service, error_delay=0)
+        sup.add_stream(live_chat_id="LC", handler=handler)
+        sup._poll("LC")
+        self.assertEqual(sup.streams, {})
+        self.assertEqual(closed, [True])
+        self.assertEqual(service.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
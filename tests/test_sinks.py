@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+from src.handlers.chat_handler import ChatHandler
+from src.handlers.sinks import SINKS, Sink, build_sinks, register_sink
+
+
+class RecordingSink(Sink):
+    name = "recording"
+
+    def __init__(self):
+        self.batches = []
+        self.opened = self.closed = False
+
+    def open(self):
+        self.opened = True
+        return self
+
+    def write_batch(self, messages):
+        self.batches.append(list(messages))
+
+    def close(self):
+        self.closed = True
+
+
+class RawSink(RecordingSink):
+    raw = True
+
+
+class FailingSink(Sink):
+    def write_batch(self, messages):
+        raise OSError("disk full")
+
+
+class TestSinks(unittest.TestCase):
+
+    def test_custom_sink_gets_whole_batches(self):
+        sink = RecordingSink()
+        handler = ChatHandler(None, log_file=None, sinks={"recording": sink})
+        handler.process_batch([{"author": "ana", "text": "oi"}, {"author": "bo", "text": "x"}])
+        handler.close()
+        self.assertTrue(sink.opened and sink.closed)
+        self.assertEqual(len(sink.batches), 1)
+        self.assertEqual([(m.author, m.text) for m in sink.batches[0]], [("ana", "oi"), ("bo", "x")])
+
+    def test_raw_sink_gets_items_as_received(self):
+        item = {"id": "m1", "snippet": {"displayMessage": "hi"},
+                "authorDetails": {"displayName": "ana"}}
+        raw, parsed = RawSink(), RecordingSink()
+        handler = ChatHandler(None, log_file=None, sinks={"raw": raw, "parsed": parsed})
+        handler.process_batch([item])
+        handler.close()
+        self.assertEqual(raw.batches, [[item]])
+        self.assertEqual(parsed.batches[0][0].text, "hi")
+
+    def test_raw_only_handler_skips_parsing(self):
+        from src.handlers.message import ChatMessage
+        raw = RawSink()
+        handler = ChatHandler(None, log_file=None, sinks={"raw": raw})
+        with mock.patch.object(ChatMessage, "from_item") as from_item:
+            self.assertEqual(handler.process_batch([{"author": "ana", "text": "oi"}]), [])
+        handler.close()
+        from_item.assert_not_called()
+        self.assertEqual(raw.batches, [[{"author": "ana", "text": "oi"}]])
+
+    def test_create_handler_passes_ui_through(self):
+        from src.youtube_chat import create_handler
+        shown = []
+        ui = type("UI", (), {"append_message": lambda self, a, t: shown.append((a, t))})()
+        with tempfile.TemporaryDirectory() as tmp, redirect_stdout(StringIO()):
+            handler = create_handler(None, ui=ui, output_dir=tmp, sinks=("ui",))
+            self.assertEqual(list(handler.sinks), ["ui"])
+            handler.process_message({"author": "ana", "text": "oi"})
+            handler.close()
+        self.assertEqual(shown, [("ana", "oi")])
+
+    def test_only_configured_outputs_are_created(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_file = os.path.join(tmp, "chat.csv")
+            handler = ChatHandler(None, log_file=None, sinks={"csv": {"path": csv_file}})
+            self.assertEqual(list(handler.sinks), ["csv"])
+            self.assertIsNone(handler.logger)
+            handler.process_message({"author": "ana", "text": "oi"})
+            handler.close()
+            self.assertEqual(os.listdir(tmp), ["chat.csv"])
+
+    def test_failing_sink_does_not_stop_others(self):
+        sink = RecordingSink()
+        handler = ChatHandler(None, log_file=None, sinks={"bad": FailingSink(), "recording": sink})
+        handler.process_batch([{"author": "ana", "text": "1"}])
+        handler.process_batch([{"author": "ana", "text": "2"}])
+        handler.close()
+        self.assertEqual(len(sink.batches), 2)
+
+    def test_sync_errors_skip_the_callback_without_raising(self):
+        class BrokenDisk(RecordingSink):
+            def sync(self):
+                raise OSError("disk full")
+
+        handler = ChatHandler(None, log_file=None, sinks={"broken": BrokenDisk()})
+        saved = []
+        with redirect_stdout(StringIO()) as out:
+            handler.on_flushed(lambda: saved.append(True))
+            handler.on_flushed(lambda: saved.append(True))
+        handler.close()
+        self.assertEqual(saved, [])
+        self.assertEqual(out.getvalue().count("Could not sync the broken output"), 1)
+
+    def test_registered_factory_and_unknown_name(self):
+        register_sink("recording", lambda tag="x": RecordingSink())
+        try:
+            sinks = build_sinks({"recording": {"tag": "y"}})
+            self.assertIsInstance(sinks["recording"], RecordingSink)
+        finally:
+            SINKS.pop("recording")
+        with self.assertRaises(ValueError):
+            build_sinks({"nope": {}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
-import csv
 import shutil
+import sys
 from pathlib import Path
 
 root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+from src.utils.csv_convert import convert_delimiter  # noqa: E402
+
 src = root / 'chat.csv'
 bak = root / 'chat.csv.bak'
 
@@ -13,14 +16,9 @@ if not src.exists():
 shutil.copy2(src, bak)
 print(f'Backup written to {bak}')
 
-# read original as comma-delimited (most exports are comma)
-with open(bak, 'r', encoding='utf-8-sig', newline='') as fr:
-    reader = csv.reader(fr, delimiter=',')
-    rows = list(reader)
-
-# write semicolon-delimited with UTF-8 BOM so Excel recognizes encoding
-with open(src, 'w', encoding='utf-8-sig', newline='') as fw:
-    writer = csv.writer(fw, delimiter=';')
-    writer.writerows(rows)
+# read original as comma-delimited (most exports are comma) and write
+# semicolon-delimited with UTF-8 BOM so Excel recognizes encoding; rows are
+# streamed through a temp file, so file size doesn't matter
+convert_delimiter(bak, dst=src, from_delim=',', to_delim=';')
 
 print('Conversion complete: chat.csv is now semicolon-delimited')
@@ -1,31 +1,45 @@
-import csv
+import argparse
+import shutil
 import sys
 from pathlib import Path
 
-if len(sys.argv) < 2:
-    print('Usage: python convert_to_semicolon.py <file.csv>')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.utils.csv_convert import convert_delimiter, convert_tree  # noqa: E402
+
+parser = argparse.ArgumentParser(
+    description='Convert comma-delimited chat CSVs to semicolon-delimited (UTF-8 with BOM).')
+parser.add_argument('file', nargs='?', help='a single CSV to convert (a .bak copy is kept)')
+parser.add_argument('--tree', metavar='DIR',
+                    help='convert every CSV under DIR (e.g. Logs/) in parallel')
+parser.add_argument('--workers', type=int, default=None,
+                    help='worker processes for --tree (default: one per CPU)')
+parser.add_argument('--backup', action='store_true', help='with --tree, keep .bak copies')
+args = parser.parse_args()
+
+if args.tree:
+    results = convert_tree(args.tree, backup=args.backup, workers=args.workers)
+    failed = 0
+    for path, status in results:
+        print(f'{status:10s} {path}')
+        failed += status.startswith('error')
+    print(f'{len(results)} file(s), {failed} error(s)')
+    raise SystemExit(1 if failed else 0)
+
+if not args.file:
+    parser.print_usage()
     raise SystemExit(1)
 
-p = Path(sys.argv[1])
+p = Path(args.file)
 if not p.exists():
     print('File not found:', p)
     raise SystemExit(1)
 
 bak = p.with_suffix(p.suffix + '.bak')
 if not bak.exists():
-    p.replace(bak)
-else:
-    # if backup exists, overwrite original with backup contents for conversion
-    p.unlink()
-    bak.replace(p)
+    shutil.copy2(p, bak)
+# if a backup already exists it holds the original, so convert from it
 
 # Read as comma-delimited and write back as semicolon with BOM
-with open(bak, 'r', encoding='utf-8-sig', newline='') as fr:
-    reader = csv.reader(fr, delimiter=',')
-    rows = list(reader)
-
-with open(p, 'w', encoding='utf-8-sig', newline='') as fw:
-    writer = csv.writer(fw, delimiter=';')
-    writer.writerows(rows)
+convert_delimiter(bak, dst=p, from_delim=',', to_delim=';')
 
 print('Converted', p, '-> semicolon-delimited (backup at', bak, ')')
@@ -1,25 +1,15 @@
-from pathlib import Path
 import glob
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.utils.csv_convert import rewrite_header  # noqa: E402
 
 print('Updating CSV headers to uppercase for all chat*.csv')
 for p in glob.glob('chat*.csv'):
     path = Path(p)
-    text = path.read_text(encoding='utf-8-sig')
-    lines = text.splitlines()
-    if not lines:
-        continue
-    # determine delimiter from first line
-    first = lines[0]
-    if ';' in first:
-        delim=';'
-    elif ',' in first:
-        delim=','
-    else:
-        delim=';'
-    header = f'AUTHOR{delim}MESSAGE'
-    if lines[0].strip() != header:
-        lines[0] = header
-        path.write_text('\n'.join(lines), encoding='utf-8-sig')
+    # only the first line is rewritten; the rest is streamed through
+    if rewrite_header(path):
         print('Patched', path)
     else:
         print('Already ok', path)